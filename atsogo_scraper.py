@@ -1,3 +1,4 @@
+import argparse
 import requests
 from bs4 import BeautifulSoup
 import csv
@@ -6,23 +7,28 @@ import re
 from urllib.parse import urljoin
 import logging
 
+from http_transport import create_session
+from memory_budget import decompose_soup
+from scrape_profiler import NULL_PROFILER
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AtsogoScraper:
-    def __init__(self):
+    def __init__(self, profiler=None, session=None):
+        # Optional ScrapeProfiler; the null profiler's hooks cost next to nothing
+        self.profiler = profiler or NULL_PROFILER
         self.base_url = "https://atsogo.mw"
         self.properties_url = "https://atsogo.mw/listings/properties"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Tuned transport shared with other scrapers when one is passed in
+        self.session = session or create_session()
         
     def get_page_content(self, url):
         """Fetch page content with error handling"""
         try:
-            response = self.session.get(url, timeout=10)
+            with self.profiler.stage('fetch'):
+                response = self.session.get(url, timeout=10)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
@@ -47,7 +53,8 @@ class AtsogoScraper:
             }
             
             # Get all text content for parsing
-            all_text = property_element.get_text()
+            with self.profiler.stage('get_text'):
+                all_text = property_element.get_text()
             
             # Extract title
             title_elem = property_element.find('h3')
@@ -66,38 +73,8 @@ class AtsogoScraper:
                         property_data['transaction_type'] = lines[i + 1]
                     break
             
-            # Extract location (look for city names)
-            location_match = re.search(r'(LILONGWE|BLANTYRE|SALIMA|NKHOTAKOTA|MZIMBA|MZUZU|ZOMBA|THYOLO|RUMPHI|NENO|NKHATABAY|NKHOTAKOTA|NTCHISI|NTCHEU|NSANJE|MCHINJI|MULANJE|MANGOCHI|MACHINGA|LIWONDE|KARONGA|KASUNGU|DOWA|DEDZA|CHIRADZULU|CHIKWAWA|CHITIPA|BALAKA)[^,\n]*', all_text)
-            if location_match:
-                # Get the full location line
-                location_line = location_match.group(0)
-                # Find the complete location line
-                for line in lines:
-                    if location_match.group(1) in line:
-                        property_data['location'] = line.strip()
-                        break
-            
-            # Extract price
-            price_match = re.search(r'MK\s*([\d,]+\.?\d*)', all_text)
-            if price_match:
-                property_data['price'] = price_match.group(1).replace(',', '')
-            
-            # Extract area
-            area_match = re.search(r'(\d+)\s*sqm', all_text)
-            if area_match:
-                property_data['area_sqm'] = area_match.group(1)
-            
-            # Extract bedrooms and bathrooms
-            # Look for patterns like "4 5 Bathroom" or "0 0 Bathroom"
-            bed_bath_match = re.search(r'(\d+)\s+(\d+)\s+Bathroom', all_text)
-            if bed_bath_match:
-                property_data['bedrooms'] = bed_bath_match.group(1)
-                property_data['bathrooms'] = bed_bath_match.group(2)
-            
-            # Extract date posted
-            date_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})', all_text)
-            if date_match:
-                property_data['date_posted'] = date_match.group(1)
+            with self.profiler.stage('regex'):
+                self._extract_text_fields(property_data, all_text, lines)
             
             return property_data
             
@@ -105,6 +82,39 @@ class AtsogoScraper:
             logger.error(f"Error extracting property data: {e}")
             return None
     
+    def _extract_text_fields(self, property_data, all_text, lines):
+        """Fill location, price, area, rooms and date from the card text"""
+        # Extract location (look for city names)
+        location_match = re.search(r'(LILONGWE|BLANTYRE|SALIMA|NKHOTAKOTA|MZIMBA|MZUZU|ZOMBA|THYOLO|RUMPHI|NENO|NKHATABAY|NKHOTAKOTA|NTCHISI|NTCHEU|NSANJE|MCHINJI|MULANJE|MANGOCHI|MACHINGA|LIWONDE|KARONGA|KASUNGU|DOWA|DEDZA|CHIRADZULU|CHIKWAWA|CHITIPA|BALAKA)[^,\n]*', all_text)
+        if location_match:
+            # Find the complete location line
+            for line in lines:
+                if location_match.group(1) in line:
+                    property_data['location'] = line.strip()
+                    break
+        
+        # Extract price
+        price_match = re.search(r'MK\s*([\d,]+\.?\d*)', all_text)
+        if price_match:
+            property_data['price'] = price_match.group(1).replace(',', '')
+        
+        # Extract area
+        area_match = re.search(r'(\d+)\s*sqm', all_text)
+        if area_match:
+            property_data['area_sqm'] = area_match.group(1)
+        
+        # Extract bedrooms and bathrooms
+        # Look for patterns like "4 5 Bathroom" or "0 0 Bathroom"
+        bed_bath_match = re.search(r'(\d+)\s+(\d+)\s+Bathroom', all_text)
+        if bed_bath_match:
+            property_data['bedrooms'] = bed_bath_match.group(1)
+            property_data['bathrooms'] = bed_bath_match.group(2)
+        
+        # Extract date posted
+        date_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})', all_text)
+        if date_match:
+            property_data['date_posted'] = date_match.group(1)
+    
     def scrape_properties(self, max_pages=None):
         """Scrape properties from all pages"""
         all_properties = []
@@ -125,23 +135,32 @@ class AtsogoScraper:
                 logger.warning(f"Could not fetch page {page}")
                 break
             
-            # Parse HTML
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Find property listings
-            property_elements = soup.find_all('div', class_='property_item')
-            
-            if not property_elements:
+            with self.profiler.page(url):
+                # Parse HTML
+                with self.profiler.stage('soup'):
+                    soup = BeautifulSoup(content, 'html.parser')
+                
+                # Find property listings
+                property_elements = soup.find_all('div', class_='property_item')
+                
+                # Extract data from each property
+                page_properties = []
+                for prop_elem in property_elements:
+                    with self.profiler.stage('extract'):
+                        property_data = self.extract_property_data(prop_elem)
+                    if property_data:
+                        page_properties.append(property_data)
+                
+                # Records hold plain strings; free the tree before the next page
+                has_next_page = soup.find('a', string='Next') is not None
+                found_elements = bool(property_elements)
+                decompose_soup(soup)
+                del soup, property_elements
+            
+            if not found_elements:
                 logger.info(f"No more properties found on page {page}")
                 break
             
-            # Extract data from each property
-            page_properties = []
-            for prop_elem in property_elements:
-                property_data = self.extract_property_data(prop_elem)
-                if property_data:
-                    page_properties.append(property_data)
-            
             all_properties.extend(page_properties)
             logger.info(f"Found {len(page_properties)} properties on page {page}")
             
@@ -150,8 +169,7 @@ class AtsogoScraper:
                 break
             
             # Check if there's a next page
-            next_page = soup.find('a', string='Next')
-            if not next_page:
+            if not has_next_page:
                 logger.info("No next page found")
                 break
             
@@ -182,7 +200,7 @@ class AtsogoScraper:
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}")
     
-    def run(self, max_pages=None):
+    def run(self, max_pages=None, filename='atsogo_properties.csv'):
         """Main method to run the scraper"""
         logger.info("Starting Atsogo property scraper")
         
@@ -191,18 +209,22 @@ class AtsogoScraper:
         
         if properties:
             # Save to CSV
-            self.save_to_csv(properties)
+            self.save_to_csv(properties, filename)
             logger.info(f"Scraping completed. Total properties scraped: {len(properties)}")
         else:
             logger.warning("No properties were scraped")
 
 def main():
     """Main function to run the scraper"""
-    scraper = AtsogoScraper()
+    parser = argparse.ArgumentParser(description='Scrape Atsogo property listings')
+    parser.add_argument('--max-pages', type=int, default=None,
+                        help='maximum number of pages to scrape (default: no limit)')
+    parser.add_argument('--output', default='atsogo_properties.csv',
+                        help='CSV file to write (default: atsogo_properties.csv)')
+    args = parser.parse_args()
     
-    # You can limit the number of pages to scrape by setting max_pages
-    # For example: scraper.run(max_pages=3)
-    scraper.run()
+    scraper = AtsogoScraper()
+    scraper.run(max_pages=args.max_pages, filename=args.output)
 
 if __name__ == "__main__":
     main()
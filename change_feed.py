@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from listing_history import listing_fingerprints
+from output_sinks import FIELDNAMES, write_records
+
+logger = logging.getLogger(__name__)
+
+# Columns of a change row; record and changes are JSON strings outside JSON Lines
+CHANGE_FIELDS = ['op', 'fingerprint', 'source', 'run_at', 'record', 'changes']
+
+CHANGE_FORMATS = ['jsonl', 'parquet']
+
+
+def record_state_hash(record):
+    """Hash every output field of a record"""
+    state = '\x1f'.join(str(record.get(field, '')) for field in FIELDNAMES)
+    return hashlib.sha1(state.encode('utf-8')).hexdigest()
+
+
+def field_diff(old, new):
+    """Return {field: [old, new]} for the output fields that differ"""
+    diff = {}
+    for field in FIELDNAMES:
+        before, after = str(old.get(field, '')), str(new.get(field, ''))
+        if before != after:
+            diff[field] = [before, after]
+    return diff
+
+
+class ChangeFeed:
+    """Per-run change-data-capture of listings
+
+    The last exported state of every listing is kept in SQLite by
+    fingerprint with a hash of its fields. A run is compared through two
+    fingerprint -> hash maps (previous and current) for the sources it
+    crawled, so only inserted, updated and removed listings are looked at
+    in full. Updates carry the changed fields; removals carry the last
+    known record. Removals are only emitted for the complete_sources passed
+    to diff() (crawls that ran to the end with no page limit or failed
+    fetch); a partial or missing source does not turn into a mass removal.
+    diff() only computes the changes and apply() stores them, so the state
+    is committed after the feed was written and a feed that fails to write
+    is produced again by the next run.
+    """
+
+    def __init__(self, path='change_state.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS listings (
+                fingerprint TEXT PRIMARY KEY,
+                source TEXT,
+                state_hash TEXT NOT NULL,
+                record TEXT NOT NULL,
+                updated_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_listings_source ON listings (source);
+        ''')
+        self.conn.commit()
+
+    def _previous_hashes(self, sources):
+        """Return {fingerprint: state_hash} of the stored listings of some sources"""
+        hashes = {}
+        for source in sources:
+            hashes.update(self.conn.execute(
+                'SELECT fingerprint, state_hash FROM listings WHERE source = ?', (source,)
+            ).fetchall())
+        return hashes
+
+    def _stored_records(self, fingerprints):
+        """Return {fingerprint: record} of stored listings"""
+        records = {}
+        fingerprints = list(fingerprints)
+        # Stay under SQLite's limit on query parameters
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT fingerprint, record FROM listings WHERE fingerprint IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ).fetchall()
+            records.update((fingerprint, json.loads(record)) for fingerprint, record in rows)
+        return records
+
+    def diff(self, properties, run_at=None, complete_sources=None):
+        """Diff a run against the stored state and return the change rows, without storing anything
+
+        Stored listings missing from the run are removed only for sources in
+        complete_sources; without it the run is treated as partial.
+        """
+        run_at = run_at or datetime.now().isoformat(timespec='seconds')
+        current = {}
+        properties = list(properties)
+        for fingerprint, record in zip(listing_fingerprints(properties), properties):
+            current.setdefault(fingerprint, record)
+        current_hashes = {fingerprint: record_state_hash(record) for fingerprint, record in current.items()}
+        sources = {record.get('source', '') for record in current.values()}
+
+        with self._lock:
+            previous_hashes = self._previous_hashes(sources)
+            inserted = [fingerprint for fingerprint in current_hashes if fingerprint not in previous_hashes]
+            updated = [fingerprint for fingerprint, state_hash in current_hashes.items()
+                       if fingerprint in previous_hashes and previous_hashes[fingerprint] != state_hash]
+            complete = sources & set(complete_sources or ())
+            removed = [fingerprint for fingerprint in self._previous_hashes(complete)
+                       if fingerprint not in current_hashes]
+            old_records = self._stored_records(updated + removed)
+
+        changes = []
+        for fingerprint in inserted:
+            record = current[fingerprint]
+            changes.append({'op': 'insert', 'fingerprint': fingerprint, 'source': record.get('source', ''),
+                            'run_at': run_at, 'record': record, 'changes': None})
+        for fingerprint in updated:
+            record = current[fingerprint]
+            changes.append({'op': 'update', 'fingerprint': fingerprint, 'source': record.get('source', ''),
+                            'run_at': run_at, 'record': record,
+                            'changes': field_diff(old_records[fingerprint], record)})
+        for fingerprint in removed:
+            record = old_records[fingerprint]
+            changes.append({'op': 'delete', 'fingerprint': fingerprint, 'source': record.get('source', ''),
+                            'run_at': run_at, 'record': record, 'changes': None})
+
+        logger.info(f"Change feed: {len(inserted)} inserted, {len(updated)} updated, {len(removed)} removed, "
+                    f"{len(current) - len(inserted) - len(updated)} unchanged")
+        return changes
+
+    def apply(self, changes):
+        """Store the state after a set of change rows; call it once the changes were delivered"""
+        upserts = [(change['fingerprint'], change['source'], record_state_hash(change['record']),
+                    json.dumps(change['record'], ensure_ascii=False), change['run_at'])
+                   for change in changes if change['op'] != 'delete']
+        deletes = [(change['fingerprint'],) for change in changes if change['op'] == 'delete']
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO listings (fingerprint, source, state_hash, record, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?)', upserts
+                )
+                self.conn.executemany('DELETE FROM listings WHERE fingerprint = ?', deletes)
+
+    def capture(self, properties, run_at=None, complete_sources=None):
+        """Diff a run against the stored state, store the new state and return the change rows"""
+        changes = self.diff(properties, run_at, complete_sources)
+        self.apply(changes)
+        return changes
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
+
+
+def write_changes(changes, path, output_format='jsonl'):
+    """Write change rows as JSON Lines (nested) or Parquet (record and changes as JSON strings)"""
+    if output_format not in CHANGE_FORMATS:
+        raise ValueError(f"Unknown change feed format: {output_format}")
+    if output_format != 'jsonl':
+        changes = [{**change,
+                    'record': json.dumps(change['record'], ensure_ascii=False),
+                    'changes': json.dumps(change['changes'], ensure_ascii=False) if change['changes'] else ''}
+                   for change in changes]
+    # A run without changes still replaces the previous feed, so it is not consumed twice
+    write_records(changes, path, output_format, fieldnames=CHANGE_FIELDS, keep_empty=True)
+    logger.info(f"Wrote {len(changes)} changes to {path}")
@@ -0,0 +1,203 @@
+import logging
+import warnings
+
+import numpy as np
+
+from listing_history import split_location
+
+logger = logging.getLogger(__name__)
+
+# Relative importance of each feature group in the distance
+DEFAULT_WEIGHTS = {
+    'location': 3.0,
+    'property_type': 2.0,
+    'transaction_type': 10.0,
+    'bedrooms': 1.0,
+    'bathrooms': 0.5,
+    'area_sqm': 1.0,
+    'price': 1.5,
+}
+
+NUMERIC_FEATURES = ['bedrooms', 'bathrooms', 'area_sqm']
+CATEGORICAL_FEATURES = ['location', 'property_type', 'transaction_type']
+
+# Targets processed per block, bounding the size of the distance matrix
+QUERY_BLOCK_SIZE = 256
+
+
+def _number(value):
+    """Convert a scraped field to a positive float, treating 0 and blanks as missing"""
+    try:
+        number = float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return np.nan
+    return number if number > 0 else np.nan
+
+
+def _location_key(record):
+    """Return a normalized 'CITY|area' key for a record"""
+    city, area = split_location(record.get('location'))
+    return f"{city}|{area.lower()}"
+
+
+def _categorical_value(record, name):
+    """Return the category of a record for one categorical feature"""
+    if name == 'location':
+        return _location_key(record)
+    return str(record.get(name, '')).strip().lower()
+
+
+class ComparablesIndex:
+    """k-nearest-neighbour search for comparable listings
+
+    Each listing becomes a row of a weighted feature matrix: one-hot
+    location/type/transaction columns plus robustly scaled bedrooms,
+    bathrooms, log area and log price. Queries are answered for whole
+    batches at once with matrix products, so valuing thousands of targets
+    costs a few BLAS calls rather than a Python loop per pair.
+    """
+
+    def __init__(self, records, weights=None):
+        self.records = list(records)
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+        # Category vocabularies, one column block per categorical feature
+        self.vocabularies = {}
+        for name in CATEGORICAL_FEATURES:
+            values = sorted({_categorical_value(record, name) for record in self.records})
+            self.vocabularies[name] = {value: i for i, value in enumerate(values)}
+
+        numeric = np.array([[_number(record.get(name)) for name in NUMERIC_FEATURES]
+                            for record in self.records], dtype=np.float64).reshape(-1, len(NUMERIC_FEATURES))
+        numeric[:, 2] = np.log(numeric[:, 2])
+        prices = np.log(np.array([_number(record.get('price')) for record in self.records], dtype=np.float64))
+
+        # Median/IQR scaling keeps placeholder and outlier values from dominating
+        self.numeric_center = self._robust_center(numeric)
+        self.numeric_scale = self._robust_scale(numeric)
+        self.price_center = np.nanmedian(prices) if np.isfinite(prices).any() else 0.0
+        self.price_scale = self._robust_scale(prices[:, None])[0]
+
+        self.has_price = ~np.isnan(prices)
+        self.prices = np.where(self.has_price, prices, self.price_center)
+        scaled_prices = (self.prices - self.price_center) / self.price_scale * np.sqrt(self.weights['price'])
+
+        # Two float32 matrices: with the price column for targets that have a
+        # price, without it for targets that do not
+        features = self._features(self.records, numeric)
+        self.matrix = np.ascontiguousarray(features, dtype=np.float32)
+        self.matrix_with_price = np.ascontiguousarray(np.hstack([features, scaled_prices[:, None]]), dtype=np.float32)
+        self.row_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.row_norms_with_price = np.einsum('ij,ij->i', self.matrix_with_price, self.matrix_with_price)
+        logger.info(f"Comparables index built over {len(self.records)} listings, {self.matrix.shape[1]} features")
+
+    def _robust_center(self, values):
+        """Return the median per column; 0 for a column with no values at all"""
+        if not len(values):
+            return np.zeros(values.shape[1])
+        # An all-missing column (e.g. bathrooms on a source that never gives them) has no median
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            center = np.nanmedian(values, axis=0)
+        return np.where(np.isfinite(center), center, 0.0)
+
+    def _robust_scale(self, values):
+        """Return an IQR-based scale per column, never zero"""
+        if not np.isfinite(values).any():
+            return np.ones(values.shape[1])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            q75, q25 = np.nanpercentile(values, [75, 25], axis=0)
+        scale = (q75 - q25) / 1.349
+        return np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+
+    def _features(self, records, numeric=None):
+        """Build the weighted feature matrix (without price) for records"""
+        if numeric is None:
+            numeric = np.array([[_number(record.get(name)) for name in NUMERIC_FEATURES]
+                                for record in records], dtype=np.float64).reshape(-1, len(NUMERIC_FEATURES))
+            numeric[:, 2] = np.log(numeric[:, 2])
+
+        # Missing values fall back to the median, i.e. contribute no distance on average
+        numeric = np.where(np.isnan(numeric), self.numeric_center, numeric)
+        numeric = (numeric - self.numeric_center) / self.numeric_scale
+        numeric *= np.sqrt([self.weights[name] for name in NUMERIC_FEATURES])
+
+        blocks = [numeric]
+        for name in CATEGORICAL_FEATURES:
+            vocabulary = self.vocabularies[name]
+            one_hot = np.zeros((len(records), len(vocabulary)))
+            for row, record in enumerate(records):
+                column = vocabulary.get(_categorical_value(record, name))
+                if column is not None:
+                    one_hot[row, column] = 1.0
+            # Two different categories are sqrt(2) apart; scale so a mismatch costs the weight
+            blocks.append(one_hot * np.sqrt(self.weights[name] / 2.0))
+
+        return np.hstack(blocks)
+
+    def query_batch(self, targets, k=10, exclude_self=False):
+        """Return (indices, distances) arrays of shape (len(targets), k)
+
+        With exclude_self, targets must be the indexed records in the same
+        order and each one is left out of its own results.
+        """
+        targets = list(targets)
+        k = max(min(k, len(self.records) - (1 if exclude_self else 0)), 0)
+        if k == 0:
+            # Nothing to compare against: an empty index, or a single record excluding itself
+            return np.empty((len(targets), 0), dtype=np.int64), np.empty((len(targets), 0), dtype=np.float32)
+        features = self._features(targets)
+
+        target_prices = np.log(np.array([_number(target.get('price')) for target in targets], dtype=np.float64))
+        target_has_price = ~np.isnan(target_prices)
+        scaled_target_prices = np.where(
+            target_has_price,
+            (target_prices - self.price_center) / self.price_scale * np.sqrt(self.weights['price']),
+            0.0,
+        )
+
+        indices = np.empty((len(targets), k), dtype=np.int64)
+        distances = np.empty((len(targets), k), dtype=np.float32)
+
+        # The price band only counts for targets that have a price
+        groups = [
+            (np.flatnonzero(target_has_price), np.hstack([features, scaled_target_prices[:, None]]),
+             self.matrix_with_price, self.row_norms_with_price),
+            (np.flatnonzero(~target_has_price), features, self.matrix, self.row_norms),
+        ]
+        for rows, query, matrix, row_norms in groups:
+            query = np.ascontiguousarray(query[rows], dtype=np.float32)
+            query_norms = np.einsum('ij,ij->i', query, query)
+            for start in range(0, len(rows), QUERY_BLOCK_SIZE):
+                block = rows[start:start + QUERY_BLOCK_SIZE]
+                # |x - q|^2 = |x|^2 + |q|^2 - 2 x.q, computed in place for the whole block
+                squared = query[start:start + QUERY_BLOCK_SIZE] @ matrix.T
+                squared *= -2.0
+                squared += query_norms[start:start + QUERY_BLOCK_SIZE, None]
+                squared += row_norms[None, :]
+                np.maximum(squared, 0.0, out=squared)
+                if exclude_self:
+                    squared[np.arange(len(block)), block] = np.inf
+
+                nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+                nearest_distances = np.take_along_axis(squared, nearest, axis=1)
+                order = np.argsort(nearest_distances, axis=1)
+                indices[block] = np.take_along_axis(nearest, order, axis=1)
+                distances[block] = np.sqrt(np.take_along_axis(nearest_distances, order, axis=1))
+
+        return indices, distances
+
+    def query(self, target, k=10):
+        """Return the k most comparable listings as (record, distance) pairs"""
+        indices, distances = self.query_batch([target], k)
+        return [(self.records[i], float(d)) for i, d in zip(indices[0], distances[0])]
+
+    def estimate_prices(self, targets, k=10):
+        """Return the median price of each target's comparables that have a price"""
+        indices, _ = self.query_batch(targets, k)
+        prices = np.where(self.has_price[indices], np.exp(self.prices[indices]), np.nan)
+        # Targets whose comparables all lack a price get NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmedian(prices, axis=1)
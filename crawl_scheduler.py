@@ -0,0 +1,184 @@
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from listing_history import listing_fingerprints
+from page_hash_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Starting refresh intervals in seconds; Atsogo posts new listings throughout the day
+DEFAULT_INTERVAL = 6 * 3600
+DEFAULT_INTERVALS = {
+    'atsogo': 15 * 60,
+}
+
+MIN_INTERVAL = 5 * 60
+MAX_INTERVAL = 24 * 3600
+
+# A changed source is re-crawled sooner, an unchanged one later
+SPEEDUP = 0.5
+BACKOFF = 1.5
+
+# How often the loop wakes up to check for a stop request
+POLL_SECONDS = 1.0
+
+
+def listings_digest(properties):
+    """Return a digest of a crawl's listings and prices, independent of their order"""
+    properties = list(properties)
+    keys = sorted(f"{fingerprint}:{record.get('price', '')}"
+                  for fingerprint, record in zip(listing_fingerprints(properties), properties))
+    return content_hash('\n'.join(keys))
+
+
+class CrawlScheduler:
+    """Resident crawl loop with a refresh interval per source
+
+    One scraper, and with it one warm requests.Session, serves every crawl,
+    so connections are reused instead of being set up again by each cron
+    run. Due sources are crawled on a small thread pool. After each crawl the
+    source's interval shrinks if its listings changed and grows if they did
+    not, within [min_interval, max_interval]. Start times are jittered so
+    sources drift apart rather than firing together. Intervals and the last
+    listing digest per source survive restarts in state_path.
+    """
+
+    def __init__(self, scraper, sources, state_path='crawl_schedule.json', workers=2, max_pages=None,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, jitter=0.1, callbacks=None):
+        self.scraper = scraper
+        self.sources = list(sources)
+        self.state_path = state_path
+        self.workers = workers
+        self.max_pages = max_pages
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        # Called in the scheduler thread as callback(site, properties) after each crawl
+        self.callbacks = list(callbacks or [])
+        self._stop = threading.Event()
+        self.state = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+        for site in self.sources:
+            entry = self.state.setdefault(site, {})
+            entry.setdefault('interval', DEFAULT_INTERVALS.get(site, DEFAULT_INTERVAL))
+            entry['interval'] = min(max(entry['interval'], min_interval), max_interval)
+            entry.setdefault('crawls', 0)
+            entry.setdefault('changes', 0)
+
+    def add_callback(self, callback):
+        """Register callback(site, properties), run after each crawl"""
+        self.callbacks.append(callback)
+
+    def save(self):
+        """Write the schedule state"""
+        if self.state_path:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+
+    def stop(self):
+        """Ask the loop to finish running crawls and return"""
+        self._stop.set()
+
+    def _jittered(self, seconds):
+        """Spread a delay by up to +/- jitter of its length"""
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _initial_queue(self):
+        """Schedule each source at its saved next crawl time, or now"""
+        queue = []
+        now = time.monotonic()
+        for site in self.sources:
+            next_crawl = self.state[site].get('next_crawl')
+            delay = max(0.0, next_crawl - time.time()) if next_crawl else 0.0
+            # Sources due at startup are staggered instead of all starting at once
+            delay += random.uniform(0, self.jitter * self.min_interval)
+            heapq.heappush(queue, (now + delay, site))
+        return queue
+
+    def crawl_source(self, site):
+        """Crawl one source; runs on a worker thread"""
+        return self.scraper.scrape_site(site, self.max_pages)
+
+    def finish_crawl(self, site, properties):
+        """Adapt a source's interval to whether it changed and return the next delay"""
+        entry = self.state[site]
+        entry['crawls'] += 1
+        entry['last_crawl'] = datetime.now().isoformat(timespec='seconds')
+
+        if not properties:
+            # An empty crawl is more likely a failure than an empty site; keep the interval
+            logger.warning(f"Crawl of {site} returned no listings; retrying in {entry['interval']:.0f}s")
+        else:
+            digest = listings_digest(properties)
+            previous = entry.get('digest')
+            entry['digest'] = digest
+            if previous is not None and digest != previous:
+                entry['changes'] += 1
+                entry['interval'] = max(self.min_interval, entry['interval'] * SPEEDUP)
+            elif previous is not None:
+                entry['interval'] = min(self.max_interval, entry['interval'] * BACKOFF)
+            logger.info(f"Crawled {site}: {len(properties)} listings, "
+                        f"{'changed' if previous is not None and digest != previous else 'unchanged'}; "
+                        f"next crawl in {entry['interval']:.0f}s")
+
+            for callback in self.callbacks:
+                try:
+                    callback(site, properties)
+                except Exception as e:
+                    logger.error(f"Error in crawl callback for {site}: {e}")
+
+        delay = self._jittered(entry['interval'])
+        entry['next_crawl'] = time.time() + delay
+        self.save()
+        return delay
+
+    def run(self, max_crawls=None):
+        """Crawl due sources until stop() is called (or max_crawls crawls have finished)"""
+        queue = self._initial_queue()
+        running = {}
+        finished = 0
+        logger.info(f"Scheduler started for {', '.join(self.sources)} with {self.workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while running or not self._stop.is_set():
+                now = time.monotonic()
+                while (queue and queue[0][0] <= now and len(running) < self.workers
+                       and not self._stop.is_set()):
+                    _, site = heapq.heappop(queue)
+                    running[executor.submit(self.crawl_source, site)] = site
+
+                timeout = POLL_SECONDS
+                if queue:
+                    timeout = min(timeout, max(0.0, queue[0][0] - now))
+                if running:
+                    done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    self._stop.wait(timeout)
+                    done = set()
+
+                for future in done:
+                    site = running.pop(future)
+                    try:
+                        properties = future.result()
+                    except Exception as e:
+                        logger.error(f"Error crawling {site}: {e}")
+                        properties = []
+                    delay = self.finish_crawl(site, properties)
+                    heapq.heappush(queue, (time.monotonic() + delay, site))
+                    finished += 1
+                    if max_crawls is not None and finished >= max_crawls:
+                        self._stop.set()
+
+        self.save()
+        logger.info(f"Scheduler stopped after {finished} crawls")
+        return finished
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+
+class _ZlibCodec:
+    name = 'zlib'
+    extension = 'gz'
+
+    def compress(self, data):
+        return zlib.compress(data, 6)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class _ZstdCodec:
+    name = 'zstd'
+    extension = 'zst'
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=10)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data):
+        return self._decompressor.decompress(data)
+
+
+def _make_codec(name):
+    """Return the codec called name"""
+    if name == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires zstandard: pip install zstandard")
+        return _ZstdCodec()
+    if name == 'zlib':
+        return _ZlibCodec()
+    raise ValueError(f"Unknown archive codec: {name}")
+
+
+class HtmlArchive:
+    """Append-only archive of fetched pages for offline re-extraction
+
+    Pages are written to numbered segment files as independently compressed
+    records: a JSON header line followed by the page body. An SQLite index
+    maps each record to its segment and byte offset, so any page can be read
+    back without scanning. Identical re-fetches of a URL are stored once.
+    Uses zstd when the zstandard package is installed and zlib otherwise.
+    """
+
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE, codec=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.codec = _make_codec(codec or ('zstd' if zstandard is not None else 'zlib'))
+        self._codecs = {self.codec.name: self.codec}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._index = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self._index.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_site ON pages (site, fetched_at);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_pages_url_hash ON pages (url, content_hash);
+        ''')
+        self._index.commit()
+        self._segment_file = None
+        self._segment_name = None
+
+    def _open_segment(self):
+        """Open the newest segment for appending, starting a new one when full"""
+        if self._segment_file is not None and self._segment_file.tell() < self.segment_size:
+            return
+
+        if self._segment_file is not None:
+            self._segment_file.close()
+
+        existing = sorted(name for name in os.listdir(self.directory) if name.startswith('segment-'))
+        number = len(existing)
+        if existing and os.path.getsize(os.path.join(self.directory, existing[-1])) < self.segment_size \
+                and existing[-1].endswith(self.codec.extension):
+            self._segment_name = existing[-1]
+        else:
+            self._segment_name = f"segment-{number + 1:05d}.warc.{self.codec.extension}"
+        self._segment_file = open(os.path.join(self.directory, self._segment_name), 'ab')
+
+    def append(self, site, url, content, fetched_at=None):
+        """Archive one fetched page; returns False if an identical copy is already stored"""
+        body = content.encode('utf-8')
+        content_hash = hashlib.sha256(body).hexdigest()
+        fetched_at = fetched_at or datetime.now().isoformat(timespec='seconds')
+        header = json.dumps({'site': site, 'url': url, 'fetched_at': fetched_at,
+                             'content_hash': content_hash}).encode('utf-8')
+        record = self.codec.compress(header + b'\n' + body)
+
+        with self._lock:
+            exists = self._index.execute(
+                'SELECT 1 FROM pages WHERE url = ? AND content_hash = ?', (url, content_hash)
+            ).fetchone()
+            if exists:
+                return False
+
+            self._open_segment()
+            offset = self._segment_file.tell()
+            self._segment_file.write(record)
+            self._segment_file.flush()
+            self._index.execute(
+                'INSERT INTO pages (segment, offset, length, codec, site, url, fetched_at, content_hash) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (self._segment_name, offset, len(record), self.codec.name, site, url, fetched_at, content_hash)
+            )
+            self._index.commit()
+        return True
+
+    def _read_record(self, handle, offset, length, codec_name):
+        """Read and decompress one record, returning (header, content)"""
+        if codec_name not in self._codecs:
+            self._codecs[codec_name] = _make_codec(codec_name)
+        handle.seek(offset)
+        data = self._codecs[codec_name].decompress(handle.read(length))
+        header, _, body = data.partition(b'\n')
+        return json.loads(header), body.decode('utf-8')
+
+    def iter_pages(self, sites=None, since=None, until=None):
+        """Yield (site, url, content) for archived pages in segment order"""
+        query = 'SELECT segment, offset, length, codec FROM pages'
+        clauses = []
+        params = []
+        if sites:
+            clauses.append(f"site IN ({', '.join('?' for _ in sites)})")
+            params.extend(sites)
+        if since:
+            clauses.append('fetched_at >= ?')
+            params.append(since)
+        if until:
+            clauses.append('fetched_at < ?')
+            params.append(until)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY segment, offset'
+
+        with self._lock:
+            rows = self._index.execute(query, params).fetchall()
+
+        handle = None
+        current_segment = None
+        try:
+            for segment, offset, length, codec_name in rows:
+                if segment != current_segment:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(os.path.join(self.directory, segment), 'rb')
+                    current_segment = segment
+                header, content = self._read_record(handle, offset, length, codec_name)
+                yield header['site'], header['url'], content
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def page_count(self):
+        """Return the number of archived pages"""
+        with self._lock:
+            return self._index.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def close(self):
+        """Close the open segment and the index"""
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+            self._index.close()
@@ -0,0 +1,245 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+
+# Brotli is only advertised when urllib3 can decode it (pip install brotli)
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+# Connections kept open per host
+DEFAULT_POOL_SIZE = 4
+
+# Failing to connect is quick to detect; slow listing pages get the long read timeout
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 25
+
+# (connect, read) timeouts per host
+HOST_TIMEOUTS = {
+    'atsogo.mw': (5, 15),
+    'sgw.mw': (5, 30),
+    'www.knightfrank.mw': (5, 30),
+    'www.nyumba24.com': (5, 25),
+    'reynolds.mw': (5, 30),
+    'www.4321property.com': (5, 30),
+}
+
+DEFAULT_DNS_TTL = 300
+
+
+class DnsCache:
+    """Thread-safe cache of resolved host addresses
+
+    A crawl opens connections to the same handful of hosts over and over;
+    each lookup keeps every address of the host for ttl seconds. Connections
+    try the addresses in turn, an address that fails moves to the back, and
+    the lookup is dropped once none of them could be reached.
+    """
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """Return the addresses to try, in order, for host"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return list(entry[0])
+            self.misses += 1
+
+        addresses = []
+        for info in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            if info[4][0] not in addresses:
+                addresses.append(info[4][0])
+        with self._lock:
+            self._entries[(host, port)] = (addresses, now + self.ttl)
+        return list(addresses)
+
+    def demote(self, host, port, address):
+        """Move an address that could not be reached behind the other addresses of its host"""
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and address in entry[0]:
+                addresses = [other for other in entry[0] if other != address] + [address]
+                self._entries[(host, port)] = (addresses, entry[1])
+
+    def invalidate(self, host, port):
+        """Forget the cached address of a host"""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class TransportStats:
+    """Requests sent and connections opened per host"""
+
+    def __init__(self):
+        self.requests = {}
+        self.connections = {}
+        self._lock = threading.Lock()
+
+    def count_request(self, host):
+        with self._lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+
+    def count_connection(self, host):
+        with self._lock:
+            self.connections[host] = self.connections.get(host, 0) + 1
+
+    def report(self):
+        """Return {host: {requests, connections, reuse_rate}}; every new HTTPS connection is a TLS handshake"""
+        with self._lock:
+            hosts = sorted(set(self.requests) | set(self.connections))
+            report = {}
+            for host in hosts:
+                requests_sent = self.requests.get(host, 0)
+                connections = self.connections.get(host, 0)
+                reuse_rate = 1 - connections / requests_sent if requests_sent else 0.0
+                report[host] = {'requests': requests_sent, 'connections': connections,
+                                'reuse_rate': max(0.0, reuse_rate)}
+        return report
+
+    def log_summary(self):
+        """Log requests, new connections and the reuse rate per host"""
+        report = self.report()
+        total_requests = sum(entry['requests'] for entry in report.values())
+        total_connections = sum(entry['connections'] for entry in report.values())
+        for host, entry in report.items():
+            logger.info(f"{host}: {entry['requests']} requests over {entry['connections']} connections "
+                        f"({entry['reuse_rate']:.0%} reused)")
+        if total_requests:
+            logger.info(f"Connection reuse: {total_requests} requests, {total_connections} new connections, "
+                        f"{1 - total_connections / total_requests:.0%} reused")
+
+
+def _connection_class(base, dns_cache, stats):
+    """Build a urllib3 connection class that resolves through dns_cache and counts new connections"""
+
+    class CachedConnection(base):
+        def _new_conn(self):
+            host = self._dns_host
+            addresses = [host]
+            if dns_cache is not None and self._tunnel_host is None:
+                addresses = dns_cache.resolve(host, self.port)
+            # host is read from _dns_host, so each cached address is only swapped in
+            # for the TCP connect; TLS still sends and verifies the host name
+            try:
+                for i, address in enumerate(addresses):
+                    self._dns_host = address
+                    try:
+                        sock = super()._new_conn()
+                        break
+                    except Exception:
+                        if dns_cache is None or address == host:
+                            raise
+                        if i == len(addresses) - 1:
+                            # None of the addresses answered; look the host up again next time
+                            dns_cache.invalidate(host, self.port)
+                            raise
+                        dns_cache.demote(host, self.port, address)
+            finally:
+                self._dns_host = host
+            if stats is not None:
+                stats.count_connection(host)
+            return sock
+
+    return CachedConnection
+
+
+class TunedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections use a DNS cache and are counted in TransportStats"""
+
+    def __init__(self, dns_cache=None, stats=None, **kwargs):
+        # Set before HTTPAdapter.__init__, which builds the pool manager
+        self.dns_cache = dns_cache
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        http_pool = type('CachedHTTPConnectionPool', (HTTPConnectionPool,), {
+            'ConnectionCls': _connection_class(HTTPConnection, self.dns_cache, self.stats)})
+        https_pool = type('CachedHTTPSConnectionPool', (HTTPSConnectionPool,), {
+            'ConnectionCls': _connection_class(HTTPSConnection, self.dns_cache, self.stats)})
+        self.poolmanager.pool_classes_by_scheme = {'http': http_pool, 'https': https_pool}
+
+    def send(self, request, **kwargs):
+        if self.stats is not None:
+            self.stats.count_request(urlparse(request.url).hostname)
+        return super().send(request, **kwargs)
+
+
+class TunedSession(requests.Session):
+    """requests.Session with per-host pools and timeouts, a DNS cache and connection reuse stats
+
+    Timeouts: a (connect, read) tuple passed by the caller is used as is;
+    otherwise the host's entry in timeouts wins; otherwise a number passed
+    by the caller is the read timeout, with the default connect timeout.
+    """
+
+    def __init__(self, pool_sizes=None, timeouts=None, default_pool_size=DEFAULT_POOL_SIZE,
+                 dns_ttl=DEFAULT_DNS_TTL, max_retries=0):
+        super().__init__()
+        self.timeouts = dict(HOST_TIMEOUTS if timeouts is None else timeouts)
+        self.stats = TransportStats()
+        self.dns_cache = DnsCache(dns_ttl) if dns_ttl else None
+        self.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING})
+
+        def adapter(pool_size):
+            return TunedAdapter(self.dns_cache, self.stats, pool_maxsize=pool_size, max_retries=max_retries)
+
+        self.mount('https://', adapter(default_pool_size))
+        self.mount('http://', adapter(default_pool_size))
+        for host, pool_size in (pool_sizes or {}).items():
+            # The trailing slash keeps 'https://host' from matching 'https://host.example'
+            self.mount(f'https://{host}/', adapter(pool_size))
+            self.mount(f'http://{host}/', adapter(pool_size))
+
+    def timeout_for(self, url, timeout=None):
+        """Return the (connect, read) timeout for a request"""
+        if isinstance(timeout, tuple):
+            return timeout
+        host_timeout = self.timeouts.get(urlparse(url).hostname)
+        if host_timeout is not None:
+            return tuple(host_timeout)
+        return (DEFAULT_CONNECT_TIMEOUT, timeout or DEFAULT_READ_TIMEOUT)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs['timeout'] = self.timeout_for(url, kwargs.get('timeout'))
+        return super().request(method, url, *args, **kwargs)
+
+
+def create_session(pool_sizes=None, timeouts=None, default_pool_size=DEFAULT_POOL_SIZE, dns_ttl=DEFAULT_DNS_TTL):
+    """Return a TunedSession; share one between scrapers to share its connections"""
+    return TunedSession(pool_sizes=pool_sizes, timeouts=timeouts, default_pool_size=default_pool_size,
+                        dns_ttl=dns_ttl)
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fields that identify a listing across runs; price is deliberately left out
+FINGERPRINT_FIELDS = ['source', 'title', 'property_type', 'transaction_type', 'location', 'date_posted']
+
+# Fields whose changes are recorded as new observations
+TRACKED_FIELDS = [
+    'title', 'property_type', 'transaction_type', 'location', 'price',
+    'area_sqm', 'bedrooms', 'bathrooms', 'description'
+]
+
+
+def _identity_key(record):
+    """Join the identifying fields of a record"""
+    return '\x1f'.join(str(record.get(field, '')).strip().lower() for field in FINGERPRINT_FIELDS)
+
+
+def listing_fingerprint(record):
+    """Return a stable identifier for a listing on its own; use listing_fingerprints for a batch"""
+    return hashlib.sha1(_identity_key(record).encode('utf-8')).hexdigest()
+
+
+def listing_fingerprints(records):
+    """Return the fingerprints of a batch of records (a run or a page), in order
+
+    Generic sites give no date or detail URL, and several listings can share
+    a title such as 'Townhouse for rent in Namiwawa Blantyre'. Records with
+    the same identifying fields but different tracked fields are told apart
+    by their price, then by the order they first appear in; identical
+    records (a card shown twice) keep one fingerprint. A listing without
+    look-alikes gets the same fingerprint as listing_fingerprint().
+    """
+    records = list(records)
+    keys = [_identity_key(record) for record in records]
+    variants = {}
+    for key, record in zip(keys, records):
+        entry = (_state_hash(record), str(record.get('price', '')).strip())
+        seen = variants.setdefault(key, [])
+        if entry not in seen:
+            seen.append(entry)
+
+    fingerprints = []
+    for key, record in zip(keys, records):
+        seen = variants[key]
+        if len(seen) > 1:
+            entry = (_state_hash(record), str(record.get('price', '')).strip())
+            same_price = [variant for variant in seen if variant[1] == entry[1]]
+            key += '\x1f' + entry[1]
+            if len(same_price) > 1:
+                key += '\x1f' + str(same_price.index(entry))
+        fingerprints.append(hashlib.sha1(key.encode('utf-8')).hexdigest())
+    return fingerprints
+
+
+def split_location(location):
+    """Split a location like 'LILONGWE, Area 41,' into (city, area)"""
+    parts = [part.strip() for part in (location or '').split(',') if part.strip()]
+    city = parts[0].upper() if parts else ''
+    area = parts[1] if len(parts) > 1 else ''
+    return city, area
+
+
+def _state_hash(record):
+    """Hash the tracked fields of a record"""
+    state = '\x1f'.join(str(record.get(field, '')) for field in TRACKED_FIELDS)
+    return hashlib.sha1(state.encode('utf-8')).hexdigest()
+
+
+def _to_float(value):
+    """Convert a scraped price to a float, or None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ListingHistory:
+    """Append-only snapshot store of listings across scraper runs
+
+    Every listing gets first_seen/last_seen timestamps. A full observation is
+    only appended when a tracked field changed, so unchanged listings cost a
+    single UPDATE per run and storage grows with changes, not with runs.
+    """
+
+    def __init__(self, path='listing_history.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS listings (
+                fingerprint TEXT PRIMARY KEY,
+                source TEXT,
+                city TEXT,
+                area TEXT,
+                property_type TEXT,
+                transaction_type TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                delisted_at TEXT,
+                price REAL,
+                state_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS observations (
+                fingerprint TEXT NOT NULL,
+                observed_at TEXT NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS price_events (
+                fingerprint TEXT NOT NULL,
+                observed_at TEXT NOT NULL,
+                old_price REAL,
+                new_price REAL
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                observed_at TEXT PRIMARY KEY,
+                sources TEXT NOT NULL,
+                listing_count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_listings_area ON listings (city, area);
+            CREATE INDEX IF NOT EXISTS idx_observations_fp ON observations (fingerprint);
+            CREATE INDEX IF NOT EXISTS idx_price_events_fp ON price_events (fingerprint);
+        ''')
+        self.conn.commit()
+
+    def record_run(self, properties, observed_at=None, complete_sources=None):
+        """Record one scraper run and return counts of new/changed/unchanged/delisted listings
+
+        Listings not seen this run are delisted only for sources in
+        complete_sources (crawls with no page limit or failed fetch).
+        """
+        observed_at = observed_at or datetime.now().isoformat(timespec='seconds')
+        summary = {'new': 0, 'changed': 0, 'unchanged': 0, 'delisted': 0}
+        seen = set()
+        sources = set()
+
+        properties = list(properties)
+        for fingerprint, record in zip(listing_fingerprints(properties), properties):
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            sources.add(record.get('source', ''))
+            self._observe(fingerprint, record, observed_at, summary)
+
+        # Listings of the completely crawled sources that were not seen this run are delisted
+        for source in sources & set(complete_sources or ()):
+            rows = self.conn.execute(
+                'SELECT fingerprint FROM listings WHERE source = ? AND delisted_at IS NULL AND last_seen < ?',
+                (source, observed_at)
+            ).fetchall()
+            for (fingerprint,) in rows:
+                if fingerprint not in seen:
+                    self.conn.execute(
+                        'UPDATE listings SET delisted_at = ? WHERE fingerprint = ?',
+                        (observed_at, fingerprint)
+                    )
+                    summary['delisted'] += 1
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO runs (observed_at, sources, listing_count) VALUES (?, ?, ?)',
+            (observed_at, ','.join(sorted(sources)), len(seen))
+        )
+        self.conn.commit()
+        logger.info(f"Listing history updated: {summary}")
+        return summary
+
+    def _observe(self, fingerprint, record, observed_at, summary):
+        """Apply one observation of a listing"""
+        state_hash = _state_hash(record)
+        price = _to_float(record.get('price'))
+        row = self.conn.execute(
+            'SELECT state_hash, price FROM listings WHERE fingerprint = ?', (fingerprint,)
+        ).fetchone()
+
+        if row is None:
+            city, area = split_location(record.get('location'))
+            self.conn.execute(
+                'INSERT INTO listings (fingerprint, source, city, area, property_type, transaction_type, '
+                'first_seen, last_seen, price, state_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (fingerprint, record.get('source', ''), city, area, record.get('property_type', ''),
+                 record.get('transaction_type', ''), observed_at, observed_at, price, state_hash)
+            )
+            self._append_observation(fingerprint, record, observed_at)
+            summary['new'] += 1
+            return
+
+        old_hash, old_price = row
+        if old_hash == state_hash:
+            # Delta encoding: an unchanged observation only moves last_seen
+            self.conn.execute(
+                'UPDATE listings SET last_seen = ?, delisted_at = NULL WHERE fingerprint = ?',
+                (observed_at, fingerprint)
+            )
+            summary['unchanged'] += 1
+            return
+
+        if price != old_price:
+            self.conn.execute(
+                'INSERT INTO price_events (fingerprint, observed_at, old_price, new_price) VALUES (?, ?, ?, ?)',
+                (fingerprint, observed_at, old_price, price)
+            )
+        self.conn.execute(
+            'UPDATE listings SET last_seen = ?, delisted_at = NULL, price = ?, state_hash = ? WHERE fingerprint = ?',
+            (observed_at, price, state_hash, fingerprint)
+        )
+        self._append_observation(fingerprint, record, observed_at)
+        summary['changed'] += 1
+
+    def _append_observation(self, fingerprint, record, observed_at):
+        """Append the tracked fields of a record as a new observation"""
+        snapshot = {field: record.get(field, '') for field in TRACKED_FIELDS}
+        self.conn.execute(
+            'INSERT INTO observations (fingerprint, observed_at, record) VALUES (?, ?, ?)',
+            (fingerprint, observed_at, json.dumps(snapshot))
+        )
+
+    def listing_timeline(self, fingerprint):
+        """Return the recorded observations of a listing, oldest first"""
+        rows = self.conn.execute(
+            'SELECT observed_at, record FROM observations WHERE fingerprint = ? ORDER BY observed_at',
+            (fingerprint,)
+        ).fetchall()
+        return [(observed_at, json.loads(record)) for observed_at, record in rows]
+
+    def days_on_market(self, city=None, area=None):
+        """Return average and maximum days on market per (city, area)"""
+        query = (
+            'SELECT city, area, COUNT(*), '
+            'AVG(julianday(COALESCE(delisted_at, last_seen)) - julianday(first_seen)), '
+            'MAX(julianday(COALESCE(delisted_at, last_seen)) - julianday(first_seen)) '
+            'FROM listings'
+        )
+        where, params = self._area_filter(city, area)
+        rows = self.conn.execute(query + where + ' GROUP BY city, area ORDER BY city, area', params).fetchall()
+        return [
+            {'city': row[0], 'area': row[1], 'listings': row[2],
+             'avg_days_on_market': round(row[3], 1), 'max_days_on_market': round(row[4], 1)}
+            for row in rows
+        ]
+
+    def price_drops(self, city=None, area=None):
+        """Return every recorded price drop, newest first"""
+        query = (
+            'SELECT l.fingerprint, l.city, l.area, l.property_type, e.observed_at, e.old_price, e.new_price '
+            'FROM price_events e JOIN listings l ON l.fingerprint = e.fingerprint'
+        )
+        where, params = self._area_filter(city, area, prefix='l.')
+        where += (' AND ' if where else ' WHERE ') + 'e.new_price < e.old_price'
+        rows = self.conn.execute(query + where + ' ORDER BY e.observed_at DESC', params).fetchall()
+        return [
+            {'fingerprint': row[0], 'city': row[1], 'area': row[2], 'property_type': row[3],
+             'observed_at': row[4], 'old_price': row[5], 'new_price': row[6]}
+            for row in rows
+        ]
+
+    def _area_filter(self, city, area, prefix=''):
+        """Build a WHERE clause for optional city/area filters"""
+        clauses = []
+        params = []
+        if city:
+            clauses.append(f'{prefix}city = ?')
+            params.append(city.upper())
+        if area:
+            clauses.append(f'{prefix}area = ?')
+            params.append(area)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return where, params
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
@@ -0,0 +1,169 @@
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from listing_history import split_location
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width numeric columns; missing values are NaN
+NUMERIC_COLUMNS = {
+    'price': np.float64,
+    'area_sqm': np.float32,
+    'bedrooms': np.float32,
+    'bathrooms': np.float32,
+}
+
+# Columns stored as int32 codes into the string table
+CATEGORICAL_COLUMNS = ['source', 'city', 'area', 'property_type', 'transaction_type']
+
+# date_posted is stored as int64 seconds since the epoch (UTC)
+MISSING_EPOCH = np.iinfo(np.int64).min
+
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+def _to_float(value):
+    """Convert a scraped number to a float, or NaN"""
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_epoch(value):
+    """Convert a scraped date to epoch seconds, or MISSING_EPOCH"""
+    value = str(value or '').strip()
+    if not value:
+        return MISSING_EPOCH
+    try:
+        posted = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return MISSING_EPOCH
+    if posted.tzinfo is None:
+        posted = posted.replace(tzinfo=timezone.utc)
+    return int(posted.timestamp())
+
+
+def build_listing_store(properties, directory):
+    """Write records to a memory-mappable column store in directory; returns the row count
+
+    Each column is a .npy file (a fixed-width binary array with a small
+    header) and manifest.json holds the string table for the categorical
+    codes. Files are written under temporary names and renamed, so readers
+    never see a half-written store.
+    """
+    os.makedirs(directory, exist_ok=True)
+    numeric = {name: [] for name in NUMERIC_COLUMNS}
+    epochs = []
+    vocabularies = {name: {} for name in CATEGORICAL_COLUMNS}
+    codes = {name: [] for name in CATEGORICAL_COLUMNS}
+
+    for record in properties:
+        for name in NUMERIC_COLUMNS:
+            numeric[name].append(_to_float(record.get(name)))
+        epochs.append(_to_epoch(record.get('date_posted')))
+
+        city, area = split_location(record.get('location'))
+        values = {
+            'source': record.get('source', ''),
+            'city': city,
+            'area': area,
+            'property_type': record.get('property_type', ''),
+            'transaction_type': record.get('transaction_type', ''),
+        }
+        for name in CATEGORICAL_COLUMNS:
+            vocabulary = vocabularies[name]
+            codes[name].append(vocabulary.setdefault(values[name] or '', len(vocabulary)))
+
+    arrays = {name: np.array(values, dtype=NUMERIC_COLUMNS[name]) for name, values in numeric.items()}
+    arrays['date_posted'] = np.array(epochs, dtype=np.int64)
+    for name in CATEGORICAL_COLUMNS:
+        arrays[name] = np.array(codes[name], dtype=np.int32)
+
+    for name, array in arrays.items():
+        path = os.path.join(directory, f'{name}.npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array)
+        os.replace(path + '.tmp', path)
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'rows': len(epochs),
+        'columns': {name: str(array.dtype) for name, array in arrays.items()},
+        'strings': {name: list(vocabularies[name]) for name in CATEGORICAL_COLUMNS},
+    }
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    logger.info(f"Column store written to {directory}: {len(epochs)} listings")
+    return len(epochs)
+
+
+def build_listing_store_from_csv(csv_path, directory):
+    """Build a column store from a scraper CSV"""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return build_listing_store(csv.DictReader(f), directory)
+
+
+class ListingStore:
+    """Read-only, memory-mapped view of a column store
+
+    Opening only reads the manifest and maps the column files, so startup
+    time does not depend on the number of listings; pages are loaded by the
+    OS as columns are touched. Columns are read-only NumPy arrays.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported column store version in {directory}: {manifest.get('version')}")
+
+        self.rows = manifest['rows']
+        self.strings = manifest['strings']
+        self.columns = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+            for name in manifest['columns']
+        }
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, column, value):
+        """Return the code of a categorical value, or -1 when it never occurs"""
+        try:
+            return self.strings[column].index(value)
+        except ValueError:
+            return -1
+
+    def decode(self, column, codes=None):
+        """Return the string values of a categorical column (or of the given codes)"""
+        table = np.array(self.strings[column], dtype=object)
+        return table[self.columns[column] if codes is None else codes]
+
+    def dates(self):
+        """Return date_posted as datetime64[s], NaT where missing"""
+        epochs = self.columns['date_posted']
+        return np.where(epochs == MISSING_EPOCH, np.datetime64('NaT'), epochs.astype('datetime64[s]'))
+
+    def to_frame(self):
+        """Return a pandas DataFrame with categorical columns (requires pandas)"""
+        import pandas as pd
+
+        data = {name: self.columns[name] for name in NUMERIC_COLUMNS}
+        data['date_posted'] = self.dates()
+        for name in CATEGORICAL_COLUMNS:
+            data[name] = pd.Categorical.from_codes(self.columns[name], categories=self.strings[name])
+        return pd.DataFrame(data)
@@ -3,29 +3,160 @@ from bs4 import BeautifulSoup
 import csv
 import time
 import re
+import sys
 import logging
+import threading
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from http_transport import create_session
+from memory_budget import decompose_soup
+from scrape_profiler import NULL_PROFILER
+from selector_learning import page_fingerprint
+from site_discovery import LISTING_INDEX_PATH_RE
+from structured_data import extract_structured_records, merge_structured_records
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+ATSOGO_PROPERTIES_URL = "https://atsogo.mw/listings/properties"
+
+# Pages larger than this are truncated; listing pages are far smaller, so a
+# bigger body is a broken or hostile response that would balloon the DOM
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# Entry points to try in order and the fetch timeout for the single-page sites
+SITE_ENTRY_POINTS = {
+    'sgw': (["https://sgw.mw", "https://sgw.mw/properties", "https://sgw.mw/listings"], 30),
+    'knightfrank': (["https://www.knightfrank.mw"], 30),
+    'nyumba24': (["https://www.nyumba24.com"], 25),
+    'reynolds': (["https://reynolds.mw"], 30),
+    '4321property': (["https://www.4321property.com/malawi"], 30),
+}
+
+SITE_LABELS = {
+    'atsogo': 'Atsogo',
+    'sgw': 'SGW',
+    'knightfrank': 'Knight Frank',
+    'nyumba24': 'Nyumba24',
+    'reynolds': 'Reynolds',
+    '4321property': '4321 Property',
+}
+
+# Selectors tried in turn by the generic site scrapers
+GENERIC_SELECTORS = [
+    'div[class*="property"]',
+    'div[class*="listing"]',
+    'div[class*="item"]',
+    'article[class*="property"]',
+    'article[class*="listing"]',
+    '.property-item',
+    '.listing-item',
+    '.property-card',
+    '.listing-card'
+]
+
+ATSOGO_LOCATION_RE = re.compile(r'(LILONGWE|BLANTYRE|SALIMA|NKHOTAKOTA|MZIMBA|MZUZU|ZOMBA|THYOLO|RUMPHI|NENO|NKHATABAY|NTCHISI|NTCHEU|NSANJE|MCHINJI|MULANJE|MANGOCHI|MACHINGA|LIWONDE|KARONGA|KASUNGU|DOWA|DEDZA|CHIRADZULU|CHIKWAWA|CHITIPA|BALAKA)[^,\n]*')
+PAGE_PARAM_RE = re.compile(r'(?:^|&)(?:page|paged|p)=(\d+)')
+GENERIC_LOCATION_RE = re.compile(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', re.IGNORECASE)
+
+def _as_datetime(value):
+    """Parse a date_posted value or a since argument; None when it is empty or unreadable"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # Listing dates are local and naive; compare everything naive
+    return parsed.replace(tzinfo=None)
+
 class MalawiPropertyScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, hash_cache=None, request_interval=1.0, profiler=None, archive=None,
+                 discovery=None, sink=None, selector_learner=None, xhr_sources=None,
+                 frontier=None, max_page_bytes=MAX_PAGE_BYTES, session=None):
+        # Optional PageHashCache used to skip re-parsing unchanged pages
+        self.hash_cache = hash_cache
+        # Optional HtmlArchive receiving every fetched page for later re-extraction
+        self.archive = archive
+        # Optional SiteDiscovery; discovered feeds and sitemaps replace HTML pagination
+        self.discovery = discovery
+        # Optional output sink; records are written as each page is parsed
+        self.sink = sink
+        # Optional SelectorLearner; the generic sites try their learned card selector first
+        self.selector_learner = selector_learner
+        # Optional XhrSourceRegistry; sites with a registered JSON endpoint skip their HTML shells
+        self.xhr_sources = xhr_sources
+        # Optional UrlFrontier ordering discovered pages and skipping ones fetched in earlier runs
+        self.frontier = frontier
+        # Optional ScrapeProfiler; the null profiler's hooks cost next to nothing
+        self.profiler = profiler or NULL_PROFILER
+        # Upper bound on the HTML kept per page
+        self.max_page_bytes = max_page_bytes
+        # Minimum number of seconds between two requests to the same host
+        self.request_interval = request_interval
+        self._last_request = {}
+        self._rate_lock = threading.Lock()
+        # Tuned transport (pools, timeouts, DNS cache); pass one in to share connections between scrapers
+        self.session = session or create_session()
+        # Sites whose last crawl ran to the end with no page limit and no failed fetch;
+        # only their missing listings may be treated as removed
+        self.complete_sites = set()
+        self._partial_sites = set()
+    
+    def wait_for_host(self, url):
+        """Sleep until the per-host request interval has passed"""
+        if not self.request_interval:
+            return
+        
+        host = urlparse(url).netloc
+        with self._rate_lock:
+            now = time.monotonic()
+            next_slot = max(now, self._last_request.get(host, 0) + self.request_interval)
+            self._last_request[host] = next_slot
+        
+        if next_slot > now:
+            time.sleep(next_slot - now)
     
     def get_page_content(self, url, timeout=25):
         """Fetch page content with error handling"""
+        self.wait_for_host(url)
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response.text
+            with self.profiler.stage('fetch'):
+                response = self.session.get(url, timeout=timeout, stream=True)
+                response.raise_for_status()
+                
+                # Don't download an oversized body only to throw most of it away. A compressed
+                # body's Content-Length is not its decoded size, so it is decompressed as it
+                # streams in and cut off at the cap too
+                length = response.headers.get('Content-Length')
+                oversized = length and length.isdigit() and int(length) > self.max_page_bytes
+                if self.max_page_bytes and (oversized or response.headers.get('Content-Encoding')):
+                    body = bytearray()
+                    for chunk in response.iter_content(chunk_size=65536):
+                        body.extend(chunk)
+                        if len(body) >= self.max_page_bytes:
+                            break
+                    response.close()
+                    if len(body) >= self.max_page_bytes:
+                        logger.warning(f"Page {url} is over {self.max_page_bytes} bytes; keeping the first "
+                                       f"{self.max_page_bytes}")
+                    return bytes(body[:self.max_page_bytes]).decode(response.encoding or 'utf-8', errors='replace')
+                
+                return self.cap_page_size(response.text, url)
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
     
+    def cap_page_size(self, content, url):
+        """Truncate page HTML to max_page_bytes characters"""
+        if self.max_page_bytes and content and len(content) > self.max_page_bytes:
+            logger.warning(f"Page {url} is {len(content)} characters; keeping the first {self.max_page_bytes}")
+            return content[:self.max_page_bytes]
+        return content
+    
     def clean_text(self, text):
         """Clean and normalize text"""
         if not text:
@@ -108,587 +239,566 @@ class MalawiPropertyScraper:
         
         return bedrooms, bathrooms
     
-    def scrape_atsogo(self, max_pages=None):
-        """Scrape properties from Atsogo website"""
-        logger.info("Scraping Atsogo properties...")
-        properties = []
-        page = 1
-        
-        while True:
-            if max_pages and page > max_pages:
-                break
-                
-            url = f"https://atsogo.mw/listings/properties?page={page}" if page > 1 else "https://atsogo.mw/listings/properties"
-            content = self.get_page_content(url)
-            
-            if not content:
-                break
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            property_elements = soup.find_all('div', class_='property_item')
-            
-            if not property_elements:
-                break
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    lines = [line.strip() for line in all_text.split('\n') if line.strip()]
-                    
-                    property_data = {
-                        'source': 'atsogo',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': url
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find('h3')
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract property type and transaction type
-                    for i, line in enumerate(lines):
-                        if line in ['Plot', 'Complete House', 'Land', 'Commercial Property', 'Incompleted House']:
-                            property_data['property_type'] = line
-                            if i + 1 < len(lines) and lines[i + 1] in ['For Sale', 'For rent']:
-                                property_data['transaction_type'] = lines[i + 1]
-                            break
-                    
-                    # Extract location
-                    location_match = re.search(r'(LILONGWE|BLANTYRE|SALIMA|NKHOTAKOTA|MZIMBA|MZUZU|ZOMBA|THYOLO|RUMPHI|NENO|NKHATABAY|NTCHISI|NTCHEU|NSANJE|MCHINJI|MULANJE|MANGOCHI|MACHINGA|LIWONDE|KARONGA|KASUNGU|DOWA|DEDZA|CHIRADZULU|CHIKWAWA|CHITIPA|BALAKA)[^,\n]*', all_text)
-                    if location_match:
-                        for line in lines:
-                            if location_match.group(1) in line:
-                                property_data['location'] = line.strip()
-                                break
-                    
-                    # Extract other details
-                    property_data['price'] = self.extract_price(all_text)
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    bed_bath_match = re.search(r'(\d+)\s+(\d+)\s+Bathroom', all_text)
-                    if bed_bath_match:
-                        property_data['bedrooms'] = bed_bath_match.group(1)
-                        property_data['bathrooms'] = bed_bath_match.group(2)
-                    
-                    date_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})', all_text)
-                    if date_match:
-                        property_data['date_posted'] = date_match.group(1)
-                    
-                    properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting Atsogo property: {e}")
-            
-            page += 1
-            time.sleep(1)
-        
-        logger.info(f"Scraped {len(properties)} properties from Atsogo")
-        return properties
+    def new_property_record(self, source, url):
+        """Return an empty record in the unified output format"""
+        return {
+            'source': source,
+            'title': '',
+            'property_type': '',
+            'transaction_type': '',
+            'location': '',
+            'price': '',
+            'area_sqm': '',
+            'bedrooms': '',
+            'bathrooms': '',
+            'date_posted': '',
+            'description': '',
+            'url': url
+        }
     
-    def scrape_sgw(self, max_pages=None):
-        """Scrape properties from SGW website"""
-        logger.info("Scraping SGW properties...")
-        properties = []
-        
+    def mark_partial(self, site, reason):
+        """Record that the current crawl of a site missed some of its listings"""
+        self._partial_sites.add(site)
+        self.complete_sites.discard(site)
+        logger.info(f"{SITE_LABELS[site]} crawl is partial ({reason}); missing listings are not treated as removed")
+    
+    def track_crawl(self, site, pages):
+        """Yield from pages, marking the site complete if they run to the end without mark_partial"""
+        self.complete_sites.discard(site)
+        self._partial_sites.discard(site)
+        yield from pages
+        if site not in self._partial_sites:
+            self.complete_sites.add(site)
+    
+    def site_base_url(self, site):
+        """Return the homepage of a site"""
+        url = ATSOGO_PROPERTIES_URL if site == 'atsogo' else SITE_ENTRY_POINTS[site][0][0]
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+    
+    def discovered_endpoints(self, site):
+        """Return the discovered sitemaps and feeds of a site, or {} without discovery"""
+        if self.discovery is None:
+            return {}
         try:
-            # Try multiple URLs for SGW
-            urls_to_try = [
-                "https://sgw.mw",
-                "https://sgw.mw/properties",
-                "https://sgw.mw/listings"
-            ]
-            
-            content = None
-            for url in urls_to_try:
-                logger.info(f"Trying SGW URL: {url}")
-                content = self.get_page_content(url, timeout=30)
+            return self.discovery.discover(site, self.site_base_url(site))
+        except Exception as e:
+            logger.error(f"Error discovering endpoints for {SITE_LABELS[site]}: {e}")
+            return {}
+    
+    def fetch_site_pages(self, site, max_pages=None):
+        """Yield (url, content) for each listing page of a site"""
+        listing_pages = self.discovered_endpoints(site).get('listing_pages')
+        if listing_pages and self.frontier is not None:
+            # Pages fetched in earlier runs are skipped, so a frontier crawl never sees every listing
+            self.mark_partial(site, 'frontier crawl')
+            yield from self.fetch_frontier_pages(site, listing_pages, max_pages)
+            return
+        if listing_pages:
+            # The sitemap already enumerates the listing pages
+            if max_pages and len(listing_pages) > max_pages:
+                self.mark_partial(site, f'page limit of {max_pages}')
+            for url in listing_pages[:max_pages]:
+                content = self.get_page_content(url)
                 if content:
+                    self.archive_page(site, url, content)
+                    yield url, content
+                else:
+                    self.mark_partial(site, f'could not fetch {url}')
+            return
+        
+        if site == 'atsogo':
+            page = 1
+            while True:
+                if max_pages and page > max_pages:
+                    self.mark_partial(site, f'page limit of {max_pages}')
                     break
-            
-            if not content:
-                logger.error("Could not fetch any SGW URLs")
-                return properties
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Look for property listings with various selectors
-            selectors = [
-                'div[class*="property"]',
-                'div[class*="listing"]',
-                'div[class*="item"]',
-                'article[class*="property"]',
-                'article[class*="listing"]',
-                '.property-item',
-                '.listing-item',
-                '.property-card',
-                '.listing-card'
-            ]
-            
-            property_elements = []
-            for selector in selectors:
-                elements = soup.select(selector)
-                if elements:
-                    property_elements = elements
-                    logger.info(f"Found {len(elements)} property elements using selector: {selector}")
+                
+                url = f"{ATSOGO_PROPERTIES_URL}?page={page}" if page > 1 else ATSOGO_PROPERTIES_URL
+                content = self.get_page_content(url)
+                if not content:
+                    self.mark_partial(site, f'could not fetch {url}')
                     break
-            
-            # If no specific selectors work, look for any div with property-related text
-            if not property_elements:
-                all_divs = soup.find_all('div')
-                for div in all_divs:
-                    text = div.get_text().lower()
-                    if any(keyword in text for keyword in ['mk', 'price', 'bed', 'bath', 'house', 'plot', 'land', 'rent', 'sale']):
-                        if len(text) > 50:  # Only consider substantial content
-                            property_elements.append(div)
-                logger.info(f"Found {len(property_elements)} potential property divs by text analysis")
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    
-                    property_data = {
-                        'source': 'sgw',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': 'https://sgw.mw'
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find(['h1', 'h2', 'h3', 'h4'])
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract price
-                    property_data['price'] = self.extract_price(all_text)
-                    
-                    # Extract location
-                    location_match = re.search(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', all_text, re.IGNORECASE)
-                    if location_match:
-                        property_data['location'] = location_match.group(0).strip()
-                    
-                    # Extract bedrooms and bathrooms
-                    bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
-                    property_data['bedrooms'] = bedrooms
-                    property_data['bathrooms'] = bathrooms
-                    
-                    # Extract area
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    # Determine transaction type
-                    if 'rent' in all_text.lower() or 'let' in all_text.lower():
-                        property_data['transaction_type'] = 'For Rent'
-                    elif 'sale' in all_text.lower():
-                        property_data['transaction_type'] = 'For Sale'
-                    
-                    # Determine property type
-                    if any(word in all_text.lower() for word in ['house', 'home', 'residential']):
-                        property_data['property_type'] = 'Residential'
-                    elif any(word in all_text.lower() for word in ['commercial', 'office', 'shop', 'warehouse']):
-                        property_data['property_type'] = 'Commercial'
-                    elif any(word in all_text.lower() for word in ['plot', 'land']):
-                        property_data['property_type'] = 'Land'
-                    
-                    if property_data['title'] or property_data['price']:
-                        properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting SGW property: {e}")
-        
-        except Exception as e:
-            logger.error(f"Error scraping SGW: {e}")
+                
+                self.archive_page(site, url, content)
+                yield url, content
+                
+                # Cheap check so the fetcher can stop without waiting for the parse
+                if 'property_item' not in content:
+                    break
+                
+                page += 1
+            return
         
-        logger.info(f"Scraped {len(properties)} properties from SGW")
+        urls_to_try, timeout = SITE_ENTRY_POINTS[site]
+        preferred = self.discovery.preferred_entry_point(site) if self.discovery is not None else None
+        if preferred in urls_to_try:
+            # Start with the entry point that worked last time
+            urls_to_try = [preferred] + [url for url in urls_to_try if url != preferred]
+        
+        for url in urls_to_try:
+            if len(urls_to_try) > 1:
+                logger.info(f"Trying {SITE_LABELS[site]} URL: {url}")
+            content = self.get_page_content(url, timeout=timeout)
+            if content:
+                if self.discovery is not None:
+                    self.discovery.remember_entry_point(site, url)
+                self.archive_page(site, url, content)
+                yield url, content
+                return
+        
+        self.mark_partial(site, 'no entry point could be fetched')
+        if len(urls_to_try) > 1:
+            logger.error(f"Could not fetch any {SITE_LABELS[site]} URLs")
+    
+    def fetch_frontier_pages(self, site, urls, max_pages=None):
+        """Yield (url, content) for discovered pages in frontier order"""
+        hosts = set()
+        for url in urls:
+            parsed = urlparse(url)
+            page = PAGE_PARAM_RE.search(parsed.query)
+            depth = len([part for part in parsed.path.split('/') if part]) + (int(page.group(1)) if page else 0)
+            # Listing index pages change between runs; detail pages are fetched once
+            is_index = bool(page) or LISTING_INDEX_PATH_RE.search(parsed.path) is not None or parsed.path.strip('/') == ''
+            self.frontier.add(url, priority=0 if is_index else 1, depth=depth, data=site, revisit=is_index)
+            hosts.add(parsed.netloc)
+        
+        fetched = 0
+        while not max_pages or fetched < max_pages:
+            item = self.frontier.pop(hosts)
+            if item is None:
+                break
+            url, _ = item
+            content = self.get_page_content(url)
+            fetched += 1
+            if content:
+                self.frontier.mark_fetched(url)
+                self.archive_page(site, url, content)
+                yield url, content
+    
+    def archive_page(self, site, url, content):
+        """Store a fetched page in the archive, if one is configured"""
+        if self.archive is not None:
+            self.archive.append(site, url, content)
+    
+    def parse_page(self, site, content, url):
+        """Parse one fetched page of a site into property records"""
+        content = self.cap_page_size(content, url)
+        if self.hash_cache is not None:
+            cached = self.hash_cache.lookup(url, content)
+            if cached is not None:
+                return cached
+        
+        # Structured data completes the cards and adds listings the card selectors missed
+        parser = getattr(self, f"parse_{site}_page")
+        properties = merge_structured_records(extract_structured_records(self, site, content, url),
+                                              parser(content, url), url)
+        
+        if self.hash_cache is not None:
+            self.hash_cache.store(url, content, properties)
         return properties
     
-    def scrape_knightfrank(self, max_pages=None):
-        """Scrape properties from Knight Frank website"""
-        logger.info("Scraping Knight Frank properties...")
-        properties = []
+    def make_soup(self, content):
+        """Parse page HTML into a BeautifulSoup tree"""
+        with self.profiler.stage('soup'):
+            return BeautifulSoup(content, 'html.parser')
+    
+    def release_soup(self, soup):
+        """Tear down a parsed tree as soon as its records have been copied out"""
+        # Cards and records only hold plain strings, so nothing outlives the tree;
+        # breaking its reference cycles frees it now instead of at the next GC pass
+        with self.profiler.stage('decompose'):
+            decompose_soup(soup)
+    
+    def card_text(self, prop_elem):
+        """Return the full text of a listing card"""
+        with self.profiler.stage('get_text'):
+            return prop_elem.get_text()
+    
+    def match_generic_selector(self, soup):
+        """Return the elements and selector of the first generic selector that matches"""
+        for selector in GENERIC_SELECTORS:
+            elements = soup.select(selector)
+            if elements:
+                logger.info(f"Found {len(elements)} property elements using selector: {selector}")
+                return elements, selector
+        return [], None
+    
+    def scan_property_divs(self, soup):
+        """Find any div with property-related text"""
+        property_elements = []
+        all_divs = soup.find_all('div')
+        for div in all_divs:
+            text = div.get_text().lower()
+            if any(keyword in text for keyword in ['mk', 'price', 'bed', 'bath', 'house', 'plot', 'land', 'rent', 'sale']):
+                if len(text) > 50:  # Only consider substantial content
+                    property_elements.append(div)
+        logger.info(f"Found {len(property_elements)} potential property divs by text analysis")
+        return property_elements
+    
+    def find_property_elements(self, soup):
+        """Find listing cards with the generic selectors, falling back to a text scan"""
+        property_elements, _ = self.match_generic_selector(soup)
         
-        try:
-            content = self.get_page_content("https://www.knightfrank.mw", timeout=30)
-            if not content:
-                return properties
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Look for property listings with various approaches
-            selectors = [
-                'div[class*="property"]',
-                'div[class*="listing"]',
-                'div[class*="item"]',
-                'article[class*="property"]',
-                'article[class*="listing"]',
-                '.property-item',
-                '.listing-item',
-                '.property-card',
-                '.listing-card'
-            ]
-            
-            property_elements = []
-            for selector in selectors:
-                elements = soup.select(selector)
-                if elements:
-                    property_elements = elements
-                    logger.info(f"Found {len(elements)} property elements using selector: {selector}")
-                    break
-            
-            # If no specific selectors work, look for any div with property-related text
-            if not property_elements:
-                all_divs = soup.find_all('div')
-                for div in all_divs:
-                    text = div.get_text().lower()
-                    if any(keyword in text for keyword in ['mk', 'price', 'bed', 'bath', 'house', 'plot', 'land', 'rent', 'sale']):
-                        if len(text) > 50:  # Only consider substantial content
-                            property_elements.append(div)
-                logger.info(f"Found {len(property_elements)} potential property divs by text analysis")
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    
-                    property_data = {
-                        'source': 'knightfrank',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': 'https://www.knightfrank.mw'
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find(['h1', 'h2', 'h3', 'h4', 'h5'])
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract price
-                    property_data['price'] = self.extract_price(all_text)
-                    
-                    # Extract location
-                    location_match = re.search(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', all_text, re.IGNORECASE)
-                    if location_match:
-                        property_data['location'] = location_match.group(0).strip()
-                    
-                    # Extract bedrooms and bathrooms
-                    bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
-                    property_data['bedrooms'] = bedrooms
-                    property_data['bathrooms'] = bathrooms
-                    
-                    # Extract area
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    if property_data['title'] or property_data['price']:
-                        properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting Knight Frank property: {e}")
+        # If no specific selectors work, look for any div with property-related text
+        if not property_elements:
+            property_elements = self.scan_property_divs(soup)
         
-        except Exception as e:
-            logger.error(f"Error scraping Knight Frank: {e}")
+        return property_elements
+    
+    def extract_generic_property(self, prop_elem, source, url, heading_tags):
+        """Extract the fields shared by all generic site scrapers from a listing card"""
+        all_text = self.card_text(prop_elem)
+        property_data = self.new_property_record(source, url)
+        
+        # Extract title
+        title_elem = prop_elem.find(heading_tags)
+        if title_elem:
+            property_data['title'] = self.clean_text(title_elem.get_text())
+        
+        with self.profiler.stage('regex'):
+            # Extract price
+            property_data['price'] = self.extract_price(all_text)
+            
+            # Extract location
+            location_match = GENERIC_LOCATION_RE.search(all_text)
+            if location_match:
+                property_data['location'] = location_match.group(0).strip()
+            
+            # Extract bedrooms and bathrooms
+            bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
+            property_data['bedrooms'] = bedrooms
+            property_data['bathrooms'] = bathrooms
+            
+            # Extract area
+            property_data['area_sqm'] = self.extract_area(all_text)
+        
+        return property_data, all_text
+    
+    def extract_cards(self, source, property_elements, url, extractor):
+        """Run an extractor over listing cards, reusing records of unchanged cards"""
+        properties = []
+        cache_cards = self.hash_cache is not None and self.hash_cache.cache_cards
+        
+        for prop_elem in property_elements:
+            try:
+                card_key = None
+                if cache_cards:
+                    card_key = self.hash_cache.card_key(source, str(prop_elem))
+                    cached = self.hash_cache.lookup_card(card_key)
+                    if cached is not None:
+                        cached['url'] = url
+                        properties.append(cached)
+                        continue
+                
+                with self.profiler.stage('extract'):
+                    property_data = extractor(prop_elem, url)
+                if property_data:
+                    if card_key is not None:
+                        self.hash_cache.store_card(card_key, property_data)
+                    properties.append(property_data)
+                
+            except Exception as e:
+                logger.error(f"Error extracting {SITE_LABELS[source]} property: {e}")
         
-        logger.info(f"Scraped {len(properties)} properties from Knight Frank")
         return properties
     
-    def scrape_nyumba24(self, max_pages=None):
-        """Scrape properties from Nyumba24 website"""
-        logger.info("Scraping Nyumba24 properties...")
-        properties = []
+    def extract_atsogo_property(self, prop_elem, url):
+        """Extract a record from an Atsogo listing card"""
+        all_text = self.card_text(prop_elem)
+        lines = [line.strip() for line in all_text.split('\n') if line.strip()]
+        
+        property_data = self.new_property_record('atsogo', url)
+        
+        # Extract title
+        title_elem = prop_elem.find('h3')
+        if title_elem:
+            property_data['title'] = self.clean_text(title_elem.get_text())
+        
+        # Extract property type and transaction type
+        for i, line in enumerate(lines):
+            if line in ['Plot', 'Complete House', 'Land', 'Commercial Property', 'Incompleted House']:
+                property_data['property_type'] = line
+                if i + 1 < len(lines) and lines[i + 1] in ['For Sale', 'For rent']:
+                    property_data['transaction_type'] = lines[i + 1]
+                break
         
+        with self.profiler.stage('regex'):
+            # Extract location
+            location_match = ATSOGO_LOCATION_RE.search(all_text)
+            if location_match:
+                for line in lines:
+                    if location_match.group(1) in line:
+                        property_data['location'] = line.strip()
+                        break
+            
+            # Extract other details
+            property_data['price'] = self.extract_price(all_text)
+            property_data['area_sqm'] = self.extract_area(all_text)
+            
+            bed_bath_match = re.search(r'(\d+)\s+(\d+)\s+Bathroom', all_text)
+            if bed_bath_match:
+                property_data['bedrooms'] = bed_bath_match.group(1)
+                property_data['bathrooms'] = bed_bath_match.group(2)
+            
+            date_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})', all_text)
+            if date_match:
+                property_data['date_posted'] = date_match.group(1)
+        
+        return property_data
+    
+    def extract_sgw_property(self, prop_elem, url):
+        """Extract a record from an SGW listing card"""
+        property_data, all_text = self.extract_generic_property(
+            prop_elem, 'sgw', url, ['h1', 'h2', 'h3', 'h4'])
+        lower_text = all_text.lower()
+        
+        # Determine transaction type
+        if 'rent' in lower_text or 'let' in lower_text:
+            property_data['transaction_type'] = 'For Rent'
+        elif 'sale' in lower_text:
+            property_data['transaction_type'] = 'For Sale'
+        
+        # Determine property type
+        if any(word in lower_text for word in ['house', 'home', 'residential']):
+            property_data['property_type'] = 'Residential'
+        elif any(word in lower_text for word in ['commercial', 'office', 'shop', 'warehouse']):
+            property_data['property_type'] = 'Commercial'
+        elif any(word in lower_text for word in ['plot', 'land']):
+            property_data['property_type'] = 'Land'
+        
+        if property_data['title'] or property_data['price']:
+            return property_data
+        return None
+    
+    def extract_nyumba24_property(self, prop_elem, url):
+        """Extract a record from a Nyumba24 listing card"""
+        property_data, all_text = self.extract_generic_property(
+            prop_elem, 'nyumba24', url, ['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+        
+        # Determine transaction type
+        if 'rent' in all_text.lower():
+            property_data['transaction_type'] = 'For Rent'
+        elif 'sale' in all_text.lower():
+            property_data['transaction_type'] = 'For Sale'
+        
+        if property_data['title'] or property_data['price']:
+            return property_data
+        return None
+    
+    def extract_basic_property(self, source, prop_elem, url):
+        """Extract a record from a listing card of one of the basic-support sites"""
+        property_data, _ = self.extract_generic_property(
+            prop_elem, source, url, ['h1', 'h2', 'h3', 'h4', 'h5'])
+        
+        if property_data['title'] or property_data['price']:
+            return property_data
+        return None
+    
+    def parse_atsogo_page(self, content, url):
+        """Parse an Atsogo listing page"""
+        soup = self.make_soup(content)
+        try:
+            property_elements = soup.find_all('div', class_='property_item')
+            return self.extract_cards('atsogo', property_elements, url, self.extract_atsogo_property)
+        finally:
+            self.release_soup(soup)
+    
+    def parse_generic_page(self, source, content, url, extractor):
+        """Parse a page of a generic site, trying the site's learned card selector first"""
+        soup = self.make_soup(content)
+        try:
+            learner = self.selector_learner
+            if learner is None:
+                return self.extract_cards(source, self.find_property_elements(soup), url, extractor)
+            
+            # An unchanged layout skips the selector search entirely
+            fingerprint = page_fingerprint(content)
+            selector = learner.selector_for(source, fingerprint)
+            if selector:
+                properties = self.extract_cards(source, soup.select(selector), url, extractor)
+                if learner.record_yield(source, selector, fingerprint, len(properties)):
+                    return properties
+            
+            property_elements, selector = self.match_generic_selector(soup)
+            if not property_elements:
+                property_elements = self.scan_property_divs(soup)
+            properties = self.extract_cards(source, property_elements, url, extractor)
+            learner.learn(source, selector, fingerprint, len(properties))
+            return properties
+        finally:
+            self.release_soup(soup)
+    
+    def parse_sgw_page(self, content, url):
+        """Parse an SGW listing page"""
+        return self.parse_generic_page('sgw', content, url, self.extract_sgw_property)
+    
+    def parse_nyumba24_page(self, content, url):
+        """Parse a Nyumba24 listing page"""
+        soup = self.make_soup(content)
         try:
-            content = self.get_page_content("https://www.nyumba24.com")
-            if not content:
-                return properties
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
             # Look for property listings
             property_elements = soup.find_all(['div', 'article'], class_=re.compile(r'property|listing|item|card', re.IGNORECASE))
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    
-                    property_data = {
-                        'source': 'nyumba24',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': 'https://www.nyumba24.com'
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract price
-                    property_data['price'] = self.extract_price(all_text)
-                    
-                    # Extract location
-                    location_match = re.search(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', all_text, re.IGNORECASE)
-                    if location_match:
-                        property_data['location'] = location_match.group(0).strip()
-                    
-                    # Extract bedrooms and bathrooms
-                    bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
-                    property_data['bedrooms'] = bedrooms
-                    property_data['bathrooms'] = bathrooms
-                    
-                    # Extract area
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    # Determine transaction type
-                    if 'rent' in all_text.lower():
-                        property_data['transaction_type'] = 'For Rent'
-                    elif 'sale' in all_text.lower():
-                        property_data['transaction_type'] = 'For Sale'
-                    
-                    if property_data['title'] or property_data['price']:
-                        properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting Nyumba24 property: {e}")
-        
-        except Exception as e:
-            logger.error(f"Error scraping Nyumba24: {e}")
+            return self.extract_cards('nyumba24', property_elements, url, self.extract_nyumba24_property)
+        finally:
+            self.release_soup(soup)
+    
+    def parse_basic_page(self, source, content, url):
+        """Parse a listing page of one of the basic-support sites"""
+        def extractor(prop_elem, url):
+            return self.extract_basic_property(source, prop_elem, url)
         
-        logger.info(f"Scraped {len(properties)} properties from Nyumba24")
-        return properties
+        return self.parse_generic_page(source, content, url, extractor)
     
-    def scrape_reynolds(self, max_pages=None):
-        """Scrape properties from Reynolds website"""
-        logger.info("Scraping Reynolds properties...")
+    def parse_knightfrank_page(self, content, url):
+        """Parse a Knight Frank listing page"""
+        return self.parse_basic_page('knightfrank', content, url)
+    
+    def parse_reynolds_page(self, content, url):
+        """Parse a Reynolds listing page"""
+        return self.parse_basic_page('reynolds', content, url)
+    
+    def parse_4321property_page(self, content, url):
+        """Parse a 4321 Property listing page"""
+        return self.parse_basic_page('4321property', content, url)
+    
+    def scrape_site(self, site, max_pages=None):
+        """Fetch and parse every listing page of a site"""
+        logger.info(f"Scraping {SITE_LABELS[site]} properties...")
         properties = []
         
         try:
-            content = self.get_page_content("https://reynolds.mw", timeout=30)
-            if not content:
-                return properties
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Look for property listings
-            selectors = [
-                'div[class*="property"]',
-                'div[class*="listing"]',
-                'div[class*="item"]',
-                'article[class*="property"]',
-                'article[class*="listing"]',
-                '.property-item',
-                '.listing-item',
-                '.property-card',
-                '.listing-card'
-            ]
-            
-            property_elements = []
-            for selector in selectors:
-                elements = soup.select(selector)
-                if elements:
-                    property_elements = elements
-                    logger.info(f"Found {len(elements)} property elements using selector: {selector}")
-                    break
-            
-            # If no specific selectors work, look for any div with property-related text
-            if not property_elements:
-                all_divs = soup.find_all('div')
-                for div in all_divs:
-                    text = div.get_text().lower()
-                    if any(keyword in text for keyword in ['mk', 'price', 'bed', 'bath', 'house', 'plot', 'land', 'rent', 'sale']):
-                        if len(text) > 50:  # Only consider substantial content
-                            property_elements.append(div)
-                logger.info(f"Found {len(property_elements)} potential property divs by text analysis")
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    
-                    property_data = {
-                        'source': 'reynolds',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': 'https://reynolds.mw'
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find(['h1', 'h2', 'h3', 'h4', 'h5'])
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract price
-                    property_data['price'] = self.extract_price(all_text)
-                    
-                    # Extract location
-                    location_match = re.search(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', all_text, re.IGNORECASE)
-                    if location_match:
-                        property_data['location'] = location_match.group(0).strip()
-                    
-                    # Extract bedrooms and bathrooms
-                    bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
-                    property_data['bedrooms'] = bedrooms
-                    property_data['bathrooms'] = bathrooms
-                    
-                    # Extract area
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    if property_data['title'] or property_data['price']:
-                        properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting Reynolds property: {e}")
-        
+            for page_properties in self.iter_site_pages(site, max_pages):
+                properties.extend(self.emit_records(page_properties))
         except Exception as e:
-            logger.error(f"Error scraping Reynolds: {e}")
+            logger.error(f"Error scraping {SITE_LABELS[site]}: {e}")
         
-        logger.info(f"Scraped {len(properties)} properties from Reynolds")
+        logger.info(f"Scraped {len(properties)} properties from {SITE_LABELS[site]}")
+        return properties
+    
+    def iter_site_pages(self, site, max_pages=None):
+        """Yield the records of each page of a site, fetching the next page only when asked"""
+        yield from self.track_crawl(site, self.site_record_pages(site, max_pages))
+    
+    def site_record_pages(self, site, max_pages=None):
+        """Yield the records of each page of a site from its feeds, JSON endpoint or HTML pages"""
+        for url, content, page_properties in self.iter_site_content(site, max_pages):
+            if page_properties is None:
+                with self.profiler.page(url):
+                    page_properties = self.parse_page(site, content, url)
+            yield page_properties
+    
+    def iter_site_content(self, site, max_pages=None):
+        """Yield (url, content, records) per page of a site
+        
+        Feeds and JSON endpoints come with their records already mapped
+        (content is None); HTML pages come with records None and still need
+        parse_page, so the parse pipeline can hand them to its workers.
+        """
+        found = False
+        
+        # A structured feed lists everything in a handful of requests; a feed
+        # without plausible listings (a blog feed) leaves the site to HTML
+        for feed_url in self.discovered_endpoints(site).get('feeds', []):
+            page_properties = self.discovery.feed_records(site, feed_url)
+            if page_properties and not found:
+                # Feeds only carry the most recent items
+                self.mark_partial(site, 'read from a feed')
+            found = found or bool(page_properties)
+            yield feed_url, None, page_properties
+        
+        # Client-side rendered sites are read from the JSON their pages load
+        if not found and self.xhr_sources is not None and self.xhr_sources.has_endpoint(site):
+            endpoint_url = self.xhr_sources.endpoints[site]['url']
+            for page_properties in self.xhr_sources.iter_record_pages(self, site, max_pages):
+                found = found or bool(page_properties)
+                yield endpoint_url, None, page_properties
+        
+        if not found:
+            for url, content in self.fetch_site_pages(site, max_pages):
+                yield url, content, None
+    
+    def iter_listings(self, sources=None, since=None, max_pages=None):
+        """Yield listings one by one, fetching pages only as the caller consumes them
+        
+        sources defaults to every site. since (a date, datetime or ISO string)
+        keeps listings posted on or after it, plus listings without a date;
+        listing pages run newest first, so a page whose dated listings are all
+        older ends that site. Stopping iteration stops fetching.
+        """
+        since = _as_datetime(since)
+        for site in sources or SITE_LABELS:
+            if site not in SITE_LABELS:
+                raise ValueError(f"Unknown source: {site}")
+            pages = self.iter_site_pages(site, max_pages)
+            try:
+                for page_properties in pages:
+                    if since is None:
+                        yield from page_properties
+                        continue
+                    
+                    posted = [(_as_datetime(record.get('date_posted')), record) for record in page_properties]
+                    yield from (record for posted_at, record in posted if posted_at is None or posted_at >= since)
+                    dated = [posted_at for posted_at, _ in posted if posted_at is not None]
+                    if dated and max(dated) < since:
+                        break
+            except Exception as e:
+                logger.error(f"Error scraping {SITE_LABELS[site]}: {e}")
+            finally:
+                pages.close()
+    
+    def emit_records(self, properties):
+        """Hand records to the output sink, if any, and return them"""
+        if self.sink is not None:
+            self.sink.write_many(properties)
         return properties
     
+    def scrape_atsogo(self, max_pages=None):
+        """Scrape properties from Atsogo website"""
+        return self.scrape_site('atsogo', max_pages)
+    
+    def scrape_sgw(self, max_pages=None):
+        """Scrape properties from SGW website"""
+        return self.scrape_site('sgw', max_pages)
+    
+    def scrape_knightfrank(self, max_pages=None):
+        """Scrape properties from Knight Frank website"""
+        return self.scrape_site('knightfrank', max_pages)
+    
+    def scrape_nyumba24(self, max_pages=None):
+        """Scrape properties from Nyumba24 website"""
+        return self.scrape_site('nyumba24', max_pages)
+    
+    def scrape_reynolds(self, max_pages=None):
+        """Scrape properties from Reynolds website"""
+        return self.scrape_site('reynolds', max_pages)
+    
     def scrape_4321property(self, max_pages=None):
         """Scrape properties from 4321 Property website"""
-        logger.info("Scraping 4321 Property properties...")
-        properties = []
-        
-        try:
-            content = self.get_page_content("https://www.4321property.com/malawi", timeout=30)
-            if not content:
-                return properties
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Look for property listings
-            selectors = [
-                'div[class*="property"]',
-                'div[class*="listing"]',
-                'div[class*="item"]',
-                'article[class*="property"]',
-                'article[class*="listing"]',
-                '.property-item',
-                '.listing-item',
-                '.property-card',
-                '.listing-card'
-            ]
-            
-            property_elements = []
-            for selector in selectors:
-                elements = soup.select(selector)
-                if elements:
-                    property_elements = elements
-                    logger.info(f"Found {len(elements)} property elements using selector: {selector}")
-                    break
-            
-            # If no specific selectors work, look for any div with property-related text
-            if not property_elements:
-                all_divs = soup.find_all('div')
-                for div in all_divs:
-                    text = div.get_text().lower()
-                    if any(keyword in text for keyword in ['mk', 'price', 'bed', 'bath', 'house', 'plot', 'land', 'rent', 'sale']):
-                        if len(text) > 50:  # Only consider substantial content
-                            property_elements.append(div)
-                logger.info(f"Found {len(property_elements)} potential property divs by text analysis")
-            
-            for prop_elem in property_elements:
-                try:
-                    all_text = prop_elem.get_text()
-                    
-                    property_data = {
-                        'source': '4321property',
-                        'title': '',
-                        'property_type': '',
-                        'transaction_type': '',
-                        'location': '',
-                        'price': '',
-                        'area_sqm': '',
-                        'bedrooms': '',
-                        'bathrooms': '',
-                        'date_posted': '',
-                        'description': '',
-                        'url': 'https://www.4321property.com/malawi'
-                    }
-                    
-                    # Extract title
-                    title_elem = prop_elem.find(['h1', 'h2', 'h3', 'h4', 'h5'])
-                    if title_elem:
-                        property_data['title'] = self.clean_text(title_elem.get_text())
-                    
-                    # Extract price
-                    property_data['price'] = self.extract_price(all_text)
-                    
-                    # Extract location
-                    location_match = re.search(r'(Blantyre|Lilongwe|Mzuzu|Zomba|Limbe|Mangochi|Salima|Nkhotakota|Mchinji|Dowa|Dedza|Ntcheu|Ntchisi|Nkhatabay|Rumphi|Chitipa|Karonga|Kasungu|Machinga|Mulanje|Thyolo|Chikwawa|Nsanje|Chirazulu|Balaka|Neno)[^,\n]*', all_text, re.IGNORECASE)
-                    if location_match:
-                        property_data['location'] = location_match.group(0).strip()
-                    
-                    # Extract bedrooms and bathrooms
-                    bedrooms, bathrooms = self.extract_bedrooms_bathrooms(all_text)
-                    property_data['bedrooms'] = bedrooms
-                    property_data['bathrooms'] = bathrooms
-                    
-                    # Extract area
-                    property_data['area_sqm'] = self.extract_area(all_text)
-                    
-                    if property_data['title'] or property_data['price']:
-                        properties.append(property_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting 4321 Property property: {e}")
-        
-        except Exception as e:
-            logger.error(f"Error scraping 4321 Property: {e}")
-        
-        logger.info(f"Scraped {len(properties)} properties from 4321 Property")
-        return properties
+        return self.scrape_site('4321property', max_pages)
     
-    def scrape_all_websites(self, max_pages_per_site=None):
+    def scrape_all_websites(self, max_pages_per_site=None, parse_workers=None, sites=None, concurrency=1):
         """Scrape properties from all websites"""
+        sites = list(sites or SITE_LABELS)
+        
+        if parse_workers:
+            # Fetch on threads and parse on a process pool instead
+            from parse_pipeline import ParsePipeline
+            pipeline = ParsePipeline(self, max_workers=parse_workers)
+            # Each page goes to the sink as soon as it is parsed
+            return [prop for _, page_properties in pipeline.iter_run(sites, max_pages_per_site)
+                    for prop in self.emit_records(page_properties)]
+        
+        if concurrency > 1:
+            # Sites are on different hosts, so they can be fetched side by side
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = executor.map(lambda site: self.scrape_site(site, max_pages_per_site), sites)
+                return [prop for properties in results for prop in properties]
+        
         all_properties = []
         
         # Scrape from each website
-        scrapers = [
-            ('atsogo', self.scrape_atsogo),
-            ('sgw', self.scrape_sgw),
-            ('knightfrank', self.scrape_knightfrank),
-            ('nyumba24', self.scrape_nyumba24),
-            ('reynolds', self.scrape_reynolds),
-            ('4321property', self.scrape_4321property)
-        ]
+        scrapers = [(site, getattr(self, f"scrape_{site}")) for site in sites]
         
         for site_name, scraper_func in scrapers:
             try:
@@ -724,7 +834,7 @@ class MalawiPropertyScraper:
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}")
     
-    def run(self, max_pages_per_site=None):
+    def run(self, max_pages_per_site=None, history=None):
         """Main method to run the scraper"""
         logger.info("Starting Malawi property scraper")
         
@@ -734,6 +844,10 @@ class MalawiPropertyScraper:
         if properties:
             # Save to CSV
             self.save_to_csv(properties)
+            
+            # Record first/last seen and price changes across runs
+            if history is not None:
+                history.record_run(properties, complete_sources=self.complete_sites)
             logger.info(f"Scraping completed. Total properties scraped: {len(properties)}")
             
             # Print summary by source
@@ -748,13 +862,20 @@ class MalawiPropertyScraper:
         else:
             logger.warning("No properties were scraped")
 
+def iter_listings(sources=None, since=None, max_pages=None, **scraper_options):
+    """Yield listings lazily from a new MalawiPropertyScraper
+    
+    scraper_options are passed to MalawiPropertyScraper, e.g. request_interval.
+    """
+    scraper = MalawiPropertyScraper(**scraper_options)
+    yield from scraper.iter_listings(sources=sources, since=since, max_pages=max_pages)
+
 def main():
     """Main function to run the scraper"""
-    scraper = MalawiPropertyScraper()
-    
-    # You can limit the number of pages to scrape per site
-    # For example: scraper.run(max_pages_per_site=3)
-    scraper.run()
+    # Sources, page limits and output are chosen on the command line;
+    # see `python property_cli.py scrape --help`
+    from property_cli import main as cli_main
+    return cli_main()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
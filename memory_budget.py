@@ -0,0 +1,113 @@
+import logging
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_GROWTH = 1024 * 1024
+DEFAULT_WARMUP_PAGES = 50
+
+
+def decompose_soup(soup):
+    """Destroy a parsed BeautifulSoup tree so it is freed at once, without the cyclic GC"""
+    # BeautifulSoup.decompose() on the document object leaves its children
+    # linked to each other, so the top-level elements are decomposed first
+    for child in list(soup.contents):
+        if hasattr(child, 'decompose'):
+            child.decompose()
+        else:
+            child.extract()
+    soup.decompose()
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Raised when memory keeps growing across pages"""
+
+
+class MemoryBudget:
+    """tracemalloc-based check that per-page memory stays flat
+
+    Call page_done() after each page. Once warmup_pages pages have been
+    processed (caches, compiled regexes and interned strings settle), the
+    traced memory after each page may not rise more than max_growth bytes
+    above the level at the end of warm-up, and, if max_page_peak is set, no
+    page may allocate more than that at its peak.
+    """
+
+    def __init__(self, max_growth=DEFAULT_MAX_GROWTH, max_page_peak=None, warmup_pages=DEFAULT_WARMUP_PAGES):
+        self.max_growth = max_growth
+        self.max_page_peak = max_page_peak
+        self.warmup_pages = warmup_pages
+        self.pages = 0
+        self.baseline = None
+        self.growth = 0
+        self.largest_page_peak = 0
+        self._started_tracing = False
+        self._page_start = 0
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._page_start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def page_done(self, url=''):
+        """Check memory after one page"""
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        page_peak = peak - self._page_start
+        self._page_start = current
+        self.pages += 1
+        self.largest_page_peak = max(self.largest_page_peak, page_peak)
+
+        if self.max_page_peak is not None and page_peak > self.max_page_peak:
+            raise MemoryBudgetExceeded(
+                f"Page {self.pages} ({url}) peaked at {page_peak / 1024:.0f} KiB, "
+                f"budget {self.max_page_peak / 1024:.0f} KiB")
+
+        if self.pages == self.warmup_pages:
+            self.baseline = current
+        elif self.baseline is not None:
+            self.growth = max(self.growth, current - self.baseline)
+            if current - self.baseline > self.max_growth:
+                raise MemoryBudgetExceeded(
+                    f"Memory grew {(current - self.baseline) / 1024:.0f} KiB over {self.pages - self.warmup_pages} "
+                    f"pages after warm-up ({url}), budget {self.max_growth / 1024:.0f} KiB")
+
+    def report(self):
+        """Return the measurements so far"""
+        return {
+            'pages': self.pages,
+            'growth_bytes': self.growth,
+            'largest_page_peak_bytes': self.largest_page_peak,
+        }
+
+
+def replay_pages(scraper, pages, count=1000, budget=None):
+    """Parse (site, url, content) pages count times over under a memory budget
+
+    Pages are cycled until count have been parsed and their records are
+    discarded, so any growth comes from the parse path itself. Give the
+    scraper no hash cache, or repeated pages will not be parsed at all.
+    Raises MemoryBudgetExceeded; returns the budget's report otherwise.
+    """
+    pages = list(pages)
+    if not pages:
+        raise ValueError("No pages to replay")
+    budget = budget or MemoryBudget()
+    with budget:
+        for i in range(count):
+            site, url, content = pages[i % len(pages)]
+            scraper.parse_page(site, content, url)
+            budget.page_done(url)
+
+    report = budget.report()
+    logger.info(f"Replayed {report['pages']} pages: memory grew {report['growth_bytes'] / 1024:.0f} KiB after "
+                f"warm-up, largest page peak {report['largest_page_peak_bytes'] / 1024:.0f} KiB")
+    return report
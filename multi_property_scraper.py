@@ -5,16 +5,16 @@ import time
 import re
 import logging
 
+from http_transport import create_session
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MalawiPropertyScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, session=None):
+        # Tuned transport shared with other scrapers when one is passed in
+        self.session = session or create_session()
     
     def get_page_content(self, url, timeout=15):
         """Fetch page content with error handling"""
@@ -0,0 +1,149 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from output_sinks import FIELDNAMES, NORMALIZED_FIELDNAMES
+
+logger = logging.getLogger(__name__)
+
+# Canonical vocabularies, as used by the generic scrapers
+PROPERTY_TYPES = ['Residential', 'Land', 'Commercial']
+TRANSACTION_TYPES = ['For Sale', 'For Rent']
+
+PROPERTY_TYPE_DTYPE = pd.CategoricalDtype(PROPERTY_TYPES)
+TRANSACTION_TYPE_DTYPE = pd.CategoricalDtype(TRANSACTION_TYPES)
+
+# Raw values per source, lower-cased with single spaces
+PROPERTY_TYPE_ALIASES = {
+    'residential': 'Residential',
+    'complete house': 'Residential',
+    'incompleted house': 'Residential',
+    'incomplete house': 'Residential',
+    'house': 'Residential',
+    'apartment': 'Residential',
+    'flat': 'Residential',
+    'land': 'Land',
+    'plot': 'Land',
+    'plots': 'Land',
+    'farm': 'Land',
+    'commercial': 'Commercial',
+    'commercial property': 'Commercial',
+    'office': 'Commercial',
+    'shop': 'Commercial',
+    'warehouse': 'Commercial',
+}
+
+TRANSACTION_TYPE_ALIASES = {
+    'for sale': 'For Sale',
+    'sale': 'For Sale',
+    'for rent': 'For Rent',
+    'rent': 'For Rent',
+    'to let': 'For Rent',
+    'to rent': 'For Rent',
+    'lease': 'For Rent',
+}
+
+# Raw property types of houses that are not finished yet
+UNDER_CONSTRUCTION_TYPES = {'incompleted house', 'incomplete house'}
+
+# Whole numbers; 0 is a placeholder the sources use for "not given"
+COUNT_COLUMNS = ['bedrooms', 'bathrooms']
+
+# Larger room counts are text run together by get_text() ('MK 450003 Beds'), not rooms
+MAX_ROOM_COUNT = 100
+MEASURE_COLUMNS = ['price', 'area_sqm']
+
+SPACE_RE = re.compile(r'\s+')
+
+
+def _key(value):
+    """Lower-case a raw value and collapse its whitespace"""
+    return SPACE_RE.sub(' ', str(value)).strip().lower()
+
+
+def _map_categorical(values, aliases, dtype):
+    """Map raw strings to a categorical through an alias table
+
+    Only the distinct raw values are looked up (pd.factorize), so the cost
+    of the string work grows with the vocabulary, not with the rows.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([aliases.get(_key(value)) for value in uniques] + [None], dtype=object)
+    unknown = sorted({str(value) for value in uniques if aliases.get(_key(value)) is None and _key(value)})
+    if unknown:
+        logger.warning(f"Unmapped values left missing: {', '.join(unknown)}")
+    # factorize marks missing values with -1, which picks the trailing None
+    return pd.Series(pd.Categorical(mapped[codes], dtype=dtype), index=values.index)
+
+
+def _to_number(values):
+    """Parse numbers like '1,500,000.00' or 'MK 85,000' into float64, NaN when missing or 0"""
+    cleaned = values.astype('string').str.replace(r'[^\d.]', '', regex=True)
+    numbers = pd.to_numeric(cleaned.replace('', pd.NA), errors='coerce').astype('float64')
+    return numbers.where(numbers > 0)
+
+
+def normalize_frame(df):
+    """Return typed, canonical columns for a frame of raw scraped records
+
+    property_type and transaction_type become categoricals over the
+    canonical vocabularies (Atsogo's 'Complete House' and 'Plot' become
+    'Residential' and 'Land', 'For rent' becomes 'For Rent'), with
+    under_construction kept as a flag. Prices and areas are float64, room
+    counts nullable Int16 (counts over MAX_ROOM_COUNT become missing), date_posted datetime64 (UTC), and source, city
+    and area categoricals. Zero placeholders and unreadable values become
+    missing.
+    """
+    df = df.reindex(columns=FIELDNAMES)
+    out = pd.DataFrame(index=df.index)
+    out['source'] = df['source'].fillna('').astype('category')
+    out['title'] = df['title'].fillna('').astype(str)
+    out['property_type'] = _map_categorical(df['property_type'], PROPERTY_TYPE_ALIASES, PROPERTY_TYPE_DTYPE)
+    out['transaction_type'] = _map_categorical(df['transaction_type'], TRANSACTION_TYPE_ALIASES,
+                                               TRANSACTION_TYPE_DTYPE)
+    out['location'] = df['location'].fillna('').astype(str)
+
+    for column in MEASURE_COLUMNS:
+        out[column] = _to_number(df[column])
+    for column in COUNT_COLUMNS:
+        counts = _to_number(df[column]).round()
+        implausible = counts > MAX_ROOM_COUNT
+        if implausible.any():
+            logger.warning(f"{int(implausible.sum())} {column} values over {MAX_ROOM_COUNT} left missing")
+        out[column] = counts.where(~implausible).astype('Int16')
+
+    dates = df['date_posted'].astype('string').str.strip().replace('', pd.NA)
+    out['date_posted'] = pd.to_datetime(dates, errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+    out['description'] = df['description'].fillna('').astype(str)
+    out['url'] = df['url'].fillna('').astype(str)
+
+    parts = out['location'].str.split(',', n=2, expand=True).reindex(columns=[0, 1], fill_value='')
+    out['city'] = parts[0].fillna('').str.strip().str.upper().astype('category')
+    out['area'] = parts[1].fillna('').str.strip().astype('category')
+
+    raw_types = df['property_type'].astype('string').str.strip().str.lower()
+    out['under_construction'] = raw_types.isin(UNDER_CONSTRUCTION_TYPES).fillna(False).astype(bool)
+    return out[NORMALIZED_FIELDNAMES]
+
+
+def normalize_records(records):
+    """Normalize a batch (e.g. one page) of record dicts into a typed DataFrame"""
+    return normalize_frame(pd.DataFrame.from_records(list(records), columns=FIELDNAMES))
+
+
+def normalized_rows(frame):
+    """Turn a normalized frame back into dicts of plain Python values, None where missing
+
+    Dates are written as ISO strings so the rows stay JSON-serializable.
+    """
+    frame = frame.copy()
+    frame['date_posted'] = frame['date_posted'].dt.strftime('%Y-%m-%dT%H:%M:%S')
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def read_normalized_csv(path):
+    """Read a scraper CSV into a normalized DataFrame"""
+    return normalize_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
@@ -0,0 +1,346 @@
+import csv
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = [
+    'source', 'title', 'property_type', 'transaction_type', 'location',
+    'price', 'area_sqm', 'bedrooms', 'bathrooms', 'date_posted', 'description', 'url'
+]
+
+# Written with normalize=True: canonical values plus the location split and a construction flag
+NORMALIZED_FIELDNAMES = FIELDNAMES + ['city', 'area', 'under_construction']
+
+# SQLite column types of the normalized numeric fields; every other column is TEXT
+NORMALIZED_SQLITE_TYPES = {
+    'price': 'REAL',
+    'area_sqm': 'REAL',
+    'bedrooms': 'INTEGER',
+    'bathrooms': 'INTEGER',
+    'under_construction': 'INTEGER',
+}
+
+OUTPUT_FORMATS = ['csv', 'jsonl', 'sqlite', 'parquet']
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Tells the writer thread to flush what it has and exit
+_CLOSE = object()
+
+
+class RecordSink:
+    """Batched record writer with an optional background thread
+
+    Records are buffered and written batch_size at a time, or whenever
+    flush_interval seconds have passed since the last write. In background
+    mode a writer thread owns the file, so writing overlaps with fetching
+    and parsing and the producer only blocks when the queue is full.
+    With normalize=True each batch goes through normalization (requires
+    pandas) on the writer thread, so typed, canonical values are written.
+    Output goes to path + '.tmp' and only replaces path on close() when at
+    least one record was written without errors, so a failed or empty run
+    leaves the previous output in place. A failed write is sticky: later
+    writes and close() raise it and the previous output is kept. Subclasses
+    implement _open() (writing to self.tmp_path), _write_batch() and _close().
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 background=True, fieldnames=None, normalize=False, keep_empty=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self.normalize = normalize
+        # Replace the output even when no record was written (e.g. an empty delta feed)
+        self.keep_empty = keep_empty
+        self.fieldnames = fieldnames or (NORMALIZED_FIELDNAMES if normalize else FIELDNAMES)
+        self.tmp_path = path + '.tmp'
+        self.count = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._error = None
+        self._failed = False
+        self._closed = False
+        self._open()
+
+        if background:
+            self._queue = queue.Queue(maxsize=batch_size * 4)
+            self._thread = threading.Thread(target=self._writer_loop, name=f"sink-{path}", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _raise_writer_error(self):
+        """Re-raise a failed write (from the writer thread) in the caller"""
+        if self._error is not None:
+            raise self._error
+
+    def write(self, record):
+        """Queue one record for writing"""
+        self._raise_writer_error()
+        if self.background:
+            self._queue.put(record)
+        else:
+            self._buffer.append(record)
+            self._maybe_flush()
+
+    def write_many(self, records):
+        """Queue several records for writing"""
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """Write all buffered records now"""
+        if self.background:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+            self._raise_writer_error()
+        else:
+            self._flush_buffer()
+
+    def close(self):
+        """Flush remaining records and close the output"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.background:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        else:
+            try:
+                self._flush_buffer()
+            except Exception as e:
+                logger.error(f"Error writing to {self.path}: {e}")
+        # A run that failed to write some batch never replaces the previous output
+        self._finish((self.count > 0 or self.keep_empty) and not self._failed)
+        self._raise_writer_error()
+        if self.count or self.keep_empty:
+            logger.info(f"Successfully saved {self.count} properties to {self.path}")
+        else:
+            logger.warning(f"No properties written; left {self.path} unchanged")
+
+    def _finish(self, keep):
+        """Close the output and move it into place, or throw it away"""
+        self._close()
+        if keep:
+            os.replace(self.tmp_path, self.path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def _maybe_flush(self):
+        """Flush when the batch is full or the flush interval has passed"""
+        if len(self._buffer) >= self.batch_size or \
+                (self._buffer and time.monotonic() - self._last_flush >= self.flush_interval):
+            self._flush_buffer()
+
+    def _flush_buffer(self):
+        """Write the buffered batch"""
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            if self._failed:
+                # The output is thrown away on close(); don't write to it anymore
+                return
+            try:
+                self._write_batch(self._normalize(batch) if self.normalize else batch)
+            except Exception as e:
+                self._failed = True
+                self._error = e
+                raise
+            self.count += len(batch)
+        self._last_flush = time.monotonic()
+
+    def _writer_loop(self):
+        """Background thread: collect records into batches and write them"""
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+            try:
+                item = self._queue.get(timeout=timeout if self._buffer else None)
+            except queue.Empty:
+                item = None
+
+            try:
+                if item is _CLOSE or isinstance(item, threading.Event):
+                    self._flush_buffer()
+                elif item is not None:
+                    self._buffer.append(item)
+                    self._maybe_flush()
+                else:
+                    self._flush_buffer()
+            except Exception as e:
+                logger.error(f"Error writing to {self.path}: {e}")
+                self._buffer = []
+            finally:
+                if isinstance(item, threading.Event):
+                    # flush() waits on this event, also when the write failed
+                    item.set()
+            if item is _CLOSE:
+                return
+
+    def _normalize(self, batch):
+        """Normalize a batch into dicts of typed values"""
+        from normalization import normalize_records, normalized_rows
+
+        return normalized_rows(normalize_records(batch))
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(RecordSink):
+    """Write records to a CSV file"""
+
+    def _open(self):
+        self._file = open(self.tmp_path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def _write_batch(self, batch):
+        self._writer.writerows(batch)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(RecordSink):
+    """Write records to a JSON Lines file"""
+
+    def _open(self):
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+
+    def _write_batch(self, batch):
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class SqliteSink(RecordSink):
+    """Write records to a SQLite table, one transaction per batch
+
+    Rows go to a staging table that replaces the table on close(); other
+    tables in the database are left alone.
+    """
+
+    def __init__(self, path, table='properties', **kwargs):
+        self.table = table
+        self.staging_table = f'{table}__new'
+        super().__init__(path, **kwargs)
+
+    def _open(self):
+        # The writer thread uses the connection, close() runs in the caller
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Normalized numbers keep numeric affinity so ORDER BY and comparisons work on them
+        types = NORMALIZED_SQLITE_TYPES if self.normalize else {}
+        columns = ', '.join(f"{name} {types.get(name, 'TEXT')}" for name in self.fieldnames)
+        with self._conn:
+            self._conn.execute(f'DROP TABLE IF EXISTS {self.staging_table}')
+            self._conn.execute(f'CREATE TABLE {self.staging_table} ({columns})')
+
+    def _write_batch(self, batch):
+        placeholders = ', '.join('?' for _ in self.fieldnames)
+        with self._conn:
+            self._conn.executemany(
+                f'INSERT INTO {self.staging_table} VALUES ({placeholders})',
+                ([record.get(name, '') for name in self.fieldnames] for record in batch)
+            )
+
+    def _finish(self, keep):
+        """Swap the staging table in, or drop it"""
+        with self._conn:
+            if keep:
+                self._conn.execute(f'DROP TABLE IF EXISTS {self.table}')
+                self._conn.execute(f'ALTER TABLE {self.staging_table} RENAME TO {self.table}')
+            else:
+                self._conn.execute(f'DROP TABLE IF EXISTS {self.staging_table}')
+        self._close()
+
+    def _close(self):
+        self._conn.close()
+
+
+class ParquetSink(RecordSink):
+    """Write records to a Parquet file, one row group per batch (requires pyarrow)"""
+
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+
+        self._pa = pa
+        self._pq = pq
+        self._writer = None
+        if not self.normalize:
+            self._schema = pa.schema([(name, pa.string()) for name in self.fieldnames])
+            self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+
+    def _normalize(self, batch):
+        """Keep normalized batches as typed DataFrames"""
+        from normalization import normalize_records
+
+        return normalize_records(batch)
+
+    def _write_normalized(self, frame):
+        """Write a normalized DataFrame as typed (and dictionary-encoded categorical) columns"""
+        table = self._pa.Table.from_pandas(frame[self.fieldnames], preserve_index=False)
+        if self._writer is None:
+            # The schema comes from the first batch; later batches are cast to it
+            self._writer = self._pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def _write_batch(self, batch):
+        if self.normalize:
+            self._write_normalized(batch)
+            return
+        columns = {name: [str(record.get(name, '')) for record in batch] for name in self.fieldnames}
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def _close(self):
+        if self._writer is None:
+            self._write_normalized(self._normalize([]))
+        self._writer.close()
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'sqlite': SqliteSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_sink(path, output_format='csv', **kwargs):
+    """Open a sink writing to path in one of OUTPUT_FORMATS"""
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return SINKS[output_format](path, **kwargs)
+
+
+def write_records(properties, path, output_format='csv', **kwargs):
+    """Write records to path in one of OUTPUT_FORMATS"""
+    kwargs.setdefault('background', False)
+    with open_sink(path, output_format, **kwargs) as sink:
+        sink.write_many(properties)
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Modules whose code turns pages into records; cached records from other versions are dropped
+EXTRACTOR_MODULES = ['malawi_property_scraper.py', 'structured_data.py']
+
+# Cards not seen for this many seconds are pruned on close()
+DEFAULT_CARD_MAX_AGE = 30 * 24 * 3600
+
+
+def content_hash(text):
+    """Return a stable hash of page or card content"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def extractor_version():
+    """Return a hash of the extractor source, so any parser change invalidates cached records"""
+    digest = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for name in EXTRACTOR_MODULES:
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class PageHashCache:
+    """Remember each page's content hash and the records extracted from it
+
+    A re-crawled page whose hash matches the previous run reuses the stored
+    records and is not parsed at all. With cache_cards enabled, individual
+    listing cards are cached too, so a page whose cards merely shifted
+    still skips per-card extraction.
+
+    The database records the extractor version it was filled by and is
+    emptied when the extractors change, so a parser fix is not hidden by
+    stale records. Cards not seen for card_max_age seconds are pruned on
+    close().
+    """
+
+    def __init__(self, path='page_hashes.sqlite', cache_cards=False, version=None,
+                 card_max_age=DEFAULT_CARD_MAX_AGE):
+        self.path = path
+        self.cache_cards = cache_cards
+        self.version = version or extractor_version()
+        self.card_max_age = card_max_age
+        self.hits = 0
+        self.misses = 0
+        self._seen_cards = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'extractor_version'").fetchone()
+        if row is None or row[0] != self.version:
+            if row is not None:
+                logger.info(f"Extractors changed; clearing cached records in {path}")
+            self._conn.execute('DROP TABLE IF EXISTS pages')
+            self._conn.execute('DROP TABLE IF EXISTS cards')
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('extractor_version', ?)",
+                               (self.version,))
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, records TEXT NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cards ('
+            'card_hash TEXT PRIMARY KEY, record TEXT NOT NULL, last_seen REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def lookup(self, url, content):
+        """Return the stored records if the page is unchanged, otherwise None"""
+        digest = content_hash(content)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content_hash, records FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+
+            if row and row[0] == digest:
+                self.hits += 1
+                return json.loads(row[1])
+
+            self.misses += 1
+            return None
+
+    def store(self, url, content, records):
+        """Store the records extracted from a page under its content hash"""
+        self.store_digest(url, content_hash(content), records)
+
+    def store_digest(self, url, digest, records):
+        """Store the records extracted from a page whose hash is already known"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (url, content_hash, records) VALUES (?, ?, ?)',
+                (url, digest, json.dumps(records))
+            )
+            self._conn.commit()
+
+    def card_key(self, source, card_html):
+        """Return the cache key of a listing card"""
+        return content_hash(f"{source}\n{card_html}")
+
+    def lookup_card(self, card_key):
+        """Return the stored record of an unchanged card, otherwise None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT record FROM cards WHERE card_hash = ?', (card_key,)
+            ).fetchone()
+            if row:
+                # last_seen is refreshed in one go on close()
+                self._seen_cards.add(card_key)
+        return json.loads(row[0]) if row else None
+
+    def store_card(self, card_key, record):
+        """Store the record extracted from a card; committed with the next page"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cards (card_hash, record, last_seen) VALUES (?, ?, ?)',
+                (card_key, json.dumps(record), time.time())
+            )
+
+    def touch_cards(self, card_keys):
+        """Mark cards as seen in this run (e.g. cards a parse worker reused)"""
+        with self._lock:
+            self._seen_cards.update(card_keys)
+
+    def prune(self):
+        """Refresh last_seen of the cards reused this run and drop cards not seen for card_max_age"""
+        now = time.time()
+        with self._lock:
+            seen = list(self._seen_cards)
+            self._seen_cards.clear()
+            # Stay under SQLite's limit on query parameters
+            for i in range(0, len(seen), 500):
+                chunk = seen[i:i + 500]
+                self._conn.execute(
+                    f"UPDATE cards SET last_seen = ? WHERE card_hash IN ({', '.join('?' for _ in chunk)})",
+                    [now] + chunk
+                )
+            pruned = self._conn.execute('DELETE FROM cards WHERE last_seen < ?', (now - self.card_max_age,)).rowcount
+            self._conn.commit()
+        if pruned:
+            logger.info(f"Pruned {pruned} cached cards not seen for {self.card_max_age / 86400:.0f} days")
+
+    def close(self):
+        """Commit pending card records, prune old cards and close the database"""
+        self.prune()
+        with self._lock:
+            self._conn.close()
+        logger.info(f"Page hash cache: {self.hits} unchanged pages reused, {self.misses} parsed")
+
+
+class WorkerCardCache(PageHashCache):
+    """Card cache as seen from a parse worker process
+
+    Cards are read from the shared database, but new ones are only
+    collected; the parent process stores them with the page, so worker
+    processes never write to the database. Pages are looked up and stored by
+    the parent.
+    """
+
+    def __init__(self, path, version=None):
+        super().__init__(path, cache_cards=True, version=version)
+        self.new_cards = {}
+
+    def lookup(self, url, content):
+        return None
+
+    def store_digest(self, url, digest, records):
+        pass
+
+    def store_card(self, card_key, record):
+        self.new_cards[card_key] = record
+
+    def take_card_updates(self):
+        """Return and forget the cards extracted and the cached cards reused since the last call"""
+        cards, self.new_cards = self.new_cards, {}
+        with self._lock:
+            seen = list(self._seen_cards)
+            self._seen_cards.clear()
+        return cards, seen
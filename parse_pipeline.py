@@ -0,0 +1,161 @@
+import collections
+import functools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from page_hash_cache import WorkerCardCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Scraper instance owned by each parse worker process
+_worker_scraper = None
+
+# Marks the end of a fetcher's pages on the queue
+_FETCHER_DONE = object()
+
+
+def _init_parse_worker(scraper_factory, card_cache=None):
+    """Create the per-process scraper used for parsing"""
+    global _worker_scraper
+    _worker_scraper = scraper_factory()
+    if card_cache:
+        path, version = card_cache
+        _worker_scraper.hash_cache = WorkerCardCache(path, version=version)
+
+
+def _parse_in_worker(site, url, content):
+    """Parse one page inside a worker process; returns its records and the card cache updates"""
+    properties = _worker_scraper.parse_page(site, content, url)
+    hash_cache = _worker_scraper.hash_cache
+    return properties, hash_cache.take_card_updates() if hash_cache is not None else ({}, [])
+
+
+class ParsePipeline:
+    """Fetch pages on threads and parse them on a pool of worker processes
+
+    Fetcher threads push raw HTML onto a bounded queue, so fetching blocks
+    once parsing falls behind instead of buffering whole crawls in memory.
+    Pages come from the same source as a serial scrape, so discovered feeds
+    and JSON endpoints are used as well; their records skip the workers.
+    Parsed pages are handed back in order as soon as they are done.
+    Workers are started from a forkserver (spawn where there is none), as
+    forking next to running fetcher threads can copy a held lock into the
+    child. By default each worker builds a scraper of the same class with
+    the same max_page_bytes and a copy of the learned selectors; what the
+    workers learn is not saved, and the profiler only sees the parent's
+    fetches and hash cache hits. With a card cache, workers reuse cached
+    cards and the parent stores the new ones.
+    """
+
+    def __init__(self, scraper, max_workers=None, max_queue_size=32, scraper_factory=None):
+        self.scraper = scraper
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size
+        # Must be picklable; defaults to building a fresh scraper of the same class
+        self.scraper_factory = scraper_factory or functools.partial(
+            type(scraper), max_page_bytes=scraper.max_page_bytes, selector_learner=scraper.selector_learner)
+
+    def _fetch_site(self, site, max_pages, page_queue):
+        """Fetcher thread: push every page of a site onto the queue"""
+        try:
+            pages = self.scraper.track_crawl(site, self.scraper.iter_site_content(site, max_pages))
+            for url, content, records in pages:
+                page_queue.put((site, url, content, records))
+        except Exception as e:
+            logger.error(f"Error fetching pages for {site}: {e}")
+        finally:
+            page_queue.put(_FETCHER_DONE)
+
+    def iter_parsed_pages(self, pages):
+        """Parse an iterable of (site, url, content[, records]) tuples and yield (site, records) in input order
+
+        Pages that come with their records, or are unchanged in the hash
+        cache, are not sent to a worker.
+        """
+        # Bound the number of pages in flight so a large backlog is not
+        # pickled into the pool all at once
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        hash_cache = getattr(self.scraper, 'hash_cache', None)
+        card_cache = None
+        if hash_cache is not None and hash_cache.cache_cards:
+            card_cache = (hash_cache.path, hash_cache.version)
+        pending = collections.deque()
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+        def finish(entry):
+            site, url, digest, result = entry
+            if digest is None:
+                return site, result
+            try:
+                page_properties, (cards, reused_cards) = result.result()
+            except Exception as e:
+                logger.error(f"Error parsing {site} page {url}: {e}")
+                self.scraper.mark_partial(site, f'could not parse {url}')
+                return site, []
+            if hash_cache is not None:
+                for card_key, record in cards.items():
+                    hash_cache.store_card(card_key, record)
+                hash_cache.touch_cards(reused_cards)
+                hash_cache.store_digest(url, digest, page_properties)
+            return site, page_properties
+
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context(start_method),
+                                 initializer=_init_parse_worker,
+                                 initargs=(self.scraper_factory, card_cache)) as executor:
+            for site, url, content, *records in pages:
+                if records and records[0] is not None:
+                    pending.append((site, url, None, records[0]))
+                else:
+                    # Unchanged pages are answered from the hash cache without a worker
+                    cached = hash_cache.lookup(url, content) if hash_cache is not None else None
+                    if cached is not None:
+                        pending.append((site, url, None, cached))
+                    else:
+                        in_flight.acquire()
+                        future = executor.submit(_parse_in_worker, site, url, content)
+                        future.add_done_callback(lambda _: in_flight.release())
+                        digest = content_hash(content) if hash_cache is not None else ''
+                        pending.append((site, url, digest, future))
+
+                # Hand back every finished page at the head of the line
+                while pending and (pending[0][2] is None or pending[0][3].done()):
+                    yield finish(pending.popleft())
+
+            while pending:
+                yield finish(pending.popleft())
+
+    def parse_pages(self, pages):
+        """Parse an iterable of (site, url, content) tuples, keeping input order"""
+        return [record for _, page_properties in self.iter_parsed_pages(pages) for record in page_properties]
+
+    def iter_queued_pages(self, sites, max_pages=None):
+        """Start one fetcher thread per site and yield pages as they arrive"""
+        page_queue = queue.Queue(maxsize=self.max_queue_size)
+        fetchers = [
+            threading.Thread(target=self._fetch_site, args=(site, max_pages, page_queue), daemon=True)
+            for site in sites
+        ]
+        for fetcher in fetchers:
+            fetcher.start()
+
+        remaining = len(fetchers)
+        while remaining:
+            item = page_queue.get()
+            if item is _FETCHER_DONE:
+                remaining -= 1
+                continue
+            yield item
+
+    def iter_run(self, sites, max_pages=None):
+        """Fetch and parse all pages of the given sites, yielding (site, records) per page"""
+        logger.info(f"Parsing with {self.max_workers} worker processes")
+        return self.iter_parsed_pages(self.iter_queued_pages(sites, max_pages))
+
+    def run(self, sites, max_pages=None):
+        """Fetch and parse all pages of the given sites"""
+        return [record for _, page_properties in self.iter_run(sites, max_pages) for record in page_properties]
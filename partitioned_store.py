@@ -0,0 +1,271 @@
+import csv
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+
+from listing_history import listing_fingerprints
+from listing_store import CATEGORICAL_COLUMNS, MISSING_EPOCH, NUMERIC_COLUMNS, ListingStore, _to_epoch, build_listing_store
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'partitions.json'
+FORMAT_VERSION = 1
+
+# Month label of listings without a usable date_posted
+UNDATED_MONTH = 'undated'
+
+# Per-part files next to the column store: the listing fingerprints (sha1 digests)
+# and which rows have not been replaced by a later append
+FINGERPRINTS_NAME = 'fingerprints.npy'
+LIVE_NAME = 'live.npy'
+
+
+def _month_of(epoch):
+    """Return the YYYY-MM partition label of an epoch date"""
+    if epoch == MISSING_EPOCH:
+        return UNDATED_MONTH
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m')
+
+
+def _bound(value):
+    """Convert a date bound (date, datetime or ISO string) to epoch seconds, or None"""
+    if value is None:
+        return None
+    epoch = _to_epoch(value)
+    if epoch == MISSING_EPOCH:
+        raise ValueError(f"Unreadable date: {value}")
+    return epoch
+
+
+def _as_set(value):
+    """Turn a single value or a list of values into a lowercased set, or None for no filter"""
+    if value is None:
+        return None
+    return {str(item).lower() for item in ([value] if isinstance(value, str) else value)}
+
+
+def _save_array(path, array):
+    """Write a .npy file under a temporary name and rename it"""
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+
+def _partition_stats(store):
+    """Return min/max price and date of a column store, None where a column is empty"""
+    prices = np.asarray(store['price'])
+    prices = prices[~np.isnan(prices)]
+    epochs = np.asarray(store['date_posted'])
+    epochs = epochs[epochs != MISSING_EPOCH]
+    return {
+        'price_min': float(prices.min()) if len(prices) else None,
+        'price_max': float(prices.max()) if len(prices) else None,
+        'date_min': int(epochs.min()) if len(epochs) else None,
+        'date_max': int(epochs.max()) if len(epochs) else None,
+    }
+
+
+class PartitionedStore:
+    """Listing history partitioned by source and date_posted month
+
+    Every append() writes, per (source, month) it touches, one new part: a
+    column store (see listing_store) under source=<source>/month=<YYYY-MM>/.
+    A listing appended again (same fingerprint) replaces its row in the
+    older parts of that partition, so queries see each listing once, as of
+    its latest append. partitions.json lists each part with its live row
+    count and min/max price and date. Queries read that manifest first and only open the parts
+    whose source, month and statistics can match, so a query over one
+    month of one source costs the same however much history is kept.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.parts = []
+        manifest_path = os.path.join(root, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported partitioned store version in {root}: {manifest.get('version')}")
+            self.parts = manifest['parts']
+
+    def __len__(self):
+        return sum(part['rows'] for part in self.parts)
+
+    def save(self):
+        """Write the manifest"""
+        os.makedirs(self.root, exist_ok=True)
+        manifest_path = os.path.join(self.root, MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'parts': self.parts}, f, ensure_ascii=False, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def append(self, properties):
+        """Add one run's records as new parts; returns the number of records added"""
+        properties = list(properties)
+        partitions = {}
+        seen = set()
+        for fingerprint, record in zip(listing_fingerprints(properties), properties):
+            # A listing shown twice in one run is stored once
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            key = (record.get('source', '') or 'unknown', _month_of(_to_epoch(record.get('date_posted'))))
+            partitions.setdefault(key, []).append((bytes.fromhex(fingerprint), record))
+
+        next_part = max((part['part'] for part in self.parts), default=0) + 1
+        older_parts = list(self.parts)
+        added = 0
+        for (source, month), entries in sorted(partitions.items()):
+            path = os.path.join(f'source={source}', f'month={month}', f'part-{next_part:05d}')
+            directory = os.path.join(self.root, path)
+            build_listing_store([record for _, record in entries], directory)
+            _save_array(os.path.join(directory, FINGERPRINTS_NAME),
+                        np.array([fingerprint for fingerprint, _ in entries], dtype='S20'))
+            store = ListingStore(directory)
+            self.parts.append({'part': next_part, 'source': source, 'month': month, 'path': path,
+                               'rows': len(entries), **_partition_stats(store)})
+            next_part += 1
+            added += len(entries)
+
+        # The manifest is written last, so readers never see a part that is not complete;
+        # older rows are only hidden once the parts replacing them are listed
+        self.save()
+        self._replace_older_rows(older_parts, partitions)
+        logger.info(f"Appended {added} listings to {self.root} in {len(partitions)} partitions")
+        return added
+
+    def _replace_older_rows(self, older_parts, partitions):
+        """Hide the rows of older parts whose listing was appended again, dropping emptied parts"""
+        changed = False
+        emptied = []
+        for part in older_parts:
+            entries = partitions.get((part['source'], part['month']))
+            directory = os.path.join(self.root, part['path'])
+            fingerprints_path = os.path.join(directory, FINGERPRINTS_NAME)
+            # Parts written before fingerprints were kept cannot be matched
+            if not entries or not os.path.exists(fingerprints_path):
+                continue
+            replaced = np.isin(np.load(fingerprints_path), np.array([fp for fp, _ in entries], dtype='S20'))
+            live = self._live_rows(part)
+            if live is not None:
+                replaced &= live
+            if not replaced.any():
+                continue
+            live = ~replaced if live is None else live & ~replaced
+            part['rows'] = int(live.sum())
+            changed = True
+            if part['rows']:
+                _save_array(os.path.join(directory, LIVE_NAME), live)
+            else:
+                emptied.append(part)
+
+        if not changed:
+            return
+        self.parts = [part for part in self.parts if part not in emptied]
+        self.save()
+        for part in emptied:
+            shutil.rmtree(os.path.join(self.root, part['path']), ignore_errors=True)
+
+    def _live_rows(self, part):
+        """Return the live-row mask of a part, or None when none of its rows were replaced"""
+        path = os.path.join(self.root, part['path'], LIVE_NAME)
+        return np.load(path) if os.path.exists(path) else None
+
+    def select_parts(self, sources=None, start=None, end=None, min_price=None, max_price=None):
+        """Return the manifest entries of the parts a query can match
+
+        start is inclusive and end exclusive (date, datetime or ISO string).
+        Undated listings only match queries without a date bound.
+        """
+        sources = _as_set(sources)
+        start, end = _bound(start), _bound(end)
+        start_month = _month_of(start) if start is not None else None
+        end_month = _month_of(end - 1) if end is not None else None
+
+        selected = []
+        for part in self.parts:
+            if sources is not None and part['source'].lower() not in sources:
+                continue
+            if start is not None or end is not None:
+                if part['month'] == UNDATED_MONTH or part['date_min'] is None:
+                    continue
+                if start is not None and (part['month'] < start_month or part['date_max'] < start):
+                    continue
+                if end is not None and (part['month'] > end_month or part['date_min'] >= end):
+                    continue
+            if min_price is not None or max_price is not None:
+                if part['price_min'] is None:
+                    continue
+                if min_price is not None and part['price_max'] < min_price:
+                    continue
+                if max_price is not None and part['price_min'] > max_price:
+                    continue
+            selected.append(part)
+        return selected
+
+    def iter_selected(self, sources=None, start=None, end=None, min_price=None, max_price=None, **categories):
+        """Yield (part, store, mask) for each selected part with rows matching the query
+
+        categories filter the categorical columns (city, area, property_type,
+        transaction_type) by a value or a list of values; like sources, they
+        are matched regardless of case.
+        """
+        unknown = set(categories) - set(CATEGORICAL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        start_epoch, end_epoch = _bound(start), _bound(end)
+
+        for part in self.select_parts(sources, start, end, min_price, max_price):
+            store = ListingStore(os.path.join(self.root, part['path']))
+            wanted = {}
+            for column, values in categories.items():
+                values = _as_set(values)
+                wanted[column] = [code for code, value in enumerate(store.strings[column]) if value.lower() in values]
+            # A part whose string table lacks a requested value is skipped before touching its columns
+            if not all(wanted.values()):
+                continue
+            live = self._live_rows(part)
+            mask = np.ones(len(store), dtype=bool) if live is None else live.copy()
+            epochs = store['date_posted']
+            if start_epoch is not None:
+                mask &= (epochs != MISSING_EPOCH) & (epochs >= start_epoch)
+            if end_epoch is not None:
+                mask &= (epochs != MISSING_EPOCH) & (epochs < end_epoch)
+            if min_price is not None:
+                mask &= store['price'] >= min_price
+            if max_price is not None:
+                mask &= store['price'] <= max_price
+            for column, codes in wanted.items():
+                mask &= np.isin(store[column], codes)
+            if mask.any():
+                yield part, store, mask
+
+    def query(self, sources=None, start=None, end=None, min_price=None, max_price=None, **categories):
+        """Return the matching listings as a pandas DataFrame (requires pandas)"""
+        import pandas as pd
+
+        frames = [store.to_frame()[mask] for _, store, mask in
+                  self.iter_selected(sources, start, end, min_price, max_price, **categories)]
+        if not frames:
+            return pd.DataFrame(columns=[*NUMERIC_COLUMNS, 'date_posted', *CATEGORICAL_COLUMNS])
+        frame = pd.concat(frames, ignore_index=True)
+        # Parts have their own string tables; align the categoricals again
+        for column in CATEGORICAL_COLUMNS:
+            frame[column] = frame[column].astype('category')
+        return frame
+
+    def count(self, sources=None, start=None, end=None, min_price=None, max_price=None, **categories):
+        """Return the number of matching listings without building a DataFrame"""
+        return sum(int(mask.sum()) for _, _, mask in
+                   self.iter_selected(sources, start, end, min_price, max_price, **categories))
+
+
+def build_partitioned_store_from_csv(csv_path, root):
+    """Append a scraper CSV to a partitioned store"""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return PartitionedStore(root).append(csv.DictReader(f))
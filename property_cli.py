@@ -0,0 +1,718 @@
+import argparse
+import itertools
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Kept in sync with SITE_LABELS in malawi_property_scraper; duplicated here so
+# that --help does not have to import requests and BeautifulSoup
+SOURCES = ['atsogo', 'sgw', 'knightfrank', 'nyumba24', 'reynolds', '4321property']
+
+OUTPUT_FORMATS = ['csv', 'jsonl', 'sqlite', 'parquet']
+
+
+def run_profiled(func, profile_path):
+    """Run func under cProfile, dumping stats to profile_path or printing a summary"""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        if profile_path and profile_path != '-':
+            profiler.dump_stats(profile_path)
+            logger.info(f"Profile written to {profile_path}")
+        else:
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(30)
+
+
+def host_pool_size(option):
+    """Parse a --pool-size HOST=N value into (host, n)"""
+    host, _, size = option.partition('=')
+    try:
+        size = int(size)
+    except ValueError:
+        size = 0
+    if not host or size < 1:
+        raise argparse.ArgumentTypeError(f"expected HOST=N with N a positive integer, got '{option}'")
+    return host, size
+
+
+def host_timeout(option):
+    """Parse a --host-timeout HOST=CONNECT[,READ] value into (host, (connect, read))"""
+    host, _, values = option.partition('=')
+    connect, _, read = values.partition(',')
+    try:
+        timeout = (float(connect), float(read or connect))
+    except ValueError:
+        timeout = None
+    if not host or timeout is None or min(timeout) <= 0:
+        raise argparse.ArgumentTypeError(f"expected HOST=CONNECT[,READ] in seconds, got '{option}'")
+    return host, timeout
+
+
+def build_session(args):
+    """Create the tuned HTTP transport from the --pool-size, --host-timeout and --dns-ttl options"""
+    from http_transport import HOST_TIMEOUTS, create_session
+
+    timeouts = dict(HOST_TIMEOUTS)
+    timeouts.update(args.host_timeout)
+    return create_session(pool_sizes=dict(args.pool_size), timeouts=timeouts, dns_ttl=args.dns_ttl)
+
+
+def command_scrape(args):
+    """Scrape the selected sources and write the records"""
+    from malawi_property_scraper import MalawiPropertyScraper
+    from output_sinks import open_sink
+
+    hash_cache = None
+    if args.cache_dir:
+        from page_hash_cache import PageHashCache
+        os.makedirs(args.cache_dir, exist_ok=True)
+        hash_cache = PageHashCache(os.path.join(args.cache_dir, 'page_hashes.sqlite'))
+
+    profiler = None
+    if args.profile_stages:
+        from scrape_profiler import ScrapeProfiler
+        profiler = ScrapeProfiler(trace_memory=args.trace_memory)
+        if args.trace_memory and args.concurrency > 1:
+            logger.warning("--trace-memory only samples pages that do not overlap another page; "
+                           "use --concurrency 1 for a figure on every page")
+
+    archive = None
+    if args.archive:
+        from html_archive import HtmlArchive
+        archive = HtmlArchive(args.archive)
+
+    # Records are written in batches on a background thread while scraping continues
+    output = args.output or f"malawi_properties.{args.format}"
+    sink = open_sink(output, args.format, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                     normalize=args.normalize)
+
+    session = build_session(args)
+    scraper = MalawiPropertyScraper(hash_cache=hash_cache, request_interval=args.rate_limit,
+                                    profiler=profiler, archive=archive, sink=sink, session=session)
+    if args.discover:
+        from site_discovery import SiteDiscovery
+        cache_path = os.path.join(args.cache_dir or '.', 'discovered_endpoints.json')
+        scraper.discovery = SiteDiscovery(scraper, cache_path=cache_path)
+    if args.frontier:
+        from url_frontier import UrlFrontier
+        scraper.frontier = UrlFrontier(args.frontier, politeness=args.rate_limit)
+    if args.xhr_endpoints:
+        from xhr_sources import XhrSourceRegistry
+        scraper.xhr_sources = XhrSourceRegistry(args.xhr_endpoints)
+    if args.learn_selectors:
+        from selector_learning import SelectorLearner
+        cache_path = os.path.join(args.cache_dir or '.', 'learned_selectors.json')
+        scraper.selector_learner = SelectorLearner(cache_path)
+
+    def scrape():
+        return scraper.scrape_all_websites(
+            args.max_pages,
+            parse_workers=args.parse_workers,
+            sites=args.sources,
+            concurrency=args.concurrency,
+        )
+
+    write_failed = False
+    try:
+        if args.profile is not None:
+            properties = run_profiled(scrape, args.profile)
+        else:
+            properties = scrape()
+    finally:
+        try:
+            sink.close()
+        except Exception as e:
+            # The previous output is left in place; the other state is still saved below
+            logger.error(f"Error saving to {output}, left it unchanged: {e}")
+            write_failed = True
+        if hash_cache is not None:
+            hash_cache.close()
+        if archive is not None:
+            archive.close()
+        if scraper.discovery is not None:
+            scraper.discovery.save()
+        if scraper.selector_learner is not None:
+            scraper.selector_learner.save()
+        if scraper.frontier is not None:
+            scraper.frontier.save()
+        if profiler is not None:
+            profiler.log_summary()
+            profiler.write_collapsed(args.profile_stages)
+            profiler.close()
+        session.stats.log_summary()
+
+    if not properties:
+        logger.warning("No properties were scraped")
+        return 1
+    if write_failed:
+        return 1
+
+    if args.index:
+        from search_index import ListingSearchIndex
+        index = ListingSearchIndex(args.index)
+        index.add_records(properties)
+        index.close()
+
+    if args.alerts:
+        from saved_searches import SavedSearchPercolator, open_alert_sink
+        percolator = SavedSearchPercolator(args.alerts)
+        percolator.percolate(properties, open_alert_sink(args.alert_sink))
+        percolator.close()
+
+    if args.changes:
+        export_changes(properties, args.change_state, args.changes, args.changes_format,
+                       complete_sources=scraper.complete_sites)
+    return 0
+
+
+def export_changes(properties, state_path, output, output_format, complete_sources=None):
+    """Diff records against the change-feed state and write the inserted/updated/removed listings"""
+    from change_feed import ChangeFeed, write_changes
+
+    feed = ChangeFeed(state_path)
+    try:
+        changes = feed.diff(properties, complete_sources=complete_sources)
+        # The state is only stored once the feed is written, so a failed write loses no changes
+        write_changes(changes, output, output_format)
+        feed.apply(changes)
+    finally:
+        feed.close()
+
+
+def command_schedule(args):
+    """Keep crawling each source on its own adaptive interval until interrupted"""
+    import signal
+    from datetime import datetime
+
+    from crawl_scheduler import CrawlScheduler
+    from malawi_property_scraper import MalawiPropertyScraper
+
+    hash_cache = None
+    if args.cache_dir:
+        from page_hash_cache import PageHashCache
+        os.makedirs(args.cache_dir, exist_ok=True)
+        hash_cache = PageHashCache(os.path.join(args.cache_dir, 'page_hashes.sqlite'))
+
+    scraper = MalawiPropertyScraper(hash_cache=hash_cache, request_interval=args.rate_limit)
+    scheduler = CrawlScheduler(scraper, args.sources, state_path=args.state, workers=args.workers,
+                               max_pages=args.max_pages, min_interval=args.min_interval,
+                               max_interval=args.max_interval, jitter=args.jitter)
+
+    closers = []
+    if args.history:
+        from listing_history import ListingHistory
+        history = ListingHistory(args.history)
+        scheduler.add_callback(lambda site, properties: history.record_run(
+            properties, complete_sources=scraper.complete_sites & {site}))
+        closers.append(history.close)
+    if args.index:
+        from search_index import ListingSearchIndex
+        index = ListingSearchIndex(args.index)
+        scheduler.add_callback(lambda site, properties: index.add_records(properties))
+        closers.append(index.close)
+    if args.output_dir:
+        from output_sinks import write_records
+        os.makedirs(args.output_dir, exist_ok=True)
+
+        def write_snapshot(site, properties):
+            stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+            write_records(properties, os.path.join(args.output_dir, f"{site}-{stamp}.{args.format}"), args.format)
+
+        scheduler.add_callback(write_snapshot)
+    if hash_cache is not None:
+        closers.append(hash_cache.close)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        scheduler.run(max_crawls=args.max_crawls)
+    except KeyboardInterrupt:
+        # Leaving the worker pool already waited for running crawls
+        logger.info("Scheduler interrupted")
+    finally:
+        for close in closers:
+            close()
+        scraper.session.stats.log_summary()
+    return 0
+
+
+def command_enqueue(args):
+    """Plan a crawl as work units in a shared queue"""
+    from malawi_property_scraper import MalawiPropertyScraper
+    from work_queue import WorkQueue, plan_units
+
+    queue = WorkQueue(args.queue)
+    try:
+        queue.enqueue(plan_units(MalawiPropertyScraper(), args.sources, args.max_pages))
+        logger.info(f"Queue status: {queue.counts()}")
+    finally:
+        queue.close()
+    return 0
+
+
+def run_queue_worker(queue_path, rate_limit, visibility_timeout, archive_dir=None):
+    """Run one queue worker until the queue is drained (a process entry point)"""
+    from malawi_property_scraper import MalawiPropertyScraper
+    from work_queue import WorkQueue, run_worker
+
+    archive = None
+    if archive_dir:
+        from html_archive import HtmlArchive
+        # Each process appends to its own archive; html_archive is single-writer
+        archive = HtmlArchive(os.path.join(archive_dir, f"worker-{os.getpid()}"))
+
+    queue = WorkQueue(queue_path, visibility_timeout=visibility_timeout)
+    scraper = MalawiPropertyScraper(request_interval=rate_limit, archive=archive)
+    try:
+        return run_worker(queue, scraper)
+    finally:
+        queue.close()
+        if archive is not None:
+            archive.close()
+
+
+def command_work(args):
+    """Process work units from a shared queue, optionally in several local processes"""
+    worker_args = (args.queue, args.rate_limit, args.visibility_timeout, args.archive)
+    if args.processes <= 1:
+        run_queue_worker(*worker_args)
+        return 0
+
+    from multiprocessing import Process
+
+    processes = [Process(target=run_queue_worker, args=worker_args) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+def command_collect(args):
+    """Write the records gathered in a shared queue"""
+    from output_sinks import write_records
+    from work_queue import WorkQueue
+
+    queue = WorkQueue(args.queue)
+    try:
+        logger.info(f"Queue status: {queue.counts()}")
+        output = args.output or f"malawi_properties.{args.format}"
+        write_records(queue.iter_records(), output, args.format)
+    finally:
+        queue.close()
+    return 0
+
+
+def command_alerts(args):
+    """Manage saved searches and match listings against them"""
+    from saved_searches import SavedSearchPercolator, open_alert_sink
+
+    percolator = SavedSearchPercolator(args.db)
+    try:
+        if args.action == 'add':
+            search_id = percolator.add_search(
+                args.name, city=args.city, area=args.area, property_type=args.property_type,
+                transaction_type=args.transaction_type, min_price=args.min_price,
+                max_price=args.max_price, keywords=args.keywords)
+            print(search_id)
+        elif args.action == 'remove':
+            percolator.remove_search(args.id)
+        elif args.action == 'list':
+            for search in percolator.searches():
+                print(' | '.join(f"{key}={value}" for key, value in search.items() if value is not None))
+        elif args.action == 'match':
+            import csv
+            with open(args.input, newline='', encoding='utf-8') as f:
+                alerts = percolator.percolate(csv.DictReader(f), open_alert_sink(args.sink))
+            logger.info(f"{len(alerts)} alerts sent to {args.sink}")
+    finally:
+        percolator.close()
+    return 0
+
+
+def command_changes(args):
+    """Write the changes of a scraper CSV since the previous one as a delta feed"""
+    import csv
+
+    with open(args.input, newline='', encoding='utf-8') as f:
+        properties = list(csv.DictReader(f))
+    # Only a CSV of full crawls may remove the listings it lacks
+    complete_sources = {record.get('source', '') for record in properties} if args.complete else None
+    export_changes(properties, args.state, args.output or f"changes.{args.format}", args.format,
+                   complete_sources=complete_sources)
+    return 0
+
+
+def command_search(args):
+    """Run a keyword query against the search index"""
+    from search_index import ListingSearchIndex, keyword_query
+
+    index = ListingSearchIndex(args.index)
+    query = ' '.join(args.query) if args.raw else keyword_query(args.query, match_all=args.all)
+    try:
+        results = index.search(query, city=args.city, area=args.area, property_type=args.property_type,
+                               transaction_type=args.transaction_type, source=args.source,
+                               min_price=args.min_price, max_price=args.max_price, limit=args.limit)
+    finally:
+        index.close()
+
+    for result in results:
+        price = f"MK {result['price']:,.0f}" if result['price'] is not None else 'no price'
+        print(f"{result['title']} | {result['location']} | {result['property_type']} "
+              f"{result['transaction_type']} | {price} | {result['source']}")
+    return 0
+
+
+def command_reextract(args):
+    """Run archived pages through the current extractors"""
+    from html_archive import HtmlArchive
+    from malawi_property_scraper import MalawiPropertyScraper
+    from output_sinks import open_sink
+
+    archive = HtmlArchive(args.archive)
+    output = args.output or f"malawi_properties.{args.format}"
+    sink = open_sink(output, args.format, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                     normalize=args.normalize)
+    scraper = MalawiPropertyScraper(sink=sink)
+    pages = archive.iter_pages(sites=args.sources, since=args.since, until=args.until)
+    logger.info(f"Re-extracting from {archive.page_count()} archived pages in {args.archive}")
+
+    try:
+        if args.parse_workers == 1:
+            properties = [prop for site, url, content in pages
+                          for prop in scraper.emit_records(scraper.parse_page(site, content, url))]
+        else:
+            from parse_pipeline import ParsePipeline
+            pipeline = ParsePipeline(scraper, max_workers=args.parse_workers)
+            properties = [prop for _, page_properties in pipeline.iter_parsed_pages(pages)
+                          for prop in scraper.emit_records(page_properties)]
+    finally:
+        archive.close()
+        sink.close()
+
+    if not properties:
+        logger.warning("No properties were extracted")
+        return 1
+    return 0
+
+
+def command_quality(args):
+    """Add price-per-sqm and outlier flags to a scraper CSV"""
+    from quality import flag_csv
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}_flagged.csv"
+    flag_csv(args.input, output)
+    logger.info(f"Flagged listings written to {output}")
+    return 0
+
+
+def command_store(args):
+    """Build a memory-mapped column store from a scraper CSV"""
+    if args.partitioned:
+        from partitioned_store import build_partitioned_store_from_csv
+
+        build_partitioned_store_from_csv(args.input, args.output or 'listing_partitions')
+        return 0
+
+    from listing_store import build_listing_store_from_csv
+
+    build_listing_store_from_csv(args.input, args.output or 'listing_store')
+    return 0
+
+
+def command_memcheck(args):
+    """Replay pages through the parsers and fail if memory grows per page"""
+    from malawi_property_scraper import MalawiPropertyScraper
+    from memory_budget import MemoryBudget, MemoryBudgetExceeded, replay_pages
+
+    if args.archive:
+        from html_archive import HtmlArchive
+        archive = HtmlArchive(args.archive)
+        try:
+            pages = list(itertools.islice(archive.iter_pages(sites=args.sources), args.distinct_pages))
+        finally:
+            archive.close()
+    else:
+        with open(args.html, encoding='utf-8') as f:
+            pages = [(args.site, args.html, f.read())]
+
+    budget = MemoryBudget(max_growth=int(args.max_growth_kb * 1024),
+                          max_page_peak=int(args.max_page_peak_kb * 1024) if args.max_page_peak_kb else None)
+    try:
+        report = replay_pages(MalawiPropertyScraper(request_interval=0), pages, count=args.pages, budget=budget)
+    except MemoryBudgetExceeded as e:
+        logger.error(f"Memory budget exceeded: {e}")
+        return 1
+    print(f"{report['pages']} pages, growth after warm-up {report['growth_bytes'] / 1024:.0f} KiB, "
+          f"largest page peak {report['largest_page_peak_bytes'] / 1024:.0f} KiB")
+    return 0
+
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(
+        prog='property_cli.py',
+        description='Scrape Malawian property listings',
+    )
+    parser.add_argument('--log-level', default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='logging verbosity (default: INFO)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    scrape = subparsers.add_parser('scrape', help='scrape listings and write them out (default)')
+    scrape.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES, metavar='SOURCE',
+                        help=f"sites to scrape: {', '.join(SOURCES)} (default: all)")
+    scrape.add_argument('--max-pages', type=int, default=None,
+                        help='maximum pages per site (default: no limit)')
+    scrape.add_argument('--concurrency', type=int, default=1,
+                        help='number of sites fetched at the same time (default: 1)')
+    scrape.add_argument('--parse-workers', type=int, default=None,
+                        help='parse on a pool of this many processes')
+    scrape.add_argument('--rate-limit', type=float, default=1.0,
+                        help='minimum seconds between requests to the same host (default: 1.0)')
+    scrape.add_argument('--pool-size', action='append', type=host_pool_size, default=[], metavar='HOST=N',
+                        help='keep up to N connections open to HOST (repeatable; default: 4 per host)')
+    scrape.add_argument('--host-timeout', action='append', type=host_timeout, default=[],
+                        metavar='HOST=CONNECT,READ',
+                        help='connect and read timeouts in seconds for HOST (repeatable)')
+    scrape.add_argument('--dns-ttl', type=float, default=300,
+                        help='seconds to cache DNS lookups; 0 disables the cache (default: 300)')
+    scrape.add_argument('--cache-dir', default=None,
+                        help='directory for the page hash cache; unchanged pages are not re-parsed')
+    scrape.add_argument('--format', choices=OUTPUT_FORMATS, default='csv',
+                        help='output format (default: csv)')
+    scrape.add_argument('--output', default=None,
+                        help='output path (default: malawi_properties.<format>)')
+    scrape.add_argument('--batch-size', type=int, default=500,
+                        help='records written per batch, transaction or row group (default: 500)')
+    scrape.add_argument('--flush-interval', type=float, default=5.0,
+                        help='write a partial batch after this many seconds (default: 5.0)')
+    scrape.add_argument('--normalize', action='store_true',
+                        help='write canonical property/transaction types and typed numbers and dates (requires pandas)')
+    scrape.add_argument('--profile', nargs='?', const='-', default=None, metavar='PATH',
+                        help='run under cProfile; write stats to PATH or print a summary')
+    scrape.add_argument('--profile-stages', default=None, metavar='PATH',
+                        help='time the fetch/parse/extract stages and write collapsed stacks to PATH')
+    scrape.add_argument('--trace-memory', action='store_true',
+                        help='with --profile-stages, record tracemalloc peaks per page (serial runs)')
+    scrape.add_argument('--index', default=None, metavar='PATH',
+                        help='add the scraped records to the full-text search index at PATH')
+    scrape.add_argument('--alerts', default=None, metavar='PATH',
+                        help='match the scraped records against the saved searches in PATH')
+    scrape.add_argument('--alert-sink', default='alerts.jsonl', metavar='TARGET',
+                        help='JSON Lines file or http(s) webhook receiving alerts (default: alerts.jsonl)')
+    scrape.add_argument('--changes', default=None, metavar='PATH',
+                        help='write the listings inserted, updated or removed since the last run to PATH')
+    scrape.add_argument('--changes-format', choices=['jsonl', 'parquet'], default='jsonl',
+                        help='format of the --changes feed (default: jsonl)')
+    scrape.add_argument('--change-state', default='change_state.sqlite', metavar='PATH',
+                        help='last exported state the --changes feed is diffed against '
+                             '(default: change_state.sqlite)')
+    scrape.add_argument('--discover', action='store_true',
+                        help='look for sitemaps and RSS/Atom feeds first and prefer them over HTML pagination')
+    scrape.add_argument('--frontier', default=None, metavar='PATH',
+                        help='with --discover, order sitemap pages by priority and keep a Bloom-filter '
+                             'seen-set at PATH so detail pages are fetched only once')
+    scrape.add_argument('--xhr-endpoints', default=None, metavar='PATH',
+                        help='JSON registry of XHR listing endpoints; registered sites are fetched as JSON')
+    scrape.add_argument('--learn-selectors', action='store_true',
+                        help='remember the listing-card selector that works for each generic site and try it first')
+    scrape.add_argument('--archive', default=None, metavar='DIR',
+                        help='archive every fetched page to DIR for later re-extraction')
+    scrape.set_defaults(func=command_scrape)
+
+    schedule = subparsers.add_parser('schedule', help='run as a resident crawler with per-source intervals')
+    schedule.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES, metavar='SOURCE',
+                          help=f"sites to crawl: {', '.join(SOURCES)} (default: all)")
+    schedule.add_argument('--workers', type=int, default=2,
+                          help='sources crawled at the same time (default: 2)')
+    schedule.add_argument('--max-pages', type=int, default=None,
+                          help='maximum pages per crawl (default: no limit)')
+    schedule.add_argument('--rate-limit', type=float, default=1.0,
+                          help='minimum seconds between requests to the same host (default: 1.0)')
+    schedule.add_argument('--min-interval', type=float, default=300,
+                          help='shortest refresh interval in seconds (default: 300)')
+    schedule.add_argument('--max-interval', type=float, default=86400,
+                          help='longest refresh interval in seconds (default: 86400)')
+    schedule.add_argument('--jitter', type=float, default=0.1,
+                          help='random spread of each interval, as a fraction (default: 0.1)')
+    schedule.add_argument('--state', default='crawl_schedule.json',
+                          help='file keeping intervals across restarts (default: crawl_schedule.json)')
+    schedule.add_argument('--max-crawls', type=int, default=None,
+                          help='stop after this many crawls (default: run until interrupted)')
+    schedule.add_argument('--cache-dir', default=None,
+                          help='directory for the page hash cache; unchanged pages are not re-parsed')
+    schedule.add_argument('--history', default=None, metavar='PATH',
+                          help='record every crawl in the listing history database at PATH')
+    schedule.add_argument('--index', default=None, metavar='PATH',
+                          help='add every crawl to the full-text search index at PATH')
+    schedule.add_argument('--output-dir', default=None, metavar='DIR',
+                          help='write each crawl to DIR/<source>-<timestamp>.<format>')
+    schedule.add_argument('--format', choices=OUTPUT_FORMATS, default='csv',
+                          help='format of --output-dir snapshots (default: csv)')
+    schedule.set_defaults(func=command_schedule)
+
+    enqueue = subparsers.add_parser('enqueue', help='plan a crawl as work units in a shared queue')
+    enqueue.add_argument('--queue', default='work_queue.sqlite', help='queue database (default: work_queue.sqlite)')
+    enqueue.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES, metavar='SOURCE',
+                         help=f"sites to crawl: {', '.join(SOURCES)} (default: all)")
+    enqueue.add_argument('--max-pages', type=int, default=None,
+                         help='pages per site; Atsogo is split into one unit per page when given')
+    enqueue.set_defaults(func=command_enqueue)
+
+    work = subparsers.add_parser('work', help='process units from a shared queue until it is drained')
+    work.add_argument('--queue', default='work_queue.sqlite', help='queue database (default: work_queue.sqlite)')
+    work.add_argument('--processes', type=int, default=1,
+                      help='worker processes to start on this machine (default: 1)')
+    work.add_argument('--rate-limit', type=float, default=1.0,
+                      help='minimum seconds between requests to the same host, per worker (default: 1.0)')
+    work.add_argument('--visibility-timeout', type=float, default=300,
+                      help='seconds before a silent worker\'s unit is handed out again (default: 300)')
+    work.add_argument('--archive', default=None, metavar='DIR',
+                      help='archive fetched pages under DIR, one archive per worker process')
+    work.set_defaults(func=command_work)
+
+    collect = subparsers.add_parser('collect', help='write the records gathered in a shared queue')
+    collect.add_argument('--queue', default='work_queue.sqlite', help='queue database (default: work_queue.sqlite)')
+    collect.add_argument('--format', choices=OUTPUT_FORMATS, default='csv',
+                         help='output format (default: csv)')
+    collect.add_argument('--output', default=None,
+                         help='output path (default: malawi_properties.<format>)')
+    collect.set_defaults(func=command_collect)
+
+    reextract = subparsers.add_parser('reextract', help='re-run the extractors over archived pages')
+    reextract.add_argument('--archive', required=True, metavar='DIR',
+                           help='archive directory written by scrape --archive')
+    reextract.add_argument('--sources', nargs='+', choices=SOURCES, default=None, metavar='SOURCE',
+                           help='only re-extract these sites (default: all)')
+    reextract.add_argument('--since', default=None,
+                           help='only pages fetched at or after this ISO timestamp')
+    reextract.add_argument('--until', default=None,
+                           help='only pages fetched before this ISO timestamp')
+    reextract.add_argument('--parse-workers', type=int, default=None,
+                           help='parse processes (default: one per CPU; 1 parses in-process)')
+    reextract.add_argument('--format', choices=OUTPUT_FORMATS, default='csv',
+                           help='output format (default: csv)')
+    reextract.add_argument('--output', default=None,
+                           help='output path (default: malawi_properties.<format>)')
+    reextract.add_argument('--batch-size', type=int, default=500,
+                           help='records written per batch, transaction or row group (default: 500)')
+    reextract.add_argument('--flush-interval', type=float, default=5.0,
+                           help='write a partial batch after this many seconds (default: 5.0)')
+    reextract.add_argument('--normalize', action='store_true',
+                           help='write canonical property/transaction types and typed numbers and dates (requires pandas)')
+    reextract.set_defaults(func=command_reextract)
+
+    quality = subparsers.add_parser('quality', help='flag missing values and price outliers in a CSV')
+    quality.add_argument('input', help='CSV written by one of the scrapers')
+    quality.add_argument('--output', default=None,
+                         help='output CSV (default: <input>_flagged.csv)')
+    quality.set_defaults(func=command_quality)
+
+    store = subparsers.add_parser('store', help='build a memory-mapped column store from a CSV')
+    store.add_argument('input', help='CSV written by one of the scrapers')
+    store.add_argument('--output',
+                       help='store directory (default: listing_store, or listing_partitions with --partitioned)')
+    store.add_argument('--partitioned', action='store_true',
+                       help='append to a store partitioned by source and month instead of replacing one')
+    store.set_defaults(func=command_store)
+
+    changes = subparsers.add_parser('changes', help='write what changed since the previous CSV as a delta feed')
+    changes.add_argument('input', help='CSV written by one of the scrapers')
+    changes.add_argument('--output', help='delta feed file (default: changes.<format>)')
+    changes.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl',
+                         help='delta feed format (default: jsonl)')
+    changes.add_argument('--state', default='change_state.sqlite',
+                         help='last exported state (default: change_state.sqlite)')
+    changes.add_argument('--complete', action='store_true',
+                         help='the CSV holds full crawls of its sources: emit their missing listings as removals')
+    changes.set_defaults(func=command_changes)
+
+    alerts = subparsers.add_parser('alerts', help='saved searches and new-listing alerts')
+    alerts.add_argument('--db', default='saved_searches.sqlite',
+                        help='saved search database (default: saved_searches.sqlite)')
+    actions = alerts.add_subparsers(dest='action', required=True)
+    add = actions.add_parser('add', help='save a search; prints its id')
+    add.add_argument('name')
+    add.add_argument('--city', default=None)
+    add.add_argument('--area', default=None)
+    add.add_argument('--property-type', default=None)
+    add.add_argument('--transaction-type', default=None)
+    add.add_argument('--min-price', type=float, default=None)
+    add.add_argument('--max-price', type=float, default=None)
+    add.add_argument('--keywords', nargs='+', default=None, help='words that must all appear in the title or description')
+    remove = actions.add_parser('remove', help='delete a saved search')
+    remove.add_argument('id', type=int)
+    actions.add_parser('list', help='list saved searches')
+    match = actions.add_parser('match', help='match the listings of a CSV against the saved searches')
+    match.add_argument('input', help='CSV written by one of the scrapers')
+    match.add_argument('--sink', default='alerts.jsonl',
+                       help='JSON Lines file or http(s) webhook receiving alerts (default: alerts.jsonl)')
+    alerts.set_defaults(func=command_alerts)
+
+    memcheck = subparsers.add_parser('memcheck', help='replay pages and check that memory stays flat')
+    pages_from = memcheck.add_mutually_exclusive_group(required=True)
+    pages_from.add_argument('--archive', metavar='DIR', help='replay pages from an archive written by scrape --archive')
+    pages_from.add_argument('--html', metavar='FILE', help='replay a single saved page (with --site)')
+    memcheck.add_argument('--site', choices=SOURCES, default='sgw', help='parser for --html (default: sgw)')
+    memcheck.add_argument('--sources', nargs='+', choices=SOURCES, default=None, metavar='SOURCE',
+                          help='only replay archived pages of these sites')
+    memcheck.add_argument('--distinct-pages', type=int, default=100,
+                          help='archived pages to cycle through (default: 100)')
+    memcheck.add_argument('--pages', type=int, default=1000, help='pages to parse in total (default: 1000)')
+    memcheck.add_argument('--max-growth-kb', type=float, default=1024,
+                          help='allowed memory growth after warm-up in KiB (default: 1024)')
+    memcheck.add_argument('--max-page-peak-kb', type=float, default=None,
+                          help='allowed peak allocation while parsing one page in KiB')
+    memcheck.set_defaults(func=command_memcheck)
+
+    search = subparsers.add_parser('search', help='keyword search over indexed listings')
+    search.add_argument('query', nargs='+', help='keywords; any of them matches unless --all is given')
+    search.add_argument('--index', default='listing_search.sqlite',
+                        help='search index path (default: listing_search.sqlite)')
+    search.add_argument('--all', action='store_true', help='require every keyword')
+    search.add_argument('--raw', action='store_true', help='treat the query as FTS5 syntax')
+    search.add_argument('--city', default=None)
+    search.add_argument('--area', default=None)
+    search.add_argument('--property-type', default=None)
+    search.add_argument('--transaction-type', default=None)
+    search.add_argument('--source', choices=SOURCES, default=None)
+    search.add_argument('--min-price', type=float, default=None)
+    search.add_argument('--max-price', type=float, default=None)
+    search.add_argument('--limit', type=int, default=20)
+    search.set_defaults(func=command_search)
+
+    parser.commands = set(subparsers.choices)
+    return parser
+
+
+def with_default_command(argv, commands):
+    """Insert 'scrape' where the subcommand belongs when argv does not name one"""
+    index = 0
+    # Skip the global options; --log-level takes a value unless written as --log-level=VALUE
+    while index < len(argv) and argv[index].split('=')[0] == '--log-level':
+        index += 1 if '=' in argv[index] else 2
+    if index < len(argv) and (argv[index] in commands or argv[index] in ('-h', '--help')):
+        return argv
+    return argv[:index] + ['scrape'] + argv[index:]
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    # Scraping is the default command, so `--max-pages 1` means `scrape --max-pages 1`
+    args = parser.parse_args(with_default_command(argv, parser.commands))
+
+    # force: a module imported along the way may already have configured the root logger
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = ['price', 'area_sqm', 'bedrooms', 'bathrooms']
+
+# Listings are compared within these groups; small groups fall back to the coarser one
+GROUP_COLUMNS = ['city', 'area', 'property_type', 'transaction_type']
+FALLBACK_GROUP_COLUMNS = ['property_type', 'transaction_type']
+
+# Modified z-score threshold (Iglewicz and Hoaglin) and the minimum group size to trust
+OUTLIER_THRESHOLD = 3.5
+MIN_GROUP_SIZE = 5
+
+
+def split_location_columns(df):
+    """Add city and area columns split from location, as the notebook does"""
+    parts = df['location'].fillna('').astype(str).str.split(',', n=2, expand=True)
+    parts = parts.reindex(columns=[0, 1], fill_value='')
+    df['city'] = parts[0].fillna('').str.strip().str.upper()
+    df['area'] = parts[1].fillna('').str.strip()
+    return df
+
+
+def _robust_z(values, keys):
+    """Return the modified z-score of values within groups defined by keys, and group sizes"""
+    grouped = values.groupby(keys, dropna=False, sort=False)
+    median = grouped.transform('median')
+    mad = (values - median).abs().groupby(keys, dropna=False, sort=False).transform('median')
+    size = grouped.transform('count')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 0.6745 * (values - median) / mad
+    # A zero MAD (all equal prices) makes any deviation infinitely unusual; treat as unknown
+    z = z.where(mad > 0)
+    return z, size
+
+
+def _grouped_robust_z(values, df):
+    """Modified z-score per listing group, falling back to a coarser group when it is too small"""
+    fine_keys = [df[column] for column in GROUP_COLUMNS]
+    coarse_keys = [df[column] for column in FALLBACK_GROUP_COLUMNS]
+    z, size = _robust_z(values, fine_keys)
+    coarse_z, _ = _robust_z(values, coarse_keys)
+    return z.where((size >= MIN_GROUP_SIZE) & z.notna(), coarse_z)
+
+
+def add_quality_flags(df):
+    """Return a copy of df with typed numeric columns, price per sqm and outlier flags
+
+    Zero prices, areas and room counts are placeholders and become missing.
+    Prices are compared on a log scale within (city, area, type, transaction)
+    groups using the median and median absolute deviation, so a handful of
+    extreme listings cannot shift the baseline they are judged against.
+    """
+    df = df.copy()
+    if 'city' not in df.columns or 'area' not in df.columns:
+        split_location_columns(df)
+
+    for column in NUMERIC_COLUMNS:
+        raw = df[column].astype(str).str.replace(',', '', regex=False) if column in df.columns else pd.Series(np.nan, index=df.index)
+        values = pd.to_numeric(raw, errors='coerce')
+        df[f'{column}_missing'] = values.isna() | (values <= 0)
+        df[column] = values.where(~df[f'{column}_missing'])
+
+    df['price_per_sqm'] = df['price'] / df['area_sqm']
+
+    df['price_robust_z'] = _grouped_robust_z(np.log(df['price']), df)
+    df['price_outlier'] = df['price_robust_z'].abs() > OUTLIER_THRESHOLD
+
+    df['price_per_sqm_robust_z'] = _grouped_robust_z(np.log(df['price_per_sqm']), df)
+    df['price_per_sqm_outlier'] = df['price_per_sqm_robust_z'].abs() > OUTLIER_THRESHOLD
+
+    df['quality_ok'] = ~df['price_missing'] & ~df['price_outlier'] & ~df['price_per_sqm_outlier']
+
+    logger.info(f"Quality flags: {int(df['price_missing'].sum())} missing prices, "
+                f"{int(df['price_outlier'].sum())} price outliers, "
+                f"{int(df['price_per_sqm_outlier'].sum())} price/sqm outliers out of {len(df)} listings")
+    return df
+
+
+def flag_csv(input_path, output_path):
+    """Read a scraper CSV, add quality flags and write it back out"""
+    df = pd.read_csv(input_path, dtype=str, keep_default_na=False)
+    flagged = add_quality_flags(df)
+    flagged.to_csv(output_path, index=False)
+    return flagged
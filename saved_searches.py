@@ -0,0 +1,280 @@
+import itertools
+import json
+import logging
+import math
+import sqlite3
+import threading
+from datetime import datetime
+
+import requests
+
+from listing_history import listing_fingerprints, split_location
+
+logger = logging.getLogger(__name__)
+
+# Record fields a saved search can pin down; None in a search means any value
+BUCKET_FIELDS = ['city', 'area', 'property_type', 'transaction_type']
+
+SEARCH_COLUMNS = ['id', 'name', 'city', 'area', 'property_type', 'transaction_type',
+                  'min_price', 'max_price', 'keywords', 'created_at']
+
+
+def _to_float(value):
+    """Convert a scraped price to a float, or None"""
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalize(field, value):
+    """Normalize a bucket value so searches and records compare equal"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value.upper() if field == 'city' else value.lower()
+
+
+def record_bucket_values(record):
+    """Return the normalized bucket values of a record"""
+    city, area = split_location(record.get('location'))
+    values = {
+        'city': city,
+        'area': area,
+        'property_type': record.get('property_type', ''),
+        'transaction_type': record.get('transaction_type', ''),
+    }
+    return tuple(_normalize(field, values[field]) for field in BUCKET_FIELDS)
+
+
+class IntervalTree:
+    """Static centered interval tree answering "which intervals contain x"
+
+    Built once from (low, high, item) triples; a stabbing query costs
+    O(log n + matches) instead of a scan over every interval.
+    """
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        self.center = None
+        if not intervals:
+            return
+        endpoints = sorted(value for low, high, _ in intervals for value in (low, high) if math.isfinite(value))
+        self.center = endpoints[len(endpoints) // 2] if endpoints else 0.0
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            low, high, _ = interval
+            if high < self.center:
+                left.append(interval)
+            elif low > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        # Overlapping intervals sorted both ways so a query can stop early
+        self.by_low = sorted(here, key=lambda interval: interval[0])
+        self.by_high = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def query(self, x):
+        """Return the items of all intervals with low <= x <= high"""
+        items = []
+        node = self
+        while node is not None and node.center is not None:
+            if x < node.center:
+                for low, _, item in node.by_low:
+                    if low > x:
+                        break
+                    items.append(item)
+                node = node.left
+            else:
+                for _, high, item in node.by_high:
+                    if high < x:
+                        break
+                    items.append(item)
+                node = node.right
+        return items
+
+
+class FileAlertSink:
+    """Append alerts to a JSON Lines file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alerts):
+        """Append alerts to the file"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+
+class WebhookAlertSink:
+    """POST alerts as a JSON array to a webhook URL"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, alerts):
+        """Post a batch of alerts; raises requests.RequestException when the POST fails"""
+        response = self.session.post(self.url, json=alerts, timeout=self.timeout)
+        response.raise_for_status()
+
+
+def open_alert_sink(target):
+    """Return a webhook sink for http(s) URLs, otherwise a JSON Lines file sink"""
+    if target.startswith(('http://', 'https://')):
+        return WebhookAlertSink(target)
+    return FileAlertSink(target)
+
+
+class SavedSearchPercolator:
+    """Match new listings against stored saved searches
+
+    Instead of running every saved search over the data, the searches
+    themselves are indexed: by their (city, area, type, transaction)
+    bucket, with None as a wildcard, and within each bucket by an interval
+    tree over their price ranges. A record only looks up the 16 buckets it
+    can fall into and stabs their trees with its price. Each listing alerts
+    a search once; sent alerts are remembered in the database.
+    """
+
+    def __init__(self, path='saved_searches.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS searches (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                city TEXT,
+                area TEXT,
+                property_type TEXT,
+                transaction_type TEXT,
+                min_price REAL,
+                max_price REAL,
+                keywords TEXT,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS alerts (
+                search_id INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                alerted_at TEXT,
+                PRIMARY KEY (search_id, fingerprint)
+            );
+        ''')
+        self.conn.commit()
+
+    def add_search(self, name, city=None, area=None, property_type=None, transaction_type=None,
+                   min_price=None, max_price=None, keywords=None):
+        """Store a saved search and return its id"""
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO searches (name, city, area, property_type, transaction_type, min_price, '
+                'max_price, keywords, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (name, _normalize('city', city), _normalize('area', area),
+                 _normalize('property_type', property_type), _normalize('transaction_type', transaction_type),
+                 min_price, max_price, ' '.join(keywords).lower() if keywords else None,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            self.conn.commit()
+            self._index = None
+        return cursor.lastrowid
+
+    def remove_search(self, search_id):
+        """Delete a saved search and its alert log"""
+        with self._lock:
+            self.conn.execute('DELETE FROM searches WHERE id = ?', (search_id,))
+            self.conn.execute('DELETE FROM alerts WHERE search_id = ?', (search_id,))
+            self.conn.commit()
+            self._index = None
+
+    def searches(self):
+        """Return all saved searches as dicts"""
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {', '.join(SEARCH_COLUMNS)} FROM searches ORDER BY id").fetchall()
+        return [dict(zip(SEARCH_COLUMNS, row)) for row in rows]
+
+    def _build_index(self):
+        """Group searches into buckets and build one price interval tree per bucket"""
+        buckets = {}
+        for search in self.searches():
+            key = tuple(search[field] for field in BUCKET_FIELDS)
+            low = search['min_price'] if search['min_price'] is not None else -math.inf
+            high = search['max_price'] if search['max_price'] is not None else math.inf
+            buckets.setdefault(key, []).append((low, high, search))
+        logger.info(f"Indexed saved searches into {len(buckets)} buckets")
+        return {key: IntervalTree(intervals) for key, intervals in buckets.items()}
+
+    def match(self, record):
+        """Return the saved searches a record satisfies"""
+        if self._index is None:
+            self._index = self._build_index()
+
+        values = record_bucket_values(record)
+        price = _to_float(record.get('price'))
+        text = None
+        matches = []
+        # Each field either matches the search's value or the search left it open
+        for key in itertools.product(*[(value, None) for value in values]):
+            tree = self._index.get(key)
+            if tree is None:
+                continue
+            if price is None:
+                # Without a price only searches with no price bounds can match
+                candidates = [search for search in tree.query(0.0)
+                              if search['min_price'] is None and search['max_price'] is None]
+            else:
+                candidates = tree.query(price)
+
+            for search in candidates:
+                if search['keywords']:
+                    if text is None:
+                        text = f"{record.get('title', '')} {record.get('description', '')}".lower()
+                    if not all(keyword in text for keyword in search['keywords'].split()):
+                        continue
+                matches.append(search)
+        return matches
+
+    def percolate(self, properties, sink=None):
+        """Match records against all saved searches and send alerts not sent before
+
+        Alerts are only recorded as sent once the sink accepted them; when
+        sending fails they are rolled back and sent again by the next run.
+        """
+        alerts = []
+        now = datetime.now().isoformat(timespec='seconds')
+        properties = list(properties)
+        for fingerprint, record in zip(listing_fingerprints(properties), properties):
+            matches = self.match(record)
+            if not matches:
+                continue
+            for search in matches:
+                with self._lock:
+                    cursor = self.conn.execute(
+                        'INSERT OR IGNORE INTO alerts (search_id, fingerprint, alerted_at) VALUES (?, ?, ?)',
+                        (search['id'], fingerprint, now)
+                    )
+                if cursor.rowcount:
+                    alerts.append({'search_id': search['id'], 'search_name': search['name'],
+                                   'alerted_at': now, 'listing': record})
+        with self._lock:
+            try:
+                if alerts and sink is not None:
+                    sink.send(alerts)
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"Error sending {len(alerts)} alerts, keeping them for the next run: {e}")
+                return []
+            self.conn.commit()
+
+        logger.info(f"Saved searches: {len(alerts)} new alerts")
+        return alerts
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeProfiler:
+    """Opt-in timers around the fetch, parse and extract stages of a scraper
+
+    Stages nest, so the collected times can be written out as collapsed
+    stacks ("fetch;parse 1234") for flamegraph.pl or speedscope. Callbacks
+    receive (stage_path, seconds) whenever a stage finishes.
+
+    tracemalloc counts the whole process, so memory is only sampled for
+    pages processed while no other page was open; with concurrent fetches
+    the overlapping pages are counted in skipped_pages instead.
+    """
+
+    def __init__(self, trace_memory=False, keep_snapshots=False, callbacks=None):
+        self.trace_memory = trace_memory
+        self.keep_snapshots = keep_snapshots
+        self.callbacks = list(callbacks or [])
+        self.totals = {}
+        self.counts = {}
+        self.collapsed = {}
+        self.page_memory = []
+        self.snapshots = []
+        self.skipped_pages = 0
+        self._open_pages = {}
+        self._started_tracing = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add_callback(self, callback):
+        """Register a callable receiving (stage_path, seconds)"""
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage, nested inside whatever stage is currently open"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Each frame is [name, seconds spent in child stages]
+        stack.append([name, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            path = ';'.join(frame[0] for frame in stack)
+            child_time = stack.pop()[1]
+            if stack:
+                stack[-1][1] += elapsed
+
+            with self._lock:
+                self.totals[name] = self.totals.get(name, 0.0) + elapsed
+                self.counts[name] = self.counts.get(name, 0) + 1
+                self.collapsed[path] = self.collapsed.get(path, 0.0) + elapsed - child_time
+
+            for callback in self.callbacks:
+                callback(path, elapsed)
+
+    @contextmanager
+    def page(self, url):
+        """Wrap the processing of one page, recording its memory use if enabled"""
+        if not self.trace_memory:
+            with self.stage('page'):
+                yield
+            return
+
+        token = object()
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            # The peak is process-wide: a page that overlaps another one is not sampled
+            for other in self._open_pages:
+                self._open_pages[other] = True
+            self._open_pages[token] = bool(self._open_pages)
+            if not self._open_pages[token]:
+                tracemalloc.reset_peak()
+        try:
+            with self.stage('page'):
+                yield
+        finally:
+            with self._lock:
+                if self._open_pages.pop(token):
+                    self.skipped_pages += 1
+                else:
+                    current, peak = tracemalloc.get_traced_memory()
+                    self.page_memory.append({'url': url, 'current_bytes': current, 'peak_bytes': peak})
+                    if self.keep_snapshots:
+                        self.snapshots.append((url, tracemalloc.take_snapshot()))
+
+    def summary(self):
+        """Return total seconds, call counts and mean milliseconds per stage"""
+        return {
+            name: {
+                'seconds': round(total, 6),
+                'calls': self.counts[name],
+                'mean_ms': round(total / self.counts[name] * 1000, 3),
+            }
+            for name, total in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+    def log_summary(self):
+        """Log the per-stage timings"""
+        logger.info("Stage timings:")
+        for name, stats in self.summary().items():
+            logger.info(f"  {name}: {stats['seconds']:.3f}s over {stats['calls']} calls ({stats['mean_ms']:.3f} ms each)")
+        if self.page_memory:
+            largest = max(self.page_memory, key=lambda page: page['peak_bytes'])
+            logger.info(f"Memory sampled on {len(self.page_memory)} pages, highest peak "
+                        f"{largest['peak_bytes'] / 1024:.1f} KiB on {largest['url']}")
+        if self.skipped_pages:
+            logger.info(f"Memory not sampled on {self.skipped_pages} pages that overlapped other pages")
+
+    def close(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+    def write_collapsed(self, path):
+        """Write collapsed stacks weighted by microseconds of self time"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, seconds in sorted(self.collapsed.items()):
+                micros = int(seconds * 1_000_000)
+                if micros:
+                    f.write(f"{stack} {micros}\n")
+        logger.info(f"Collapsed stacks written to {path}")
+
+
+class _NullProfiler:
+    """Profiler used when profiling is disabled; every hook is a no-op"""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def page(self, url):
+        return self._context
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,161 @@
+import logging
+import sqlite3
+
+from listing_history import listing_fingerprints, split_location
+
+logger = logging.getLogger(__name__)
+
+# bm25 weights for the title, description and location columns
+COLUMN_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+def _to_float(value):
+    """Convert a scraped price to a float, or None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def keyword_query(keywords, match_all=False):
+    """Build an FTS5 query from plain keywords, quoting each one"""
+    terms = ['"' + keyword.replace('"', '""') + '"' for keyword in keywords if keyword.strip()]
+    return (' AND ' if match_all else ' OR ').join(terms)
+
+
+class ListingSearchIndex:
+    """Full-text index over listing titles, descriptions and locations
+
+    Built on SQLite FTS5. Records are upserted by listing fingerprint, so
+    indexing each run's output only touches new or changed listings, and
+    keyword queries can be combined with structured filters on city, area,
+    type and price.
+    """
+
+    def __init__(self, path='listing_search.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS listings (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT UNIQUE NOT NULL,
+                source TEXT,
+                city TEXT,
+                area TEXT COLLATE NOCASE,
+                property_type TEXT,
+                transaction_type TEXT COLLATE NOCASE,
+                price REAL,
+                date_posted TEXT,
+                url TEXT,
+                title TEXT,
+                description TEXT,
+                location TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_listings_city_area ON listings (city, area);
+            CREATE INDEX IF NOT EXISTS idx_listings_price ON listings (price);
+            CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5 (
+                title, description, location,
+                content='listings', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+        ''')
+        self.conn.commit()
+
+    def add_records(self, properties):
+        """Insert or update records; returns the number of new or changed listings"""
+        changed = 0
+        properties = list(properties)
+        with self.conn:
+            for fingerprint, record in zip(listing_fingerprints(properties), properties):
+                city, area = split_location(record.get('location'))
+                values = (
+                    record.get('source', ''), city, area, record.get('property_type', ''),
+                    record.get('transaction_type', ''), _to_float(record.get('price')),
+                    record.get('date_posted', ''), record.get('url', ''), record.get('title', ''),
+                    record.get('description', ''), record.get('location', ''),
+                )
+                row = self.conn.execute(
+                    'SELECT id, source, city, area, property_type, transaction_type, price, date_posted, '
+                    'url, title, description, location FROM listings WHERE fingerprint = ?',
+                    (fingerprint,)
+                ).fetchone()
+
+                if row is None:
+                    cursor = self.conn.execute(
+                        'INSERT INTO listings (fingerprint, source, city, area, property_type, transaction_type, '
+                        'price, date_posted, url, title, description, location) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (fingerprint,) + values
+                    )
+                    self._index_text(cursor.lastrowid, values)
+                    changed += 1
+                elif tuple(row[1:]) != values:
+                    listing_id = row[0]
+                    # External-content FTS tables need the old text to remove it
+                    self.conn.execute(
+                        "INSERT INTO listings_fts (listings_fts, rowid, title, description, location) "
+                        "VALUES ('delete', ?, ?, ?, ?)",
+                        (listing_id, row[9], row[10], row[11])
+                    )
+                    self.conn.execute(
+                        'UPDATE listings SET source = ?, city = ?, area = ?, property_type = ?, '
+                        'transaction_type = ?, price = ?, date_posted = ?, url = ?, title = ?, '
+                        'description = ?, location = ? WHERE id = ?',
+                        values + (listing_id,)
+                    )
+                    self._index_text(listing_id, values)
+                    changed += 1
+
+        logger.info(f"Search index updated: {changed} new or changed listings")
+        return changed
+
+    def _index_text(self, listing_id, values):
+        """Add the text columns of a listing to the FTS table"""
+        self.conn.execute(
+            'INSERT INTO listings_fts (rowid, title, description, location) VALUES (?, ?, ?, ?)',
+            (listing_id, values[8], values[9], values[10])
+        )
+
+    def search(self, query, city=None, area=None, property_type=None, transaction_type=None,
+               source=None, min_price=None, max_price=None, limit=20):
+        """Return listings matching an FTS5 query and the given filters, best match first
+
+        query uses FTS5 syntax, e.g. 'borehole OR furnished'; use keyword_query()
+        to build one from plain words.
+        """
+        sql = (
+            'SELECT l.source, l.title, l.property_type, l.transaction_type, l.location, l.city, l.area, '
+            'l.price, l.date_posted, l.url, bm25(listings_fts, ?, ?, ?) AS rank '
+            'FROM listings_fts JOIN listings l ON l.id = listings_fts.rowid '
+            'WHERE listings_fts MATCH ?'
+        )
+        params = list(COLUMN_WEIGHTS) + [query]
+
+        filters = [
+            ('l.city = ?', city.upper() if city else None),
+            ('l.area = ?', area),
+            ('l.property_type = ?', property_type),
+            ('l.transaction_type = ?', transaction_type),
+            ('l.source = ?', source),
+            ('l.price >= ?', min_price),
+            ('l.price <= ?', max_price),
+        ]
+        for clause, value in filters:
+            if value is not None:
+                sql += ' AND ' + clause
+                params.append(value)
+
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        columns = ['source', 'title', 'property_type', 'transaction_type', 'location', 'city', 'area',
+                   'price', 'date_posted', 'url', 'rank']
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params)]
+
+    def rebuild(self):
+        """Rebuild the FTS table from the stored listings"""
+        with self.conn:
+            self.conn.execute("INSERT INTO listings_fts (listings_fts) VALUES ('rebuild')")
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
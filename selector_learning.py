@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+
+# Only class names that look like listing markup count towards the layout;
+# incidental classes (badges, "featured") would make the fingerprint churn
+LAYOUT_CLASS_RE = re.compile(r'property|listing|item|card|result', re.IGNORECASE)
+
+
+def page_fingerprint(content):
+    """Return a cheap structural fingerprint of a page from its listing-related class names
+
+    Pages of the same template share the fingerprint however many cards they
+    hold; a redesign that renames the card classes changes it.
+    """
+    classes = set()
+    for match in CLASS_ATTR_RE.finditer(content):
+        classes.update(name for name in match.group(1).split() if LAYOUT_CLASS_RE.search(name))
+    return hashlib.sha1(' '.join(sorted(classes)).encode('utf-8')).hexdigest()[:16]
+
+
+class SelectorLearner:
+    """Remember which listing-card selector works for each site
+
+    The generic scrapers try every selector in turn until one matches. Once
+    a selector has produced records for a site it is stored together with
+    the page fingerprint and tried first on later pages and runs. The site
+    is re-learned when the fingerprint changes or when the selector's yield
+    falls below min_yield_ratio of its running average.
+    """
+
+    def __init__(self, cache_path='learned_selectors.json', min_yield_ratio=0.5, smoothing=0.2):
+        self.cache_path = cache_path
+        self.min_yield_ratio = min_yield_ratio
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.selectors = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                self.selectors = json.load(f)
+
+    def __getstate__(self):
+        # Parse worker processes get a pickled copy of the learned selectors
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def save(self):
+        """Write the learned selectors"""
+        with self._lock:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.selectors, f, indent=2, sort_keys=True)
+
+    def selector_for(self, site, fingerprint):
+        """Return the learned selector of a site, or None if there is none for this layout"""
+        with self._lock:
+            entry = self.selectors.get(site)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry['selector']
+
+    def record_yield(self, site, selector, fingerprint, count):
+        """Record the records a learned selector produced; False means it should be re-learned"""
+        with self._lock:
+            entry = self.selectors.get(site)
+            if entry is None or entry['selector'] != selector or entry['fingerprint'] != fingerprint:
+                return False
+            if count == 0 or count < self.min_yield_ratio * entry['yield']:
+                logger.info(f"Selector {selector} for {site} yielded {count} records "
+                            f"(average {entry['yield']:.1f}); re-learning")
+                return False
+            entry['yield'] += self.smoothing * (count - entry['yield'])
+            entry['pages'] += 1
+            return True
+
+    def learn(self, site, selector, fingerprint, count):
+        """Store the selector that produced count records for a site"""
+        if not selector or count == 0:
+            return
+        with self._lock:
+            previous = self.selectors.get(site)
+            if previous is None or previous['selector'] != selector or previous['fingerprint'] != fingerprint:
+                logger.info(f"Learned selector {selector} for {site}")
+            self.selectors[site] = {
+                'selector': selector,
+                'fingerprint': fingerprint,
+                'yield': float(count),
+                'pages': 1,
+                'learned_at': datetime.now().isoformat(timespec='seconds'),
+            }
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_PATHS = ['/sitemap.xml', '/sitemap_index.xml', '/wp-sitemap.xml']
+
+# Paths of listing pages (index or detail) rather than articles, as linked from feed items
+LISTING_PATH_RE = re.compile(r'/(listings?|propert(y|ies)|for-(sale|rent)|rentals?|homes?)(/|\?|$)', re.IGNORECASE)
+
+# Listing index pages only: the listing segment ends the path, optionally followed by /page/N.
+# Detail pages (/listings/properties/some-slug) hold one listing and are not worth a request each
+LISTING_INDEX_PATH_RE = re.compile(
+    r'/(listings?|propert(y|ies)|for-(sale|rent)|rentals?|homes?)(/page/\d+)?/?$', re.IGNORECASE)
+
+FEED_LINK_RE = re.compile(
+    r'<link[^>]+type=["\']application/(rss|atom)\+xml["\'][^>]*>', re.IGNORECASE)
+HREF_RE = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def _local_name(tag):
+    """Strip the XML namespace from a tag"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class SiteDiscovery:
+    """Find sitemaps and feeds for each site
+
+    Endpoints are cached per site in a JSON file and re-checked after
+    max_age_days, so the probing requests are paid once rather than on
+    every run.
+    """
+
+    def __init__(self, scraper, cache_path='discovered_endpoints.json', max_age_days=7):
+        self.scraper = scraper
+        self.cache_path = cache_path
+        self.max_age = timedelta(days=max_age_days)
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                self.endpoints = json.load(f)
+
+    def save(self):
+        """Write the endpoint cache"""
+        with self._lock:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.endpoints, f, indent=2, sort_keys=True)
+
+    def _is_fresh(self, entry):
+        """Return True if a cached entry is younger than max_age"""
+        checked_at = entry.get('checked_at')
+        if not checked_at:
+            return False
+        return datetime.now() - datetime.fromisoformat(checked_at) < self.max_age
+
+    def discover(self, site, base_url):
+        """Return the cached or freshly discovered endpoints of a site"""
+        entry = self.endpoints.get(site, {})
+        if self._is_fresh(entry):
+            return entry
+
+        logger.info(f"Discovering listing endpoints for {site}")
+        sitemaps = self._find_sitemaps(base_url)
+        homepage = self.scraper.get_page_content(base_url, timeout=10) or ''
+        feeds = self._find_feeds(base_url, homepage)
+
+        entry = dict(entry)
+        entry.update({
+            'base_url': base_url,
+            'sitemaps': sitemaps,
+            'listing_pages': self._listing_pages(sitemaps),
+            'feeds': feeds,
+            'checked_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        with self._lock:
+            self.endpoints[site] = entry
+        self.save()
+        logger.info(f"{site}: {len(sitemaps)} sitemaps, {len(entry['listing_pages'])} listing pages, "
+                    f"{len(feeds)} feeds")
+        return entry
+
+    def _find_sitemaps(self, base_url):
+        """Collect sitemap URLs from robots.txt and the usual locations"""
+        candidates = []
+        robots = self.scraper.get_page_content(urljoin(base_url, '/robots.txt'), timeout=10) or ''
+        for line in robots.splitlines():
+            if line.lower().startswith('sitemap:'):
+                candidates.append(line.split(':', 1)[1].strip())
+        if not candidates:
+            candidates = [urljoin(base_url, path) for path in SITEMAP_PATHS]
+
+        sitemaps = []
+        for url in candidates:
+            content = self.scraper.get_page_content(url, timeout=10)
+            if content and ('<urlset' in content or '<sitemapindex' in content):
+                sitemaps.append(url)
+        return sitemaps
+
+    def _find_feeds(self, base_url, homepage):
+        """Collect RSS/Atom feeds advertised on the homepage"""
+        feeds = []
+        for match in FEED_LINK_RE.finditer(homepage):
+            href = HREF_RE.search(match.group(0))
+            if href:
+                feeds.append(urljoin(base_url, href.group(1)))
+        return feeds
+
+    def _sitemap_urls(self, sitemap_url, depth=0):
+        """Yield page URLs of a sitemap, following sitemap indexes"""
+        content = self.scraper.get_page_content(sitemap_url, timeout=10)
+        if not content:
+            return
+        try:
+            root = ET.fromstring(content.encode('utf-8'))
+        except ET.ParseError as e:
+            logger.error(f"Error parsing sitemap {sitemap_url}: {e}")
+            return
+
+        for loc in root.iter():
+            if _local_name(loc.tag) != 'loc' or not loc.text:
+                continue
+            url = loc.text.strip()
+            if _local_name(root.tag) == 'sitemapindex':
+                if depth < 2:
+                    yield from self._sitemap_urls(url, depth + 1)
+            else:
+                yield url
+
+    def _listing_pages(self, sitemaps):
+        """Return sitemap URLs that look like listing index pages"""
+        pages = []
+        seen = set()
+        for sitemap_url in sitemaps:
+            for url in self._sitemap_urls(sitemap_url):
+                if url not in seen and LISTING_INDEX_PATH_RE.search(urlparse(url).path):
+                    seen.add(url)
+                    pages.append(url)
+        return pages
+
+    def remember_entry_point(self, site, url):
+        """Record the entry point that last returned content for a site"""
+        with self._lock:
+            self.endpoints.setdefault(site, {})['entry_point'] = url
+
+    def preferred_entry_point(self, site):
+        """Return the entry point that worked last time, if any"""
+        return self.endpoints.get(site, {}).get('entry_point')
+
+    def feed_records(self, site, feed_url):
+        """Turn the items of an RSS or Atom feed into property records
+
+        Sites also advertise blog and comment feeds, so only items that link
+        to a listing path or mention a price are kept.
+        """
+        content = self.scraper.get_page_content(feed_url, timeout=10)
+        if not content:
+            return []
+        try:
+            root = ET.fromstring(content.encode('utf-8'))
+        except ET.ParseError as e:
+            logger.error(f"Error parsing feed {feed_url}: {e}")
+            return []
+
+        properties = []
+        skipped = 0
+        for item in root.iter():
+            if _local_name(item.tag) not in ('item', 'entry'):
+                continue
+            fields = {}
+            for child in item:
+                name = _local_name(child.tag)
+                if name == 'link' and child.get('href'):
+                    fields['link'] = child.get('href')
+                elif child.text:
+                    fields.setdefault(name, child.text.strip())
+
+            description = self.scraper.clean_text(
+                re.sub(r'<[^>]+>', ' ', fields.get('description') or fields.get('summary') or ''))
+            property_data = self.scraper.new_property_record(site, fields.get('link', feed_url))
+            property_data['title'] = self.scraper.clean_text(fields.get('title', ''))
+            property_data['description'] = description
+            text = f"{property_data['title']} {description}"
+            property_data['price'] = self.scraper.extract_price(text)
+            property_data['area_sqm'] = self.scraper.extract_area(text)
+            bedrooms, bathrooms = self.scraper.extract_bedrooms_bathrooms(text)
+            property_data['bedrooms'] = bedrooms
+            property_data['bathrooms'] = bathrooms
+            property_data['date_posted'] = self._feed_date(
+                fields.get('pubDate') or fields.get('published') or fields.get('updated'))
+
+            is_listing = LISTING_PATH_RE.search(urlparse(fields.get('link', '')).path + '?') is not None
+            if is_listing or property_data['price']:
+                properties.append(property_data)
+            else:
+                skipped += 1
+        if skipped:
+            logger.info(f"Skipped {skipped} feed items of {feed_url} that do not look like listings")
+        return properties
+
+    def _feed_date(self, value):
+        """Convert an RSS or Atom date to the scrapers' date format"""
+        if not value:
+            return ''
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            try:
+                parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return ''
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
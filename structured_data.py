@@ -0,0 +1,228 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# schema.org types that describe a listing or the property being offered; generic Product and
+# Offer nodes are left out, as themes emit them for site-wide offers and breadcrumbs alike
+LISTING_TYPES = {
+    'RealEstateListing', 'Accommodation', 'House', 'SingleFamilyResidence',
+    'Apartment', 'Residence', 'Room', 'Suite',
+}
+
+# schema.org types mapped onto the property types the scrapers already use
+PROPERTY_TYPES = {
+    'House': 'Residential',
+    'SingleFamilyResidence': 'Residential',
+    'Apartment': 'Residential',
+    'Residence': 'Residential',
+    'Accommodation': 'Residential',
+    'Room': 'Residential',
+    'Suite': 'Residential',
+}
+
+JSON_LD_MARKER = 'application/ld+json'
+JSON_LD_RE = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+MICRODATA_RE = re.compile(r'itemtype=["\']https?://schema\.org/(\w+)', re.IGNORECASE)
+SCHEMA_TYPE_RE = re.compile(r'schema\.org/(\w+)', re.IGNORECASE)
+
+# Prices and sizes given as plain numbers: '2500000', '2,500,000.00', 120
+BARE_NUMBER_RE = re.compile(r'^\s*(\d[\d,]*(?:\.\d+)?)\s*$')
+
+
+def _types(item):
+    """Return the @type of a JSON-LD node as a set"""
+    item_type = item.get('@type', [])
+    if isinstance(item_type, str):
+        item_type = [item_type]
+    return {t.rsplit('/', 1)[-1] for t in item_type if isinstance(t, str)}
+
+
+def _iter_nodes(data):
+    """Yield every JSON-LD object, flattening lists and @graph containers"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_nodes(item)
+    elif isinstance(data, dict):
+        if '@graph' in data:
+            yield from _iter_nodes(data['@graph'])
+        else:
+            yield data
+
+
+def _value(node, *keys):
+    """Follow keys through nested dicts/lists and return a plain value"""
+    for key in keys:
+        if isinstance(node, list):
+            node = node[0] if node else None
+        if not isinstance(node, dict):
+            return ''
+        node = node.get(key)
+    if isinstance(node, dict):
+        node = node.get('value', node.get('name', ''))
+    if isinstance(node, list):
+        node = node[0] if node else ''
+    return '' if node is None else str(node).strip()
+
+
+def _location(node):
+    """Build a location string from an address or contentLocation"""
+    for container in (node.get('address'), _nested(node, 'contentLocation', 'address'),
+                      _nested(node, 'itemOffered', 'address')):
+        if isinstance(container, str):
+            return container.strip()
+        if isinstance(container, dict):
+            parts = [container.get(key) for key in ('addressLocality', 'streetAddress', 'addressRegion')]
+            parts = [str(part).strip() for part in parts if part]
+            if parts:
+                return ', '.join(parts)
+    return ''
+
+
+def _nested(node, *keys):
+    """Return a nested dict value or None"""
+    for key in keys:
+        if isinstance(node, list):
+            node = node[0] if node else None
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _number(value, extract):
+    """Normalize a price or size the way the card parsers do; bare numbers are taken as they are"""
+    bare = BARE_NUMBER_RE.match(value)
+    return bare.group(1).replace(',', '') if bare else extract(value)
+
+
+def _transaction_type(node):
+    """Map goodrelations business functions to the scrapers' transaction types"""
+    function = _value(node, 'businessFunction') or _value(node, 'offers', 'businessFunction')
+    function = function.lower()
+    if 'lease' in function or 'rent' in function:
+        return 'For Rent'
+    if 'sell' in function:
+        return 'For Sale'
+    return ''
+
+
+def _record_from_node(scraper, source, url, node):
+    """Convert one JSON-LD listing node into a property record"""
+    # A RealEstateListing usually wraps the property in itemOffered/about
+    place = _nested(node, 'itemOffered') or _nested(node, 'about') or {}
+    if not isinstance(place, dict):
+        place = {}
+
+    property_data = scraper.new_property_record(source, _value(node, 'url') or url)
+    property_data['title'] = scraper.clean_text(_value(node, 'name') or _value(place, 'name'))
+    property_data['description'] = scraper.clean_text(_value(node, 'description') or _value(place, 'description'))
+    property_data['location'] = _location(node) or _location(place)
+
+    price = (_value(node, 'offers', 'price') or _value(node, 'price')
+             or _value(node, 'priceSpecification', 'price'))
+    property_data['price'] = _number(price, scraper.extract_price)
+
+    area = _value(place, 'floorSize') or _value(node, 'floorSize')
+    property_data['area_sqm'] = _number(area, scraper.extract_area)
+    property_data['bedrooms'] = (_value(place, 'numberOfBedrooms') or _value(node, 'numberOfBedrooms')
+                                 or _value(place, 'numberOfRooms'))
+    property_data['bathrooms'] = (_value(place, 'numberOfBathroomsTotal')
+                                  or _value(node, 'numberOfBathroomsTotal'))
+    property_data['date_posted'] = (_value(node, 'datePosted') or _value(node, 'datePublished')).replace('T', ' ')[:19]
+    property_data['transaction_type'] = _transaction_type(node)
+
+    for schema_type in _types(place) | _types(node):
+        if schema_type in PROPERTY_TYPES:
+            property_data['property_type'] = PROPERTY_TYPES[schema_type]
+            break
+
+    return property_data
+
+
+def extract_json_ld(scraper, source, content, url):
+    """Return records from schema.org JSON-LD listings embedded in the page"""
+    # Plain substring scan first; most pages without JSON-LD stop here
+    if JSON_LD_MARKER not in content:
+        return []
+
+    properties = []
+    for block in JSON_LD_RE.findall(content):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+
+        for node in _iter_nodes(data):
+            if not _types(node) & LISTING_TYPES:
+                continue
+            property_data = _record_from_node(scraper, source, url, node)
+            if property_data['title'] or property_data['price']:
+                properties.append(property_data)
+
+    return properties
+
+
+def extract_microdata(scraper, source, content, url):
+    """Return records from schema.org microdata listings in the page"""
+    types = {match.group(1) for match in MICRODATA_RE.finditer(content)}
+    if not types & LISTING_TYPES:
+        return []
+
+    # Only pages that declare listing microdata pay for a DOM parse
+    soup = scraper.make_soup(content)
+    properties = []
+    try:
+        for scope in soup.find_all(itemscope=True, itemtype=SCHEMA_TYPE_RE):
+            if SCHEMA_TYPE_RE.search(scope['itemtype']).group(1) not in LISTING_TYPES:
+                continue
+            # Nested scopes (offers, the house of a listing) are folded into their outer listing
+            parent = scope.find_parent(itemscope=True, itemtype=SCHEMA_TYPE_RE)
+            if parent is not None and SCHEMA_TYPE_RE.search(parent['itemtype']).group(1) in LISTING_TYPES:
+                continue
+
+            node = {'@type': scope['itemtype']}
+            for prop in scope.find_all(itemprop=True):
+                name = prop['itemprop']
+                value = prop.get('content') or prop.get('href') or prop.get_text(' ', strip=True)
+                node.setdefault(name, value)
+            property_data = _record_from_node(scraper, source, url, node)
+            if property_data['title'] or property_data['price']:
+                properties.append(property_data)
+    finally:
+        scraper.release_soup(soup)
+    return properties
+
+
+def merge_structured_records(structured, cards, page_url):
+    """Merge structured-data records into the card records of the same page
+
+    A structured record fills the empty fields of the card with the same
+    detail URL or title; the ones that match no card are appended.
+    """
+    merged = list(cards)
+    for record in structured:
+        title = record['title'].lower()
+        detail_url = record['url'] if record['url'] != page_url else None
+        for card in merged:
+            if (detail_url and detail_url == card.get('url')) or \
+                    (title and title == str(card.get('title', '')).lower()):
+                for field, value in record.items():
+                    if value and not card.get(field):
+                        card[field] = value
+                break
+        else:
+            merged.append(record)
+    return merged
+
+
+def extract_structured_records(scraper, source, content, url):
+    """Return listing records from JSON-LD, then microdata; [] when the page has neither"""
+    try:
+        return (extract_json_ld(scraper, source, content, url)
+                or extract_microdata(scraper, source, content, url))
+    except Exception as e:
+        logger.error(f"Error extracting structured data from {url}: {e}")
+        return []
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from change_feed import ChangeFeed, write_changes
+
+
+def listing(title, price, source='sgw'):
+    return {'source': source, 'title': title, 'property_type': 'Residential', 'transaction_type': 'For Sale',
+            'location': 'Blantyre, Namiwawa', 'price': price, 'url': f'https://{source}.mw/'}
+
+
+@pytest.fixture
+def feed(tmp_path):
+    feed = ChangeFeed(str(tmp_path / 'state.sqlite'))
+    yield feed
+    feed.close()
+
+
+def ops(changes):
+    return sorted((change['op'], change['record']['title']) for change in changes)
+
+
+def test_first_run_inserts_everything(feed):
+    changes = feed.capture([listing('A', '100'), listing('B', '200')], complete_sources={'sgw'})
+    assert ops(changes) == [('insert', 'A'), ('insert', 'B')]
+
+
+def test_updates_carry_changed_fields(feed):
+    feed.capture([listing('A', '100')])
+    changes = feed.capture([listing('A', '150')])
+
+    assert ops(changes) == [('update', 'A')]
+    assert changes[0]['changes'] == {'price': ['100', '150']}
+    assert feed.capture([listing('A', '150')]) == []
+
+
+def test_removals_only_for_complete_sources(feed):
+    feed.capture([listing('A', '100'), listing('B', '200'), listing('C', '300', source='atsogo')])
+
+    # A partial crawl never removes what it did not see
+    assert feed.diff([listing('A', '100'), listing('C', '300', source='atsogo')]) == []
+
+    changes = feed.diff([listing('A', '100'), listing('C', '300', source='atsogo')], complete_sources={'sgw'})
+    assert ops(changes) == [('delete', 'B')]
+    assert changes[0]['record']['price'] == '200'
+
+
+def test_diff_does_not_store_state(feed):
+    feed.diff([listing('A', '100')])
+    assert ops(feed.diff([listing('A', '100')])) == [('insert', 'A')]
+
+
+def test_look_alike_listings_are_separate_rows(feed):
+    changes = feed.capture([listing('Townhouse for rent', '100'), listing('Townhouse for rent', '200')])
+    assert len(changes) == 2
+    assert len({change['fingerprint'] for change in changes}) == 2
+
+
+def test_empty_run_writes_an_empty_feed(feed, tmp_path):
+    path = tmp_path / 'changes.jsonl'
+    write_changes(feed.capture([listing('A', '100')]), str(path))
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+    write_changes(feed.capture([listing('A', '100')]), str(path))
+    assert path.read_text(encoding='utf-8') == ''
+
+
+def test_jsonl_feed_keeps_nested_record(feed, tmp_path):
+    path = tmp_path / 'changes.jsonl'
+    write_changes(feed.capture([listing('A', '100')], run_at='2025-06-01T00:00:00'), str(path))
+
+    row = json.loads(path.read_text(encoding='utf-8'))
+    assert row['op'] == 'insert'
+    assert row['run_at'] == '2025-06-01T00:00:00'
+    assert row['record']['title'] == 'A'
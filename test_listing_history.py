@@ -0,0 +1,59 @@
+import random
+
+from listing_history import ListingHistory, listing_fingerprint, listing_fingerprints, split_location
+
+
+def listing(title, price, description=''):
+    return {'source': 'sgw', 'title': title, 'property_type': 'Residential', 'transaction_type': 'For Rent',
+            'location': 'Blantyre, Namiwawa', 'price': price, 'description': description}
+
+
+def test_single_listing_matches_listing_fingerprint():
+    record = listing('Mandala House', '100')
+    assert listing_fingerprints([record]) == [listing_fingerprint(record)]
+
+
+def test_fingerprint_ignores_price_of_a_lone_listing():
+    assert listing_fingerprint(listing('Mandala House', '100')) == listing_fingerprint(listing('Mandala House', '150'))
+
+
+def test_look_alikes_get_distinct_fingerprints():
+    records = [listing('Townhouse for rent in Namiwawa Blantyre', price) for price in ('100', '200', '300')]
+    records.append(listing('Townhouse for rent in Namiwawa Blantyre', '100', description='Second one at 100'))
+    assert len(set(listing_fingerprints(records))) == 4
+
+
+def test_repeated_card_keeps_one_fingerprint():
+    record = listing('Mandala House', '100')
+    fingerprints = listing_fingerprints([record, dict(record)])
+    assert fingerprints[0] == fingerprints[1]
+
+
+def test_look_alike_fingerprints_do_not_depend_on_order():
+    records = [listing('Townhouse', str(price)) for price in range(100, 1100, 100)]
+    expected = dict(zip(listing_fingerprints(records), (record['price'] for record in records)))
+
+    shuffled = records[:]
+    random.Random(7).shuffle(shuffled)
+    assert dict(zip(listing_fingerprints(shuffled), (record['price'] for record in shuffled))) == expected
+
+
+def test_split_location():
+    assert split_location('Lilongwe, Area 41,') == ('LILONGWE', 'Area 41')
+    assert split_location('') == ('', '')
+
+
+def test_history_records_price_drops_and_delistings(tmp_path):
+    history = ListingHistory(str(tmp_path / 'history.sqlite'))
+    try:
+        first = history.record_run([listing('A', '200'), listing('B', '300')], observed_at='2025-06-01T00:00:00',
+                                   complete_sources={'sgw'})
+        second = history.record_run([listing('A', '150')], observed_at='2025-06-02T00:00:00',
+                                    complete_sources={'sgw'})
+        drops = history.price_drops(city='blantyre')
+    finally:
+        history.close()
+
+    assert first['new'] == 2
+    assert second == {'new': 0, 'changed': 1, 'unchanged': 0, 'delisted': 1}
+    assert [(drop['old_price'], drop['new_price']) for drop in drops] == [(200.0, 150.0)]
@@ -0,0 +1,44 @@
+import tracemalloc
+
+import pytest
+
+from malawi_property_scraper import MalawiPropertyScraper
+from memory_budget import MemoryBudget, MemoryBudgetExceeded, replay_pages
+
+CARDS = ''.join(
+    f'<div class="property-card"><h3>House {i}</h3><p>Blantyre, Namiwawa</p><p>MK {i},500,000</p>'
+    f'<p>{i % 5 + 1} bedrooms</p></div>'
+    for i in range(10)
+)
+PAGES = [('sgw', f'https://sgw.mw/properties/page/{i}/', f'<html><body>{CARDS}<p>page {i}</p></body></html>')
+         for i in range(5)]
+
+
+def test_replay_stays_within_budget():
+    scraper = MalawiPropertyScraper()
+    site, url, content = PAGES[0]
+    assert len(scraper.parse_page(site, content, url)) == 10
+
+    report = replay_pages(scraper, PAGES, count=120, budget=MemoryBudget(max_growth=512 * 1024, warmup_pages=20))
+
+    assert report['pages'] == 120
+    assert report['growth_bytes'] <= 512 * 1024
+    assert not tracemalloc.is_tracing()
+
+
+def test_growing_memory_exceeds_budget():
+    leak = []
+    with pytest.raises(MemoryBudgetExceeded):
+        with MemoryBudget(max_growth=64 * 1024, warmup_pages=2) as budget:
+            for page in range(20):
+                leak.append(bytearray(16 * 1024))
+                budget.page_done(f'page {page}')
+    assert not tracemalloc.is_tracing()
+
+
+def test_page_peak_budget():
+    with pytest.raises(MemoryBudgetExceeded):
+        with MemoryBudget(max_page_peak=64 * 1024) as budget:
+            block = bytearray(256 * 1024)
+            del block
+            budget.page_done('big page')
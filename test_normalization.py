@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from normalization import MAX_ROOM_COUNT, normalize_records, normalized_rows
+
+
+def test_canonical_types_and_numbers():
+    frame = normalize_records([
+        {'source': 'atsogo', 'title': 'Plot', 'property_type': 'Plot', 'transaction_type': 'For rent',
+         'location': 'Lilongwe, Area 43', 'price': 'MK 1,500,000.00', 'area_sqm': '0', 'bedrooms': '3',
+         'bathrooms': '', 'date_posted': '2025-06-01 10:00:00'},
+        {'source': 'atsogo', 'title': 'House', 'property_type': 'Incompleted House', 'transaction_type': 'sale',
+         'location': 'blantyre', 'price': '', 'area_sqm': '450', 'bedrooms': '0', 'bathrooms': '2',
+         'date_posted': 'not a date'},
+    ])
+
+    assert list(frame['property_type']) == ['Land', 'Residential']
+    assert list(frame['transaction_type']) == ['For Rent', 'For Sale']
+    assert frame['price'][0] == 1500000.0
+    assert math.isnan(frame['price'][1])
+    assert math.isnan(frame['area_sqm'][0])
+    assert frame['bedrooms'][0] == 3 and frame['bedrooms'].isna()[1]
+    assert list(frame['city']) == ['LILONGWE', 'BLANTYRE']
+    assert list(frame['area']) == ['Area 43', '']
+    assert list(frame['under_construction']) == [False, True]
+    assert frame['date_posted'].isna()[1]
+
+
+def test_unknown_categories_are_left_missing():
+    frame = normalize_records([{'property_type': 'Castle', 'transaction_type': 'Auction'}])
+    assert frame['property_type'].isna()[0]
+    assert frame['transaction_type'].isna()[0]
+
+
+def test_implausible_room_counts_are_left_missing():
+    frame = normalize_records([{'bedrooms': '450003', 'bathrooms': str(MAX_ROOM_COUNT)}])
+    assert frame['bedrooms'].isna()[0]
+    assert frame['bathrooms'][0] == MAX_ROOM_COUNT
+    assert str(frame['bedrooms'].dtype) == 'Int16'
+
+
+def test_normalized_rows_are_plain_values():
+    rows = normalized_rows(normalize_records([{'price': '100', 'date_posted': '2025-06-01'}]))
+    assert rows[0]['price'] == 100.0
+    assert rows[0]['bedrooms'] is None
+    assert rows[0]['date_posted'] == '2025-06-01T00:00:00'
@@ -0,0 +1,126 @@
+import csv
+import json
+
+import pytest
+
+from output_sinks import CsvSink, JsonlSink, SqliteSink, write_records
+
+
+def sample_records(count=3):
+    return [{'source': 'sgw', 'title': f'House {i}', 'price': str(100000 * (i + 1)), 'url': f'https://sgw.mw/{i}'}
+            for i in range(count)]
+
+
+class FailingJsonlSink(JsonlSink):
+    """JSON Lines sink whose second batch fails to write"""
+
+    def _write_batch(self, batch):
+        if self.count:
+            raise OSError('disk full')
+        super()._write_batch(batch)
+
+
+@pytest.mark.parametrize('background', [True, False])
+def test_jsonl_sink_writes_all_records_in_batches(tmp_path, background):
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlSink(path, batch_size=2, background=background) as sink:
+        sink.write_many(sample_records(5))
+
+    with open(path, encoding='utf-8') as f:
+        titles = [json.loads(line)['title'] for line in f]
+    assert titles == [f'House {i}' for i in range(5)]
+    assert not (tmp_path / 'out.jsonl.tmp').exists()
+
+
+def test_csv_sink_keeps_field_order(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    write_records(sample_records(2), path, 'csv')
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['title'] for row in rows] == ['House 0', 'House 1']
+    assert list(rows[0])[:2] == ['source', 'title']
+
+
+def test_sqlite_sink_replaces_previous_table(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'out.sqlite')
+    write_records(sample_records(3), path, 'sqlite')
+    write_records(sample_records(1), path, 'sqlite')
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM properties').fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_empty_run_leaves_previous_output(tmp_path):
+    path = tmp_path / 'out.csv'
+    path.write_text('previous\n', encoding='utf-8')
+
+    CsvSink(str(path), background=False).close()
+
+    assert path.read_text(encoding='utf-8') == 'previous\n'
+    assert not (tmp_path / 'out.csv.tmp').exists()
+
+
+def test_keep_empty_replaces_previous_output(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    path.write_text('{"title": "stale"}\n', encoding='utf-8')
+
+    JsonlSink(str(path), background=False, keep_empty=True).close()
+
+    assert path.read_text(encoding='utf-8') == ''
+
+
+@pytest.mark.parametrize('background', [True, False])
+def test_failed_write_keeps_previous_output(tmp_path, background):
+    path = tmp_path / 'out.jsonl'
+    path.write_text('previous\n', encoding='utf-8')
+
+    sink = FailingJsonlSink(str(path), batch_size=1, background=background)
+    with pytest.raises(OSError):
+        sink.write_many(sample_records(3))
+        sink.close()
+    # Closing again, or after the error surfaced in write(), never swaps the partial file in
+    try:
+        sink.close()
+    except OSError:
+        pass
+
+    assert path.read_text(encoding='utf-8') == 'previous\n'
+    assert not (tmp_path / 'out.jsonl.tmp').exists()
+
+
+def test_failed_flush_does_not_hang(tmp_path):
+    sink = FailingJsonlSink(str(tmp_path / 'out.jsonl'), batch_size=100)
+    sink.write_many(sample_records(1))
+    sink.flush()
+    sink.write_many(sample_records(1))
+    with pytest.raises(OSError):
+        sink.flush()
+    with pytest.raises(OSError):
+        sink.close()
+    assert not (tmp_path / 'out.jsonl').exists()
+
+
+def test_sqlite_sink_failure_keeps_previous_table(tmp_path):
+    import sqlite3
+
+    class FailingSqliteSink(SqliteSink):
+        def _write_batch(self, batch):
+            raise sqlite3.OperationalError('database is locked')
+
+    path = str(tmp_path / 'out.sqlite')
+    write_records(sample_records(2), path, 'sqlite')
+    with pytest.raises(sqlite3.OperationalError):
+        with FailingSqliteSink(path, background=False) as sink:
+            sink.write_many(sample_records(1))
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM properties').fetchone()[0] == 2
+    finally:
+        conn.close()
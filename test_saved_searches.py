@@ -0,0 +1,55 @@
+import math
+import random
+
+from saved_searches import IntervalTree, SavedSearchPercolator
+
+
+def brute_force(intervals, x):
+    return sorted(item for low, high, item in intervals if low <= x <= high)
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(3)
+    intervals = []
+    for item in range(300):
+        low = rng.choice([-math.inf, rng.uniform(0, 1000)])
+        high = rng.choice([math.inf, low + rng.uniform(0, 300) if math.isfinite(low) else rng.uniform(0, 1000)])
+        intervals.append((low, high, item))
+    tree = IntervalTree(intervals)
+
+    for x in [rng.uniform(-100, 1400) for _ in range(500)] + [0.0, 1000.0]:
+        assert sorted(tree.query(x)) == brute_force(intervals, x)
+
+
+def test_interval_tree_includes_endpoints():
+    tree = IntervalTree([(10, 20, 'a'), (20, 30, 'b'), (31, 40, 'c')])
+    assert sorted(tree.query(20)) == ['a', 'b']
+    assert tree.query(30.5) == []
+
+
+def test_empty_interval_tree():
+    assert IntervalTree([]).query(5) == []
+
+
+def test_percolator_alerts_once_per_listing(tmp_path):
+    class ListSink:
+        def __init__(self):
+            self.sent = []
+
+        def send(self, alerts):
+            self.sent.extend(alerts)
+
+    percolator = SavedSearchPercolator(str(tmp_path / 'searches.sqlite'))
+    try:
+        percolator.add_search('cheap blantyre', city='Blantyre', max_price=200)
+        percolator.add_search('lilongwe', city='Lilongwe')
+        record = {'source': 'sgw', 'title': 'House', 'location': 'BLANTYRE, Namiwawa', 'price': '150'}
+        sink = ListSink()
+        first = percolator.percolate([record], sink)
+        second = percolator.percolate([record], sink)
+    finally:
+        percolator.close()
+
+    assert [alert['search_name'] for alert in first] == ['cheap blantyre']
+    assert second == []
+    assert len(sink.sent) == 1
@@ -0,0 +1,166 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+BLOOM_MAGIC = b'BLM1'
+BLOOM_HEADER = struct.Struct('<4sQIQ')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings
+
+    Sized for capacity items at the given false-positive rate: one million
+    URLs at 1% take about 1.2 MB. A false positive makes a URL look seen;
+    there are no false negatives.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.01, size_bits=None, hash_count=None):
+        self.size_bits = size_bits or max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = hash_count or max(1, round(self.size_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        """Return the bit positions of an item (double hashing over one digest)"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add an item; returns False if it was (probably) already present"""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        """Write the filter to path"""
+        with open(path + '.tmp', 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.size_bits, self.hash_count, self.count))
+            f.write(self.bits)
+        os.replace(path + '.tmp', path)
+
+
+def load_bloom_filter(path):
+    """Read a filter written by BloomFilter.save"""
+    with open(path, 'rb') as f:
+        magic, size_bits, hash_count, count = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a Bloom filter file")
+        bloom = BloomFilter(size_bits=size_bits, hash_count=hash_count)
+        bloom.bits = bytearray(f.read())
+        bloom.count = count
+    return bloom
+
+
+class UrlFrontier:
+    """Priority queue of URLs to fetch, with per-host politeness and a persistent seen-set
+
+    Each host has its own queue ordered by (priority, depth, insertion
+    order), so first listing pages go before deep pages. pop() returns the
+    best URL among hosts whose politeness delay has passed, instead of
+    sleeping on one busy host. URLs added without revisit=True are checked
+    against a Bloom filter saved between runs, so pages fetched once (e.g.
+    listing detail pages) are not fetched again. A URL only enters that
+    seen-set through mark_fetched(), so pages left in the queue or whose
+    fetch failed are tried again next run.
+    """
+
+    def __init__(self, seen_path=None, capacity=1000000, error_rate=0.01, politeness=1.0):
+        self.seen_path = seen_path
+        self.politeness = politeness
+        if seen_path and os.path.exists(seen_path):
+            self.seen = load_bloom_filter(seen_path)
+            logger.info(f"Loaded URL seen-set with {len(self.seen)} entries from {seen_path}")
+        else:
+            self.seen = BloomFilter(capacity, error_rate)
+        self._queues = {}
+        # Every URL queued this run, popped or not, so it is queued only once per run
+        self._queued = set()
+        self._next_allowed = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def add(self, url, priority=0, depth=0, data=None, revisit=False):
+        """Queue a URL; returns False if it is already queued or was seen before
+
+        Lower priority values are fetched first. revisit=True queues the URL
+        even if it was fetched in an earlier run (listing index pages change).
+        """
+        with self._lock:
+            if url in self._queued or (not revisit and url in self.seen):
+                return False
+            self._queued.add(url)
+            host = urlparse(url).netloc
+            heapq.heappush(self._queues.setdefault(host, []), (priority, depth, next(self._order), url, data))
+            return True
+
+    def _ready_host(self, hosts, now):
+        """Return (host, wait) for the best ready host, or the shortest wait when none is ready"""
+        best_host, best_key, wait = None, None, None
+        for host in hosts:
+            queue = self._queues.get(host)
+            if not queue:
+                continue
+            delay = self._next_allowed.get(host, 0) - now
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            if best_key is None or queue[0][:3] < best_key:
+                best_host, best_key = host, queue[0][:3]
+        return best_host, wait
+
+    def pop(self, hosts=None, wait=True):
+        """Return (url, data) for the next URL to fetch, or None when nothing is queued
+
+        hosts restricts the choice to some hosts. With wait=False, None is
+        also returned while every host is still inside its politeness delay.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                host, delay = self._ready_host(hosts if hosts is not None else list(self._queues), now)
+                if host is not None:
+                    _, _, _, url, data = heapq.heappop(self._queues[host])
+                    self._next_allowed[host] = now + self.politeness
+                    return url, data
+            if delay is None or not wait:
+                return None
+            time.sleep(delay)
+
+    def mark_fetched(self, url):
+        """Add a successfully fetched URL to the persistent seen-set"""
+        with self._lock:
+            self.seen.add(url)
+
+    def save(self):
+        """Persist the seen-set"""
+        if self.seen_path:
+            with self._lock:
+                self.seen.save(self.seen_path)
+            logger.info(f"Saved URL seen-set with {len(self.seen)} entries to {self.seen_path}")
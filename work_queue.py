@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from listing_history import listing_fingerprints
+
+logger = logging.getLogger(__name__)
+
+# Units still being worked on, for counting what is left
+OPEN_STATUSES = ('pending', 'leased')
+
+
+def default_worker_id():
+    """Return a worker id unique to this host and process"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Shared queue of crawl work units in a SQLite database (WAL mode)
+
+    A unit is either one page ('page', fetched and parsed) or a whole site
+    ('site', scraped with scrape_site). Workers lease units for
+    visibility_timeout seconds; a unit whose worker dies is leased again once
+    its lease expires, up to max_attempts times. Extracted records are
+    upserted by listing fingerprint, so a unit processed twice leaves the
+    same rows behind. Any number of worker processes on the host can share
+    the database file.
+    """
+
+    def __init__(self, path='work_queue.sqlite', visibility_timeout=300, max_attempts=3):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                site TEXT NOT NULL,
+                url TEXT NOT NULL DEFAULT '',
+                max_pages INTEGER,
+                status TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                record_count INTEGER,
+                last_error TEXT,
+                finished_at REAL,
+                UNIQUE (kind, site, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_units_status ON units (status, lease_expires);
+            CREATE TABLE IF NOT EXISTS records (
+                fingerprint TEXT PRIMARY KEY,
+                source TEXT,
+                record TEXT NOT NULL,
+                unit_id INTEGER,
+                updated_at REAL
+            );
+        ''')
+
+    def enqueue(self, units):
+        """Add (kind, site, url, max_pages) units; existing ones are left alone. Returns the number added"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO units (kind, site, url, max_pages) VALUES (?, ?, ?, ?)',
+                    units
+                )
+                added = self.conn.total_changes - before
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        logger.info(f"Enqueued {added} work units")
+        return added
+
+    def lease(self, worker_id, limit=1):
+        """Lease up to limit units that are pending or whose lease expired"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock first, so two workers never lease the same unit
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, kind, site, url, max_pages, attempts FROM units "
+                    "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                    "AND attempts < ? ORDER BY attempts, id LIMIT ?",
+                    (now, self.max_attempts, limit)
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE units SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    [(worker_id, now + self.visibility_timeout, row[0]) for row in rows]
+                )
+                # Expired units that used up their attempts will never be leased again
+                self.conn.execute(
+                    "UPDATE units SET status = 'failed', last_error = COALESCE(last_error, 'lease expired') "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, self.max_attempts)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+        columns = ['id', 'kind', 'site', 'url', 'max_pages', 'attempts']
+        return [dict(zip(columns, row)) for row in rows]
+
+    def extend(self, unit_id, worker_id):
+        """Push back the lease expiry of a unit this worker still holds; False if the lease was lost"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE units SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.visibility_timeout, unit_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id, worker_id, properties):
+        """Upsert a unit's records and mark it done"""
+        now = time.time()
+        properties = list(properties)
+        rows = [(fingerprint, record.get('source', ''), json.dumps(record, ensure_ascii=False), unit_id, now)
+                for fingerprint, record in zip(listing_fingerprints(properties), properties)]
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany(
+                    'INSERT INTO records (fingerprint, source, record, unit_id, updated_at) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (fingerprint) DO UPDATE SET source = excluded.source, record = excluded.record, '
+                    'unit_id = excluded.unit_id, updated_at = excluded.updated_at',
+                    rows
+                )
+                cursor = self.conn.execute(
+                    "UPDATE units SET status = 'done', record_count = ?, finished_at = ?, lease_owner = ? "
+                    "WHERE id = ? AND status != 'done'",
+                    (len(rows), now, worker_id, unit_id)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        if cursor.rowcount == 0:
+            logger.info(f"Unit {unit_id} was already completed by another worker")
+
+    def fail(self, unit_id, worker_id, error):
+        """Release a unit after an error; it is retried until max_attempts"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (self.max_attempts, str(error), unit_id, worker_id)
+            )
+
+    def counts(self):
+        """Return the number of units per status"""
+        with self._lock:
+            return dict(self.conn.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall())
+
+    def has_open_units(self):
+        """Return True while any unit is pending or leased"""
+        counts = self.counts()
+        return any(counts.get(status) for status in OPEN_STATUSES)
+
+    def iter_records(self):
+        """Yield the collected records"""
+        with self._lock:
+            rows = self.conn.execute('SELECT record FROM records ORDER BY source, rowid').fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
+
+
+def plan_units(scraper, sites, max_pages=None):
+    """Return the work units for a crawl: one per Atsogo page when the page count is known, else one per site"""
+    from malawi_property_scraper import ATSOGO_PROPERTIES_URL
+
+    units = []
+    for site in sites:
+        if site == 'atsogo' and max_pages:
+            for page in range(1, max_pages + 1):
+                url = f"{ATSOGO_PROPERTIES_URL}?page={page}" if page > 1 else ATSOGO_PROPERTIES_URL
+                units.append(('page', site, url, None))
+        else:
+            units.append(('site', site, '', max_pages))
+    return units
+
+
+def process_unit(scraper, unit):
+    """Fetch and parse one work unit, returning its records"""
+    if unit['kind'] == 'site':
+        # Unlike scrape_site, errors propagate so the unit is failed and retried
+        properties = [record for page_properties in scraper.iter_site_pages(unit['site'], unit['max_pages'])
+                      for record in page_properties]
+        if not properties:
+            raise RuntimeError(f"No listings fetched for {unit['site']}")
+        return scraper.emit_records(properties)
+
+    content = scraper.get_page_content(unit['url'])
+    if content is None:
+        raise RuntimeError(f"Could not fetch {unit['url']}")
+    scraper.archive_page(unit['site'], unit['url'], content)
+    return scraper.parse_page(unit['site'], content, unit['url'])
+
+
+def run_worker(queue, scraper, worker_id=None, poll_interval=2.0, exit_when_idle=True):
+    """Lease and process units until the queue is drained; returns the number processed"""
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    logger.info(f"Worker {worker_id} started")
+
+    while True:
+        units = queue.lease(worker_id)
+        if not units:
+            if exit_when_idle and not queue.has_open_units():
+                break
+            # Other workers still hold leases that may expire and come back
+            time.sleep(poll_interval)
+            continue
+
+        unit = units[0]
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(queue.visibility_timeout / 3):
+                if not queue.extend(unit['id'], worker_id):
+                    logger.warning(f"Worker {worker_id} lost the lease on unit {unit['id']}")
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            properties = process_unit(scraper, unit)
+            queue.complete(unit['id'], worker_id, properties)
+            processed += 1
+            logger.info(f"Worker {worker_id} finished {unit['kind']} unit {unit['id']} "
+                        f"({unit['site']} {unit['url']}): {len(properties)} records")
+        except Exception as e:
+            logger.error(f"Error processing unit {unit['id']}: {e}")
+            queue.fail(unit['id'], worker_id, e)
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+    logger.info(f"Worker {worker_id} done after {processed} units")
+    return processed
@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import re
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = 'xhr_endpoints.json'
+
+# Safety net for endpoints that never return an empty page
+DEFAULT_MAX_PAGES = 100
+
+NUMERIC_FIELDS = ['price', 'area_sqm', 'bedrooms', 'bathrooms']
+TEXT_FIELDS = ['title', 'property_type', 'transaction_type', 'location', 'date_posted', 'description']
+
+# Prices as APIs send them: '2500000', '2,500,000.00'
+BARE_NUMBER_RE = re.compile(r'^\s*(\d[\d,]*(?:\.\d+)?)\s*$')
+
+
+def _path_value(data, path):
+    """Follow a dotted path ('data.results', 'images.0.url') through dicts and lists"""
+    for key in path.split('.') if path else []:
+        if isinstance(data, list):
+            try:
+                data = data[int(key)]
+            except (ValueError, IndexError):
+                return None
+        elif isinstance(data, dict):
+            data = data.get(key)
+        else:
+            return None
+    return data
+
+
+def _first_value(item, paths):
+    """Return the first non-empty value among one or more paths"""
+    for path in [paths] if isinstance(paths, str) else paths:
+        value = _path_value(item, path)
+        if value not in (None, '', []):
+            return value
+    return None
+
+
+def _number_text(value):
+    """Format a JSON number the way the HTML extractors format numbers"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class XhrSourceRegistry:
+    """JSON listing endpoints behind client-side rendered sites
+
+    Some agency sites load their listings with XHR calls, so their HTML is an
+    empty shell. Each registered endpoint describes the JSON API found in the
+    browser's network tab: its URL and query parameters, how it paginates,
+    where the listing array sits in the response and which JSON path feeds
+    each record field. Those sites are then fetched as compact JSON pages
+    instead of HTML.
+
+    Example entry (xhr_endpoints.json):
+
+        {"reynolds": {
+            "url": "https://example.com/api/properties",
+            "params": {"country": "MW", "per_page": 50},
+            "page_param": "page",
+            "records_path": "data.items",
+            "fields": {"title": "name", "price": ["price.amount", "price"],
+                       "location": "address.city", "bedrooms": "beds"},
+            "value_maps": {"transaction_type": {"sale": "For Sale", "let": "For Rent"}},
+            "url_template": "https://example.com/property/{id}"
+        }}
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, endpoints=None):
+        self.path = path
+        self.endpoints = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.endpoints = json.load(f)
+        self.endpoints.update(endpoints or {})
+
+    def save(self):
+        """Write the registry"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.endpoints, f, indent=2, sort_keys=True)
+
+    def register(self, site, url, fields, records_path='', params=None, page_param=None,
+                 start_page=1, offset_param=None, page_size=None, headers=None,
+                 value_maps=None, url_field=None, url_template=None, max_pages=DEFAULT_MAX_PAGES):
+        """Register the JSON listing endpoint of a site"""
+        self.endpoints[site] = {
+            'url': url,
+            'fields': fields,
+            'records_path': records_path,
+            'params': params or {},
+            'page_param': page_param,
+            'start_page': start_page,
+            'offset_param': offset_param,
+            'page_size': page_size,
+            'headers': headers or {},
+            'value_maps': value_maps or {},
+            'url_field': url_field,
+            'url_template': url_template,
+            'max_pages': max_pages,
+        }
+
+    def has_endpoint(self, site):
+        """Return True if a JSON endpoint is registered for a site"""
+        return site in self.endpoints
+
+    def page_params(self, site, max_pages=None):
+        """Yield the query parameters of each page of a site's endpoint"""
+        endpoint = self.endpoints[site]
+        limit = min(max_pages or DEFAULT_MAX_PAGES, endpoint.get('max_pages') or DEFAULT_MAX_PAGES)
+        page_param = endpoint.get('page_param')
+        offset_param = endpoint.get('offset_param')
+
+        for index in range(limit):
+            params = dict(endpoint.get('params') or {})
+            if page_param:
+                params[page_param] = endpoint.get('start_page', 1) + index
+            elif offset_param:
+                # Without a page_size, iter_record_pages moves the offset by the items received
+                params[offset_param] = index * (endpoint.get('page_size') or 0)
+            elif index > 0:
+                # Unpaginated endpoints return everything at once
+                return
+            yield params
+
+    def fetch_records(self, scraper, site, max_pages=None):
+        """Fetch every page of a site's JSON endpoint and map it to records"""
+        properties = [record for page in self.iter_record_pages(scraper, site, max_pages) for record in page]
+        logger.info(f"Fetched {len(properties)} properties for {site} from its JSON endpoint")
+        return properties
+
+    def iter_record_pages(self, scraper, site, max_pages=None):
+        """Yield the records of each page of a site's JSON endpoint, fetching pages lazily"""
+        endpoint = self.endpoints[site]
+        page_size = endpoint.get('page_size')
+        offset_param = endpoint.get('offset_param')
+        offset = 0
+
+        for params in self.page_params(site, max_pages):
+            if offset_param and not page_size and not endpoint.get('page_param'):
+                params[offset_param] = offset
+            scraper.wait_for_host(endpoint['url'])
+            try:
+                with scraper.profiler.stage('fetch'):
+                    response = scraper.session.get(
+                        endpoint['url'], params=params, headers=endpoint.get('headers') or None, timeout=25)
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"Error fetching JSON listings for {site} from {endpoint['url']}: {e}")
+                scraper.mark_partial(site, 'JSON endpoint request failed')
+                break
+
+            with scraper.profiler.page(response.url):
+                page_properties = self.records_from_payload(scraper, site, payload, response.url)
+            yield page_properties
+
+            items = _path_value(payload, endpoint.get('records_path', ''))
+            count = len(items) if isinstance(items, list) else 0
+            offset += count
+            if count == 0 or (page_size and count < page_size):
+                break
+        else:
+            if endpoint.get('page_param') or endpoint.get('offset_param'):
+                # Ran out of pages to request before the endpoint ran out of listings
+                scraper.mark_partial(site, 'page limit reached')
+
+    def records_from_payload(self, scraper, site, payload, page_url=''):
+        """Map a decoded JSON response (live or a recorded fixture) to property records"""
+        endpoint = self.endpoints[site]
+        items = _path_value(payload, endpoint.get('records_path', ''))
+        if not isinstance(items, list):
+            logger.warning(f"No listing array at '{endpoint.get('records_path', '')}' in {site} response")
+            return []
+
+        properties = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                property_data = self.record_from_item(scraper, site, item, page_url)
+            except Exception as e:
+                logger.error(f"Error mapping {site} JSON listing: {e}")
+                continue
+            if property_data['title'] or property_data['price']:
+                properties.append(property_data)
+        return properties
+
+    def record_from_item(self, scraper, site, item, page_url=''):
+        """Map one JSON listing object to a property record"""
+        endpoint = self.endpoints[site]
+        fields = endpoint.get('fields', {})
+        value_maps = endpoint.get('value_maps', {})
+
+        url = page_url
+        if endpoint.get('url_field'):
+            url = str(_first_value(item, endpoint['url_field']) or page_url)
+        elif endpoint.get('url_template'):
+            try:
+                url = endpoint['url_template'].format_map(item)
+            except (KeyError, IndexError, ValueError):
+                pass
+        property_data = scraper.new_property_record(site, url)
+
+        for name in NUMERIC_FIELDS:
+            value = _first_value(item, fields[name]) if name in fields else None
+            if value is None:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                property_data[name] = _number_text(value)
+            elif name == 'price':
+                # A bare number needs no currency marker; text like 'MK 85,000' goes through the card parser
+                bare = BARE_NUMBER_RE.match(str(value))
+                property_data[name] = bare.group(1).replace(',', '') if bare else scraper.extract_price(str(value))
+            elif name == 'area_sqm':
+                property_data[name] = scraper.extract_area(str(value)) or scraper.clean_text(str(value))
+            else:
+                property_data[name] = scraper.clean_text(str(value))
+
+        for name in TEXT_FIELDS:
+            value = _first_value(item, fields[name]) if name in fields else None
+            if value is None:
+                continue
+            if isinstance(value, list):
+                value = ', '.join(str(part) for part in value if part)
+            property_data[name] = scraper.clean_text(str(value))
+
+        for name, mapping in value_maps.items():
+            mapping = {key.lower(): value for key, value in mapping.items()}
+            raw = property_data.get(name, '').lower()
+            if raw in mapping:
+                property_data[name] = mapping[raw]
+
+        return property_data